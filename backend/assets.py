@@ -0,0 +1,144 @@
+"""Fingerprinted, precompressed static assets.
+
+At startup every file under a registered root is hashed and given a
+fingerprinted name (``css/style.css`` -> ``css/style.3f9c2a1b.css``).
+Templates ask for ``asset_url('static', filename='css/style.css')`` and
+get the fingerprinted URL, which is served with a year-long immutable
+cache lifetime: a changed file gets a new name, so browsers never need
+to revalidate. Text assets also get gzip (and, when the ``brotli``
+package is installed, brotli) variants chosen by ``Accept-Encoding``.
+
+The plain names keep working for links that do not go through the
+manifest (the React components, old bookmarks), but they are served
+with ``no-cache`` so they revalidate against the ETag.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Files up to this size are kept in memory; larger ones are sent from disk
+MAX_IN_MEMORY = 1024 * 1024
+
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# ETag suffix per Content-Encoding: each encoding is a different representation
+ETAG_SUFFIXES = {'gzip': 'gz', 'br': 'br'}
+
+
+def compressed_variants(body):
+    """gzip (and brotli, if available) encodings of ``body`` that are actually smaller than it."""
+    variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+def negotiate(request, variants):
+    """The best encoding in ``variants`` the client accepts, or 'identity'."""
+    best, best_quality = 'identity', 0
+    for encoding in ('br', 'gzip'):
+        quality = request.accept_encodings[encoding]
+        if encoding in variants and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def variant_etag(etag, encoding):
+    """The strong ETag of one encoding of a body whose identity ETag is ``etag``."""
+    suffix = ETAG_SUFFIXES.get(encoding)
+    return f"{etag}-{suffix}" if suffix else etag
+
+
+def fingerprinted_name(filename, digest):
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+
+class Asset:
+    def __init__(self, path, filename, body):
+        self.path = path
+        self.filename = filename
+        self.digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        self.etag = self.digest
+        self.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self.hashed_name = fingerprinted_name(filename, self.digest[:8])
+        self.body = body if len(body) <= MAX_IN_MEMORY else None
+        self.variants = {}
+        if self.body is not None and self.mimetype.startswith(COMPRESSIBLE):
+            self.variants = compressed_variants(body)
+
+
+class AssetStore:
+    """The fingerprint manifest and bodies of the files under one or more directories.
+
+    When the same name exists under several roots the first root wins.
+    """
+
+    def __init__(self, *roots):
+        self.roots = roots
+        self.by_name = {}
+        self.by_hashed_name = {}
+        self.load()
+
+    def load(self):
+        by_name, by_hashed_name = {}, {}
+        for root in self.roots:
+            for directory, _, files in os.walk(root):
+                for name in files:
+                    path = os.path.join(directory, name)
+                    filename = os.path.relpath(path, root).replace(os.sep, '/')
+                    if filename in by_name:
+                        continue
+                    with open(path, 'rb') as f:
+                        asset = Asset(path, filename, f.read())
+                    by_name[filename] = asset
+                    by_hashed_name[asset.hashed_name] = asset
+        self.by_name, self.by_hashed_name = by_name, by_hashed_name
+
+    def url_name(self, filename):
+        """The fingerprinted name for ``filename``, or the name itself if it is not in the manifest."""
+        asset = self.by_name.get(filename)
+        return asset.hashed_name if asset else filename
+
+    def find(self, filename):
+        """``(asset, cache_control)`` for a fingerprinted or plain name; ``(None, None)`` if unknown."""
+        asset = self.by_hashed_name.get(filename)
+        if asset is not None:
+            return asset, IMMUTABLE
+        asset = self.by_name.get(filename)
+        if asset is not None:
+            return asset, REVALIDATE
+        return None, None
+
+    def response(self, request, filename):
+        """Serve ``filename`` (fingerprinted or plain); None if there is no such asset."""
+        asset, cache_control = self.find(filename)
+        if asset is None:
+            return None
+
+        encoding = negotiate(request, asset.variants)
+        etag = variant_etag(asset.etag, encoding)
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        elif asset.body is None:
+            response = send_file(asset.path, mimetype=asset.mimetype, conditional=False)
+        else:
+            response = Response(asset.variants.get(encoding, asset.body), mimetype=asset.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        return response
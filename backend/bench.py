@@ -0,0 +1,386 @@
+"""HTTP benchmark for the Flask app.
+
+    python bench.py --scale 10 --concurrency 8 --requests 200
+    python bench.py --no-seed --compare bench-results/before.json
+
+Seeds a throwaway database (DB_NAME, default ``abaad_bench``) with
+generate_data.py, serves the app in-process on a free local port, logs in
+as admin and drives every listing, detail, /query/*, add, update,
+delete and bulk import route. For each route it reports throughput, p50/p95/p99 latency,
+and the statement count and database time of the requests it served.
+Results are written as JSON, and --compare prints the change against an
+earlier run.
+"""
+import argparse
+import datetime
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Read-only GET routes that are not part of the benchmark
+SKIPPED_ROUTES = {'/logout', '/login', '/signup', '/about', '/static/<path:filename>', '/media/<path:filename>',
+                  '/<path:path>'}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                                  NoRedirect())
+
+    def request(self, method, path, form=None, json_body=None, upload=None):
+        """``upload`` is a ``(filename, bytes)`` file sent as multipart/form-data along with ``form``."""
+        data, headers = None, {}
+        if json_body is not None:
+            data, headers = json.dumps(json_body).encode(), {'Content-Type': 'application/json'}
+        elif upload is not None:
+            boundary = uuid.uuid4().hex
+            parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+                     for name, value in (form or {}).items()]
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{upload[0]}"\r\n'
+                         f'Content-Type: application/octet-stream\r\n\r\n'.encode() + upload[1] + b'\r\n')
+            data = b''.join(parts) + f'--{boundary}--\r\n'.encode()
+            headers = {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+class ServerStats:
+    """Statement counts and DB time per route, collected from the app's request_finished signal."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def on_request_finished(self, sender, response, **extra):
+        from flask import g, request
+        stats = g.get('query_stats')
+        if stats is None or request.url_rule is None:
+            return
+        with self._lock:
+            self.samples.setdefault((request.method, request.url_rule.rule), []).append((stats.queries, stats.seconds))
+
+    def take(self, method, rule):
+        with self._lock:
+            return self.samples.pop((method, rule), [])
+
+
+def load_ids(db_kwargs):
+    tables = {
+        'Branch': 'BranchID', 'Employee': 'EmployeeID', 'Department': 'DepartmentID', 'Role': 'RoleID',
+        'Client': 'ClientID', 'Project': 'ProjectID', 'Supplier': 'SupplierID', 'Material': 'MaterialID',
+        'Phase': 'PhaseID',
+    }
+    return {table: [row[0] for row in _fetch(db_kwargs, f"SELECT {key} FROM {table} ORDER BY RAND() LIMIT 1000")]
+            for table, key in tables.items()}
+
+
+def max_id(db_kwargs, table, key):
+    return _fetch(db_kwargs, f"SELECT COALESCE(MAX({key}), 0) FROM {table}")[0][0]
+
+
+def ids_after(db_kwargs, table, key, after):
+    return [row[0] for row in _fetch(db_kwargs, f"SELECT {key} FROM {table} WHERE {key} > %s", (after,))]
+
+
+def existing_keys(db_kwargs, table, key, candidates):
+    """The composite keys among ``candidates`` that have a row in ``table``."""
+    if not candidates:
+        return set()
+    columns = ", ".join(key)
+    row = "(" + ", ".join(["%s"] * len(key)) + ")"
+    query = f"SELECT {columns} FROM {table} WHERE ({columns}) IN ({', '.join([row] * len(candidates))})"
+    return set(_fetch(db_kwargs, query, [value for candidate in candidates for value in candidate]))
+
+
+def form_field(column):
+    """The add / update form field for a key column: ProjectID -> project_id."""
+    return column[:-2].lower() + '_id'
+
+
+def _fetch(db_kwargs, query, params=None):
+    conn = pymysql.connect(**db_kwargs)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def write_routes(ids, rng):
+    """(prefix, table, key, form builder) for every entity with add / update / delete routes.
+
+    ``key`` is a column, or a tuple of columns for the link tables, whose
+    update and delete routes take one path segment per key column.
+    """
+    def pick(table):
+        return rng.choice(ids[table])
+
+    def day(offset=0):
+        return (datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randint(0, 300) + offset)).isoformat()
+
+    n = lambda: rng.randint(1, 10 ** 6)
+    return [
+        ('branches', 'Branch', 'BranchID', lambda: {
+            'branch_name': f"Bench Branch {n()}", 'city': 'Ramallah', 'address': 'Bench Street', 'phone': '000'}),
+        ('clients', 'Client', 'ClientID', lambda: {'client_name': f"Bench Client {n()}", 'contact_info': 'bench'}),
+        ('suppliers', 'Supplier', 'SupplierID', lambda: {
+            'supplier_name': f"Bench Supplier {n()}", 'contact_info': 'bench'}),
+        ('materials', 'Material', 'MaterialID', lambda: {
+            'material_name': f"Bench Material {n()}", 'base_unit_price': '12.50', 'unit_of_measure': 'piece'}),
+        ('departments', 'Department', 'DepartmentID', lambda: {
+            'department_name': f"Bench Department {n()}", 'manager_id': ''}),
+        ('employees', 'Employee', 'EmployeeID', lambda: {
+            'employee_name': f"Bench Employee {n()}", 'position_id': pick('Role'), 'salary': '100000',
+            'branch_id': pick('Branch'), 'department_id': pick('Department'), 'manager_id': ''}),
+        ('projects', 'Project', 'ProjectID', lambda: {
+            'project_name': f"Bench Project {n()}", 'location': 'Ramallah', 'cost': '1000', 'revenue': '1500',
+            'project_type': 'building', 'branch_id': pick('Branch'), 'client_id': pick('Client')}),
+        ('contracts', 'Contract', 'ContractID', lambda: {
+            'project_id': pick('Project'), 'client_id': pick('Client'), 'start_date': day(), 'end_date': day(300),
+            'total_value': '50000', 'status': 'active'}),
+        ('phases', 'Phase', 'PhaseID', lambda: {
+            'project_id': pick('Project'), 'name': 'Bench Phase', 'description': 'bench', 'start_date': day(),
+            'end_date': day(60), 'status': 'planned'}),
+        ('schedules', 'Schedule', 'ScheduleID', lambda: {
+            'project_id': pick('Project'), 'phase_id': pick('Phase'), 'start_date': day(), 'end_date': day(10),
+            'task_details': 'bench'}),
+        ('sales', 'Sales', 'SaleID', lambda: {
+            'project_id': pick('Project'), 'client_id': pick('Client'), 'amount': '2500', 'issue_date': day(),
+            'due_date': day(30)}),
+        ('purchases', 'Purchase', 'PurchaseID', lambda: {
+            'supplier_id': pick('Supplier'), 'material_id': pick('Material'), 'quantity': '10',
+            'purchase_date': day(), 'total_cost': '125'}),
+        ('payments', 'Payment', 'PaymentID', lambda: {
+            'from_client': pick('Client'), 'to_supplier': '', 'amount': '1000', 'payment_date': day(),
+            'payment_method': 'Bank Transfer'}),
+        ('work_assignments', 'WorkAssignment', ('ProjectID', 'EmployeeID'), lambda: {
+            'project_id': pick('Project'), 'employee_id': pick('Employee'), 'role': 'Engineer',
+            'hours_worked': '8', 'start_date': day(), 'end_date': ''}),
+        ('project_materials', 'ProjectMaterial', ('ProjectID', 'MaterialID'), lambda: {
+            'project_id': pick('Project'), 'material_id': pick('Material'), 'quantity': '3', 'unit_price': '10'}),
+        ('supplier_materials', 'SupplierMaterial', ('SupplierID', 'MaterialID'), lambda: {
+            'supplier_id': pick('Supplier'), 'material_id': pick('Material'), 'price': '9.75', 'lead_time': '7'}),
+    ]
+
+
+def import_upload(ids, rng, rows):
+    """A JSON Lines file of ``rows`` new projects for /import/projects."""
+    lines = [json.dumps({
+        'ProjectName': f"Bench Import {rng.randint(1, 10 ** 6)}", 'Location': 'Ramallah', 'Cost': '1000',
+        'Revenue': '1500', 'ProjectType': 'building', 'BranchID': rng.choice(ids['Branch']),
+        'ClientID': rng.choice(ids['Client'])}) for _ in range(rows)]
+    return 'bench.jsonl', '\n'.join(lines).encode()
+
+
+def run_route(client, server_stats, method, rule, requests, concurrency):
+    """Fire ``requests`` = [(path, form)] or [(path, form, upload)] at one route and summarize them."""
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def one(item):
+        path, form, *upload = item
+        started = time.perf_counter()
+        status = client.request(method, path, form=form, upload=upload[0] if upload else None)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, requests))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    samples = server_stats.take(method, rule)
+    ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None
+    return {
+        'method': method,
+        'requests': len(requests),
+        'errors': sum(count for status, count in statuses.items() if status >= 500),
+        'status': {str(status): count for status, count in sorted(statuses.items())},
+        'throughput_rps': round(len(requests) / wall, 1) if wall else None,
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 0.50)),
+            'p95': ms(percentile(latencies, 0.95)),
+            'p99': ms(percentile(latencies, 0.99)),
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'max': ms(latencies[-1]) if latencies else None,
+        },
+        'queries_per_request': round(sum(q for q, _ in samples) / len(samples), 2) if samples else None,
+        'db_ms_per_request': ms(sum(s for _, s in samples) / len(samples)) if samples else None,
+    }
+
+
+def compare(base, current):
+    print(f"{'route':<52} {'p50 ms':>16} {'p95 ms':>16} {'rps':>16} {'queries':>12}")
+    for route, now in current['routes'].items():
+        before = base['routes'].get(route)
+        if before is None:
+            continue
+
+        def cell(old, new, width):
+            if old is None or new is None:
+                return f"{'-':>{width}}"
+            change = f"{(new - old) / old * 100:+.0f}%" if old else ''
+            return f"{new:>{width - 6}} {change:>5}"
+
+        print(f"{route:<52} {cell(before['latency_ms']['p50'], now['latency_ms']['p50'], 16)} "
+              f"{cell(before['latency_ms']['p95'], now['latency_ms']['p95'], 16)} "
+              f"{cell(before['throughput_rps'], now['throughput_rps'], 16)} "
+              f"{cell(before['queries_per_request'], now['queries_per_request'], 12)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100, help='requests per read route')
+    parser.add_argument('--writes', type=int, default=20, help='requests per write route')
+    parser.add_argument('--import-rows', type=int, default=200, help='rows per bulk import request')
+    parser.add_argument('--database', default=os.environ.get('BENCH_DB_NAME', 'abaad_bench'),
+                        help='throwaway database to seed and run against')
+    parser.add_argument('--admin-password', default='bench-admin')
+    parser.add_argument('--no-seed', action='store_true', help='reuse the database from a previous run')
+    parser.add_argument('--fast-seed', action='store_true', help='seed with generate_data.py --fast')
+    parser.add_argument('--only', help='only run routes whose rule contains this text')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--out', help='result file (default bench-results/<timestamp>-<scale>x.json)')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args()
+
+    # The app and the seeding scripts read their database from the environment
+    os.environ['DB_NAME'] = args.database
+    if not args.no_seed:
+        command = [sys.executable, os.path.join(HERE, 'generate_data.py'), '--scale', str(args.scale),
+                   '--admin-password', args.admin_password]
+        if args.fast_seed:
+            command.append('--fast')
+        print(f"Seeding {args.database} at {args.scale}x ...", flush=True)
+        subprocess.run(command, check=True, cwd=HERE)
+
+    sys.path.insert(0, HERE)
+    from flask import request_finished
+    from werkzeug.serving import make_server
+    import hello
+
+    server_stats = ServerStats()
+    request_finished.connect(server_stats.on_request_finished, hello.app)
+    server = make_server('127.0.0.1', 0, hello.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = Client(f"http://127.0.0.1:{server.server_port}")
+    if client.request('POST', '/api/login', json_body={'username': 'admin', 'password': args.admin_password}) != 200:
+        sys.exit("Could not log in as admin; seed the database or pass --admin-password")
+
+    rng = random.Random(args.seed)
+    db_kwargs = dict(hello.db_pool.connect_kwargs)
+    db_kwargs.pop('cursorclass', None)
+    ids = load_ids(db_kwargs)
+    rules = {rule.rule.split('<')[0]: rule.rule for rule in hello.app.url_map.iter_rules()}
+    results = {}
+
+    def bench(method, rule, requests):
+        if not requests or (args.only and args.only not in rule):
+            return
+        result = run_route(client, server_stats, method, rule, requests, args.concurrency)
+        results[f"{method} {rule}"] = result
+        print(f"{method:<5} {rule:<52} {result['throughput_rps'] or 0:>8} rps  "
+              f"p50 {result['latency_ms']['p50']}ms  p95 {result['latency_ms']['p95']}ms  "
+              f"p99 {result['latency_ms']['p99']}ms  queries {result['queries_per_request']}  "
+              f"db {result['db_ms_per_request']}ms  errors {result['errors']}", flush=True)
+
+    for rule in sorted(r.rule for r in hello.app.url_map.iter_rules()
+                       if 'GET' in r.methods and not r.arguments and r.rule not in SKIPPED_ROUTES):
+        bench('GET', rule, [(rule, None)] * args.requests)
+    bench('GET', rules['/projects/'], [(f"/projects/{rng.choice(ids['Project'])}", None)
+                                       for _ in range(args.requests)])
+
+    for prefix, table, key, build in write_routes(ids, rng):
+        forms = [build() for _ in range(args.writes)]
+        if isinstance(key, tuple):
+            candidates = {tuple(int(form[form_field(column)]) for column in key) for form in forms}
+            before = existing_keys(db_kwargs, table, key, candidates)
+        else:
+            before = max_id(db_kwargs, table, key)
+        bench('POST', f"/{prefix}/add", [(f"/{prefix}/add", form) for form in forms])
+
+        # Update and then delete exactly the rows this run added
+        if isinstance(key, tuple):
+            created = sorted(existing_keys(db_kwargs, table, key, candidates) - before)
+            # Updates keep the row's key so the deletes still find it
+            updates = [dict(build(), **{form_field(column): value for column, value in zip(key, row_key)})
+                       for row_key in created]
+            paths = ["/".join(str(value) for value in row_key) for row_key in created]
+        else:
+            created = ids_after(db_kwargs, table, key, before)
+            updates = [build() for _ in created]
+            paths = [str(row_id) for row_id in created]
+        bench('POST', rules[f"/{prefix}/update/"], [(f"/{prefix}/update/{path}", form)
+                                                   for path, form in zip(paths, updates)])
+        bench('POST', rules[f"/{prefix}/delete/"], [(f"/{prefix}/delete/{path}", {}) for path in paths])
+
+    # Bulk import: each request uploads a JSON Lines file of new projects
+    bench('POST', rules['/import/'], [("/import/projects", None, import_upload(ids, rng, args.import_rows))
+                                      for _ in range(args.writes)])
+
+    server.shutdown()
+    output = {
+        'meta': {
+            'started': datetime.datetime.now().isoformat(timespec='seconds'),
+            'database': args.database,
+            'scale': args.scale,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'writes': args.writes,
+        },
+        'routes': results,
+    }
+    out = args.out or os.path.join('bench-results', f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{args.scale}x.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+# Versions start from the creation time in milliseconds, so a recreated
+# database never reuses the versions (and so the ETags) of the one it replaced
+VERSION_SEED = "ROUND(UNIX_TIMESTAMP(NOW(3)) * 1000)"
+
+
+def load_table_versions(cursor):
+    cursor.execute("SELECT TableName, Version FROM TableVersion")
+    return dict(cursor.fetchall())
+
+
+def bump_table_versions(cursor, tables):
+    """Bump ``tables``' rows in TableVersion as part of the caller's transaction.
+
+    The new versions become visible exactly when the write they describe
+    commits. Rows are locked in name order so two writers cannot deadlock.
+    """
+    tables = sorted(set(tables))
+    if not tables:
+        return
+    rows = ", ".join([f"(%s, {VERSION_SEED})"] * len(tables))
+    cursor.execute(f"INSERT INTO TableVersion (TableName, Version) VALUES {rows} "
+                   "ON DUPLICATE KEY UPDATE Version = Version + 1", tables)
+
+
+class TableVersions:
+    """Per-table change counters, kept in the database's TableVersion table.
+
+    Every write bumps its tables' rows in its own transaction, so all
+    worker processes see the same versions. Anything derived from table
+    data can remember the versions it was built from and treat itself as
+    stale as soon as one of them moves. ``load()`` returns the current
+    ``{table: version}`` (the app reads it once per request), or None when
+    the database has no TableVersion table, in which case nothing can be
+    validated and snapshots are None.
+    """
+
+    def __init__(self, load):
+        self.load = load
+
+    def get(self, table):
+        versions = self.load()
+        return None if versions is None else versions.get(table, 0)
+
+    def snapshot(self, tables):
+        versions = self.load()
+        if versions is None:
+            return None
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def etag(self, tables, *parts):
+        """An opaque validator for a response built from ``tables`` and whatever else ``parts`` names, or None."""
+        snapshot = self.snapshot(tables)
+        if snapshot is None:
+            return None
+        raw = repr((tuple(tables), snapshot, parts))
+        return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+class VersionedCache:
+    """In-process cache whose entries are valid while their source tables are unchanged.
+
+    With a ``ttl`` an entry is also reloaded once it is that many seconds
+    old, which bounds how long a write that never bumped a version (manual
+    SQL, say) can go unnoticed.
+    """
+
+    def __init__(self, versions, ttl=None):
+        self.versions = versions
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def get(self, key, tables):
+        """The cached value if it is still current, else None (the miss is counted by the load that follows)."""
+        snapshot = self.versions.snapshot(tables)
+        entry = self._entries.get(key)
+        if self._current(entry, snapshot):
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def get_or_load(self, key, tables, loader):
+        # Take the snapshot before loading: a write that lands while we load
+        # bumps past it, so the next reader reloads instead of trusting us
+        snapshot = self.versions.snapshot(tables)
+        entry = self._entries.get(key)
+        if self._current(entry, snapshot):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        value = loader()
+        if snapshot is not None:
+            self._entries[key] = (snapshot, value, expires)
+        return value
+
+    @staticmethod
+    def _current(entry, snapshot):
+        if snapshot is None or entry is None or entry[0] != snapshot:
+            return False
+        return entry[2] is None or entry[2] > time.monotonic()
+
+    def clear(self):
+        self._entries.clear()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
@@ -0,0 +1,273 @@
+import contextvars
+import threading
+import time
+from collections import deque
+
+import pymysql
+import pymysql.cursors
+from pymysql.constants import SERVER_STATUS
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded pool of PyMySQL connections shared by all request threads.
+
+    Connections are created lazily up to ``max_size``. A connection that has
+    been idle longer than ``ping_interval`` seconds is pinged before being
+    handed out, and one older than ``recycle`` seconds is replaced outright,
+    so connections dropped by the server (wait_timeout, restarts) never
+    reach a route.
+    """
+
+    def __init__(self, max_size=10, timeout=10.0, recycle=3600, ping_interval=30, **connect_kwargs):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.connect_kwargs = connect_kwargs
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        # Cumulative counters, updated under the condition the acquire path already holds
+        self._acquired = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+        self._timeouts = 0
+
+    def _connect(self):
+        conn = pymysql.connect(**self.connect_kwargs)
+        conn._pool_created_at = time.monotonic()
+        return conn
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, last_used):
+        now = time.monotonic()
+        if now - conn._pool_created_at > self.recycle:
+            return False
+        if now - last_used > self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def acquire(self, block=True):
+        """Check out a connection; with ``block=False``, return None instead of waiting for one."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self._cond:
+                waited = False
+                while not self._idle and self._size >= self.max_size:
+                    if not block:
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._wait_seconds += time.monotonic() - started
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+                if waited:
+                    self._waited += 1
+                    self._wait_seconds += time.monotonic() - started
+                self._acquired += 1
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    conn, last_used = None, None
+                    self._size += 1
+                self._in_use += 1
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+
+            if self._is_healthy(conn, last_used):
+                return conn
+
+            # Stale connection: replace it without giving up our slot
+            self._close_quietly(conn)
+            try:
+                return self._connect()
+            except Exception:
+                self._forget()
+                raise
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def release(self, conn, discard=False):
+        if not discard and conn.open:
+            try:
+                # End any transaction (including the implicit read snapshot
+                # opened by a SELECT) so the next borrower sees fresh data
+                if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        else:
+            discard = True
+
+        if discard:
+            self._close_quietly(conn)
+            self._forget()
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_quietly(conn)
+                self._size -= 1
+
+    def stats(self):
+        with self._cond:
+            return {'size': self._size, 'in_use': self._in_use, 'idle': len(self._idle), 'max_size': self.max_size,
+                    'acquired': self._acquired, 'waited': self._waited, 'wait_seconds': self._wait_seconds,
+                    'timeouts': self._timeouts}
+
+
+class SchemaRegistry:
+    """Column sets of the current database's tables, read from information_schema.
+
+    Loaded once (at startup or on the first lookup) and again only on an
+    explicit refresh, so write paths can branch on optional columns without
+    a metadata round trip per statement.
+    """
+
+    def __init__(self):
+        self._columns = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._columns is not None
+
+    def refresh(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT TABLE_NAME, COLUMN_NAME
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+            """)
+            columns = {}
+            for table, column in cursor.fetchall():
+                columns.setdefault(table, set()).add(column)
+        with self._lock:
+            self._columns = columns
+
+    def has_table(self, table):
+        return table in self._columns
+
+    def has_column(self, table, column):
+        return column in self._columns.get(table, ())
+
+    def tables(self):
+        return sorted(self._columns)
+
+    def columns(self, table):
+        return sorted(self._columns.get(table, ()))
+
+
+_query_stats = contextvars.ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """Statements run and time spent in the database for one unit of work (normally a request)."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.slowest_seconds = 0.0
+        self.slowest_query = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds, query=None, rows=0):
+        with self._lock:
+            self.queries += 1
+            self.seconds += seconds
+            self.rows += rows
+            if seconds >= self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_query = query
+
+
+def start_query_stats():
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+def stop_query_stats():
+    _query_stats.set(None)
+
+
+class _Instrumented:
+    """Charges each statement to the QueryStats active in the current context, if any.
+
+    Statements slower than ``slow_query_log.threshold`` seconds are also
+    handed to ``slow_query_log`` when one is installed.
+    """
+
+    slow_query_log = None
+
+    def _rows_read(self):
+        return self.rowcount
+
+    def execute(self, query, args=None):
+        stats = _query_stats.get()
+        slow_log = self.slow_query_log
+        if stats is None and slow_log is None:
+            return super().execute(query, args)
+        started = time.perf_counter()
+        rows = 0
+        try:
+            result = super().execute(query, args)
+            if self.description:
+                rows = self._rows_read()
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            if stats is not None:
+                stats.record(seconds, query, rows)
+            if slow_log is not None and seconds >= slow_log.threshold:
+                slow_log.record(self, query, args, seconds)
+
+
+class InstrumentedCursor(_Instrumented, pymysql.cursors.Cursor):
+    pass
+
+
+class InstrumentedSSCursor(_Instrumented, pymysql.cursors.SSCursor):
+    """Unbuffered: rows are read from the server as they are fetched.
+
+    Its time is only that of the statement up to the first row, and its
+    row count is unknown when ``execute`` returns (pymysql reports -1 as
+    an unsigned value), so no rows are charged for it. The connection
+    cannot run anything else until every row is read or the cursor closed.
+    """
+
+    def _rows_read(self):
+        return 0
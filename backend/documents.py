@@ -0,0 +1,67 @@
+"""Aggregate loaders: a whole page's worth of related rows, fetched concurrently.
+
+Each loader's SELECTs are independent single statements run through a
+FanOut (fanout.py): the first on the request's own cursor, the rest on
+pooled connections of their own, so the page waits about as long as its
+slowest query rather than the sum of them. Every value is passed as a
+bound parameter.
+"""
+
+PROJECT = """
+    SELECT p.*, b.BranchName, c.ClientName
+    FROM Project p
+    JOIN Branch b ON p.BranchID = b.BranchID
+    JOIN Client c ON p.ClientID = c.ClientID
+    WHERE p.ProjectID = %s
+"""
+
+PROJECT_ASSIGNMENTS = """
+    SELECT wa.*, e.EmployeeName, r.Title as Position
+    FROM WorkAssignment wa
+    JOIN Employee e ON wa.EmployeeID = e.EmployeeID
+    JOIN Role r ON e.PositionID = r.RoleID
+    WHERE wa.ProjectID = %s
+"""
+
+PROJECT_MATERIALS = """
+    SELECT pm.*, m.MaterialName, m.UnitOfMeasure, pm.Quantity * pm.UnitPrice AS LineCost
+    FROM ProjectMaterial pm
+    JOIN Material m ON pm.MaterialID = m.MaterialID
+    WHERE pm.ProjectID = %s
+"""
+
+PROJECT_MATERIAL_TOTAL = """
+    SELECT COALESCE(SUM(Quantity * UnitPrice), 0) AS TotalMaterialCost
+    FROM ProjectMaterial
+    WHERE ProjectID = %s
+"""
+
+
+def fetch_dicts(cursor, query, args=None):
+    cursor.execute(query, args)
+    cols = [c[0] for c in cursor.description]
+    return [dict(zip(cols, r)) for r in cursor.fetchall()]
+
+
+def load_project_document(cursor, fan_out, project_id):
+    """The project with its branch/client names, assignments and materials, or None if it does not exist.
+
+    ``total_material_cost`` is summed by the server, so it is an exact
+    Decimal like the DECIMAL columns it comes from.
+    """
+    def query(sql):
+        return lambda cur: fetch_dicts(cur, sql, (project_id,))
+
+    project, related = fan_out.run(cursor, query(PROJECT), {
+        'assignments': query(PROJECT_ASSIGNMENTS),
+        'materials': query(PROJECT_MATERIALS),
+        'totals': query(PROJECT_MATERIAL_TOTAL),
+    })
+    if not project:
+        return None
+    return {
+        'project': project[0],
+        'assignments': related['assignments'],
+        'materials': related['materials'],
+        'total_material_cost': related['totals'][0]['TotalMaterialCost'],
+    }
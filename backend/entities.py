@@ -0,0 +1,301 @@
+import datetime
+from decimal import Decimal, InvalidOperation
+
+
+class Field:
+    """One writable column of an entity.
+
+    ``ref`` names the table a foreign key points at; such a column accepts
+    either the ID itself or, under ``alias``, the referenced row's name.
+    A ``secret`` column (a password) is hashed on write and never read back.
+    """
+
+    def __init__(self, column, kind='str', required=False, default=None, ref=None, alias=None, secret=False):
+        self.column = column
+        self.kind = kind
+        self.required = required
+        self.default = default
+        self.ref = ref
+        self.alias = alias
+        self.secret = secret
+
+
+class Entity:
+    """One table as exposed to imports and the JSON API.
+
+    ``key`` is the primary key column, or a tuple of columns for a
+    composite key. ``filters`` maps a listing's ``filter_*`` argument to
+    the column it must equal, or to a function of the argument's value
+    returning ``(condition, params)`` (or None to ignore it). ``sorts``
+    maps the ``sort_by`` names a listing accepts to SQL expressions; rows
+    are always ordered by the key last.
+    """
+
+    def __init__(self, name, table, key, fields, name_column=None, filters=None, sorts=None,
+                 default_sort=None, default_order='asc'):
+        self.name = name
+        self.table = table
+        self.key = key
+        self.fields = fields
+        self.name_column = name_column
+        self.filters = filters or {}
+        self.sorts = sorts or {}
+        self.default_sort = default_sort
+        self.default_order = default_order
+
+    @property
+    def key_columns(self):
+        return (self.key,) if isinstance(self.key, str) else tuple(self.key)
+
+    @property
+    def auto_key(self):
+        """True when the database assigns the key (a single AUTO_INCREMENT column)."""
+        return isinstance(self.key, str)
+
+
+_TRUE = {'1', 'true', 'yes', 'y', 'on'}
+_FALSE = {'0', 'false', 'no', 'n', 'off', ''}
+
+
+def _exists(subquery):
+    """A yes/no filter on whether ``subquery`` finds a related row."""
+    def condition(value):
+        if value == 'yes':
+            return f"EXISTS ({subquery})", []
+        if value == 'no':
+            return f"NOT EXISTS ({subquery})", []
+        return None
+    return condition
+
+
+def _is_manager(value):
+    return "IsManager = %s", [value == 'true']
+
+
+def _payment_type(value):
+    if value == 'client':
+        return "FromClient IS NOT NULL", []
+    if value == 'supplier':
+        return "ToSupplier IS NOT NULL", []
+    return None
+
+
+def coerce(field, value):
+    """Convert a raw (string or JSON) value to what the column stores; raise ValueError if it does not fit."""
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == '':
+        if field.kind == 'bool':
+            return False if field.default is None else field.default
+        if field.required and field.default is None:
+            raise ValueError(f"{field.column} is required")
+        return field.default
+    if field.kind == 'str':
+        return str(value)
+    if field.kind == 'int':
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"{field.column} must be an integer")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field.column} must be an integer")
+    if field.kind == 'decimal':
+        try:
+            number = Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError(f"{field.column} must be a number")
+        if not number.is_finite():
+            raise ValueError(f"{field.column} must be a number")
+        return number
+    if field.kind == 'date':
+        if isinstance(value, datetime.date):
+            return value
+        try:
+            return datetime.date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"{field.column} must be a date (YYYY-MM-DD)")
+    if field.kind == 'bool':
+        if isinstance(value, bool):
+            return value
+        text = str(value).lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+        raise ValueError(f"{field.column} must be true or false")
+    raise ValueError(f"Unknown field kind {field.kind}")
+
+
+ENTITIES = {entity.name: entity for entity in [
+    Entity('branches', 'Branch', 'BranchID', [
+        Field('BranchName', required=True),
+        Field('City', required=True),
+        Field('Address', required=True),
+        Field('PhoneNumber', required=True),
+    ], name_column='BranchName', filters={'filter_city': 'City'},
+       sorts={'BranchName': 'BranchName'}, default_sort='BranchName'),
+    Entity('roles', 'Role', 'RoleID', [
+        Field('Title', required=True),
+    ], name_column='Title', sorts={'Title': 'Title'}, default_sort='Title'),
+    Entity('departments', 'Department', 'DepartmentID', [
+        Field('DepartmentName', required=True),
+        Field('ManagerID', 'int', ref='Employee', alias='ManagerName'),
+    ], name_column='DepartmentName', filters={'filter_manager': 'ManagerID'},
+       sorts={'DepartmentName': 'DepartmentName'}, default_sort='DepartmentName'),
+    Entity('employees', 'Employee', 'EmployeeID', [
+        Field('EmployeeName', required=True),
+        Field('PositionID', 'int', required=True, ref='Role', alias='Position'),
+        Field('Salary', 'decimal', required=True),
+        Field('BranchID', 'int', required=True, ref='Branch'),
+        Field('DepartmentID', 'int', required=True, ref='Department'),
+        Field('ManagerID', 'int', ref='Employee', alias='ManagerName'),
+        Field('IsManager', 'bool'),
+    ], name_column='EmployeeName', filters={
+        'filter_branch': 'BranchID', 'filter_department': 'DepartmentID', 'filter_role': 'PositionID',
+        'filter_manager': 'ManagerID', 'filter_is_manager': _is_manager,
+    }, sorts={'EmployeeName': 'EmployeeName', 'Salary': 'Salary'}, default_sort='EmployeeName'),
+    Entity('clients', 'Client', 'ClientID', [
+        Field('ClientName', required=True),
+        Field('ContactInfo', required=True),
+    ], name_column='ClientName', filters={
+        'filter_has_projects': _exists("SELECT 1 FROM Project p WHERE p.ClientID = Client.ClientID"),
+    }, sorts={'ClientName': 'ClientName'}, default_sort='ClientName'),
+    Entity('projects', 'Project', 'ProjectID', [
+        Field('ProjectName', required=True),
+        Field('Location', required=True),
+        Field('Cost', 'decimal', default=Decimal('0')),
+        Field('Revenue', 'decimal', required=True),
+        Field('ProjectType', default='building'),
+        Field('BranchID', 'int', required=True, ref='Branch'),
+        Field('ClientID', 'int', required=True, ref='Client'),
+    ], name_column='ProjectName', filters={
+        'filter_type': 'ProjectType', 'filter_branch': 'BranchID', 'filter_client': 'ClientID',
+    }, sorts={'Cost': 'COALESCE(Cost, 0)', 'Revenue': 'Revenue'}),
+    Entity('materials', 'Material', 'MaterialID', [
+        Field('MaterialName', required=True),
+        Field('BaseUnitPrice', 'decimal', required=True),
+        Field('UnitOfMeasure', required=True),
+    ], name_column='MaterialName', filters={'filter_unit': 'UnitOfMeasure'},
+       sorts={'MaterialName': 'MaterialName', 'BaseUnitPrice': 'BaseUnitPrice'}, default_sort='MaterialName'),
+    Entity('suppliers', 'Supplier', 'SupplierID', [
+        Field('SupplierName', required=True),
+        Field('ContactInfo', required=True),
+    ], name_column='SupplierName', filters={
+        'filter_has_materials': _exists("SELECT 1 FROM SupplierMaterial sm WHERE sm.SupplierID = Supplier.SupplierID"),
+    }, sorts={'SupplierName': 'SupplierName'}, default_sort='SupplierName'),
+    Entity('work_assignments', 'WorkAssignment', ('ProjectID', 'EmployeeID'), [
+        Field('ProjectID', 'int', required=True, ref='Project'),
+        Field('EmployeeID', 'int', required=True, ref='Employee'),
+        Field('Role', required=True),
+        Field('HoursWorked', 'decimal', default=Decimal('0')),
+        Field('StartDate', 'date', required=True),
+        Field('EndDate', 'date'),
+    ], filters={'filter_project': 'ProjectID', 'filter_employee': 'EmployeeID'},
+       sorts={'StartDate': 'StartDate'}, default_sort='StartDate', default_order='desc'),
+    Entity('project_materials', 'ProjectMaterial', ('ProjectID', 'MaterialID'), [
+        Field('ProjectID', 'int', required=True, ref='Project'),
+        Field('MaterialID', 'int', required=True, ref='Material'),
+        Field('Quantity', 'decimal', required=True),
+        Field('UnitPrice', 'decimal', required=True),
+    ], filters={'filter_project': 'ProjectID', 'filter_material': 'MaterialID'},
+       sorts={'UnitPrice': 'UnitPrice', 'TotalCost': '(Quantity * UnitPrice)'}, default_sort='UnitPrice'),
+    Entity('supplier_materials', 'SupplierMaterial', ('SupplierID', 'MaterialID'), [
+        Field('SupplierID', 'int', required=True, ref='Supplier'),
+        Field('MaterialID', 'int', required=True, ref='Material'),
+        Field('Price', 'decimal', required=True),
+        Field('LeadTime', 'int'),
+    ], filters={'filter_supplier': 'SupplierID', 'filter_material': 'MaterialID'},
+       sorts={'Price': 'Price'}, default_sort='Price'),
+    Entity('contracts', 'Contract', 'ContractID', [
+        Field('ProjectID', 'int', required=True, ref='Project'),
+        Field('ClientID', 'int', required=True, ref='Client'),
+        Field('StartDate', 'date', required=True),
+        Field('EndDate', 'date'),
+        Field('TotalValue', 'decimal', required=True),
+        Field('Status', default='active'),
+    ], filters={'filter_status': 'Status', 'filter_project': 'ProjectID', 'filter_client': 'ClientID'},
+       sorts={'TotalValue': 'TotalValue'}, default_sort='TotalValue', default_order='desc'),
+    Entity('phases', 'Phase', 'PhaseID', [
+        Field('ProjectID', 'int', required=True, ref='Project'),
+        Field('Name', required=True),
+        Field('Description'),
+        Field('StartDate', 'date', required=True),
+        Field('EndDate', 'date'),
+        Field('Status', default='planned'),
+    ], name_column='Name', filters={'filter_project': 'ProjectID', 'filter_status': 'Status'},
+       default_order='desc'),
+    Entity('schedules', 'Schedule', 'ScheduleID', [
+        Field('ProjectID', 'int', required=True, ref='Project'),
+        Field('PhaseID', 'int', required=True, ref='Phase', alias='PhaseName'),
+        Field('StartDate', 'date', required=True),
+        Field('EndDate', 'date'),
+        Field('TaskDetails'),
+    ], filters={'filter_project': 'ProjectID', 'filter_phase': 'PhaseID'}, default_order='desc'),
+    Entity('sales', 'Sales', 'SaleID', [
+        Field('ProjectID', 'int', required=True, ref='Project'),
+        Field('ClientID', 'int', required=True, ref='Client'),
+        Field('Amount', 'decimal', required=True),
+        Field('IssueDate', 'date', required=True),
+        Field('DueDate', 'date'),
+    ], filters={'filter_project': 'ProjectID', 'filter_client': 'ClientID'},
+       sorts={'Amount': 'Amount'}, default_order='desc'),
+    Entity('project_suppliers', 'Project_Suppliers', ('ProjectID', 'SupplierID'), [
+        Field('ProjectID', 'int', required=True, ref='Project'),
+        Field('SupplierID', 'int', required=True, ref='Supplier'),
+    ], filters={'filter_project': 'ProjectID', 'filter_supplier': 'SupplierID'}),
+    Entity('purchases', 'Purchase', 'PurchaseID', [
+        Field('SupplierID', 'int', required=True, ref='Supplier'),
+        Field('MaterialID', 'int', required=True, ref='Material'),
+        Field('Quantity', 'decimal', required=True),
+        Field('PurchaseDate', 'date', required=True),
+        Field('TotalCost', 'decimal', required=True),
+    ], filters={'filter_supplier': 'SupplierID', 'filter_material': 'MaterialID'},
+       sorts={'TotalCost': 'TotalCost'}, default_sort='TotalCost', default_order='desc'),
+    Entity('payments', 'Payment', 'PaymentID', [
+        Field('FromClient', 'int', ref='Client', alias='FromClientName'),
+        Field('ToSupplier', 'int', ref='Supplier', alias='ToSupplierName'),
+        Field('Amount', 'decimal', required=True),
+        Field('PaymentDate', 'date', required=True),
+        Field('PaymentMethod', required=True),
+    ], filters={'filter_type': _payment_type, 'filter_client': 'FromClient', 'filter_supplier': 'ToSupplier'},
+       sorts={'Amount': 'Amount'}, default_sort='Amount', default_order='desc'),
+    Entity('users', 'User', 'UserID', [
+        Field('Username', required=True),
+        Field('Email', required=True),
+        Field('Password', required=True, secret=True),
+    ], name_column='Username', sorts={'Username': 'Username'}, default_sort='Username'),
+]}
+
+ENTITIES_BY_TABLE = {entity.table: entity for entity in ENTITIES.values()}
+
+for _entity in ENTITIES.values():
+    for _field in _entity.fields:
+        if _field.ref and _field.alias is None:
+            _field.alias = ENTITIES_BY_TABLE[_field.ref].name_column
+
+
+# Tables whose rows are removed or nulled out by ON DELETE CASCADE / SET NULL
+# when a row of the key table is deleted
+DELETE_CASCADES = {
+    'Branch': ['Employee', 'Project'],
+    'Role': ['Employee'],
+    'Department': ['Employee'],
+    'Employee': ['Employee', 'Department', 'WorkAssignment'],
+    'Client': ['Project', 'Contract', 'Sales', 'Payment'],
+    'Project': ['WorkAssignment', 'ProjectMaterial', 'Contract', 'Phase', 'Schedule', 'Sales', 'Project_Suppliers'],
+    'Phase': ['Schedule'],
+    'Material': ['ProjectMaterial', 'SupplierMaterial', 'Purchase'],
+    'Supplier': ['SupplierMaterial', 'Project_Suppliers', 'Purchase', 'Payment'],
+}
+
+
+def cascaded_tables(*tables):
+    """The given tables plus every table a delete from them cascades into."""
+    changed = set(tables)
+    pending = list(tables)
+    while pending:
+        for child in DELETE_CASCADES.get(pending.pop(), []):
+            if child not in changed:
+                changed.add(child)
+                pending.append(child)
+    return changed
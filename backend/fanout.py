@@ -0,0 +1,54 @@
+"""Concurrent read fan-out for pages that run several independent queries.
+
+The page's main statement runs on the caller's own cursor while the
+others run on worker threads, each on a connection of its own from the
+shared pool, so the page waits about as long as its slowest query.
+Workers run in a copy of the caller's context, so their statements are
+charged to the request's QueryStats. A worker checks out its connection
+only once it starts, so queued statements hold none. A statement whose
+worker finds the pool without idle capacity, or that is still queued
+when the main one finishes, runs on the caller's cursor instead, which
+means neither a busy pool nor a busy executor blocks a request on its
+own fan-out.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+
+# Returned by a worker that found no idle connection to run on
+_NO_CONNECTION = object()
+
+
+class FanOut:
+    def __init__(self, pool, max_workers=4):
+        self.pool = pool
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-fanout')
+
+    def _call(self, fn):
+        conn = self.pool.acquire(block=False)
+        if conn is None:
+            return _NO_CONNECTION
+        discard = False
+        try:
+            with conn.cursor() as cursor:
+                return fn(cursor)
+        except pymysql.err.OperationalError:
+            discard = True
+            raise
+        finally:
+            self.pool.release(conn, discard=discard)
+
+    def run(self, cursor, main, others):
+        """Return ``main(cursor)`` and ``{name: fn(cursor)}`` for each of ``others``, run concurrently."""
+        futures = {name: self._executor.submit(contextvars.copy_context().run, self._call, fn)
+                   for name, fn in others.items()}
+        result = main(cursor)
+        results = {}
+        for name, future in futures.items():
+            value = _NO_CONNECTION if future.cancel() else future.result()
+            results[name] = others[name](cursor) if value is _NO_CONNECTION else value
+        return result, results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
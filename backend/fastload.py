@@ -0,0 +1,131 @@
+"""Bulk-load session: load into bare tables, then put the indexes back.
+
+``FastLoad`` reads the current database's secondary indexes and foreign
+keys from information_schema, drops them, and turns off FK and unique
+checks for the session. On exit it rebuilds each table's indexes in one
+ALTER, then re-adds the foreign keys with checks still off. The loaded
+data must already be consistent, because the keys are not re-validated.
+"""
+import os
+import tempfile
+import time
+
+# Multi-row INSERT size for bulk loads; stays under the default max_allowed_packet
+FAST_STMT_LENGTH = 8 * 1024 * 1024
+
+
+def secondary_indexes(cursor):
+    cursor.execute("""
+        SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME, SUB_PART
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME <> 'PRIMARY'
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """)
+    indexes = {}
+    for table, name, non_unique, column, sub_part in cursor.fetchall():
+        index = indexes.setdefault(table, {}).setdefault(name, {'unique': not non_unique, 'columns': []})
+        index['columns'].append(f"`{column}`({sub_part})" if sub_part else f"`{column}`")
+    return indexes
+
+
+def foreign_keys(cursor):
+    cursor.execute("""
+        SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME,
+               r.DELETE_RULE, r.UPDATE_RULE
+        FROM information_schema.KEY_COLUMN_USAGE k
+        JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+          ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+         AND r.TABLE_NAME = k.TABLE_NAME
+        WHERE k.TABLE_SCHEMA = DATABASE() AND k.REFERENCED_TABLE_NAME IS NOT NULL
+        ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION
+    """)
+    keys = {}
+    for table, name, column, ref_table, ref_column, on_delete, on_update in cursor.fetchall():
+        key = keys.setdefault(table, {}).setdefault(name, {
+            'columns': [], 'ref_table': ref_table, 'ref_columns': [], 'on_delete': on_delete, 'on_update': on_update,
+        })
+        key['columns'].append(f"`{column}`")
+        key['ref_columns'].append(f"`{ref_column}`")
+    return keys
+
+
+class FastLoad:
+    def __init__(self, db):
+        self.db = db
+        self.cursor = db.cursor()
+        self.timings = []
+        self._indexes = {}
+        self._foreign_keys = {}
+
+    def _timed(self, label, statements):
+        started = time.monotonic()
+        for statement in statements:
+            self.cursor.execute(statement)
+        self.timings.append((label, None, time.monotonic() - started))
+
+    def __enter__(self):
+        self._indexes = secondary_indexes(self.cursor)
+        self._foreign_keys = foreign_keys(self.cursor)
+        self.cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+        # Foreign keys first: InnoDB will not drop an index a constraint still uses
+        self._timed('drop foreign keys', [
+            f"ALTER TABLE `{table}` " + ", ".join(f"DROP FOREIGN KEY `{name}`" for name in keys)
+            for table, keys in self._foreign_keys.items()
+        ])
+        self._timed('drop indexes', [
+            f"ALTER TABLE `{table}` " + ", ".join(f"DROP INDEX `{name}`" for name in indexes)
+            for table, indexes in self._indexes.items()
+        ])
+        return self
+
+    def __exit__(self, *exc_info):
+        # Always put the schema back, even if the load failed halfway
+        try:
+            self.db.commit()
+            for table, indexes in self._indexes.items():
+                self._timed(f"index {table}", [
+                    f"ALTER TABLE `{table}` " + ", ".join(
+                        f"ADD {'UNIQUE ' if index['unique'] else ''}INDEX `{name}` ({', '.join(index['columns'])})"
+                        for name, index in indexes.items())
+                ])
+            for table, keys in self._foreign_keys.items():
+                self._timed(f"foreign keys {table}", [
+                    f"ALTER TABLE `{table}` " + ", ".join(
+                        f"ADD CONSTRAINT `{name}` FOREIGN KEY ({', '.join(key['columns'])}) "
+                        f"REFERENCES `{key['ref_table']}` ({', '.join(key['ref_columns'])}) "
+                        f"ON DELETE {key['on_delete']} ON UPDATE {key['on_update']}"
+                        for name, key in keys.items())
+                ])
+        finally:
+            self.cursor.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+        return False
+
+
+def _infile_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def load_infile(cursor, table, columns, rows):
+    """Write ``rows`` to a temp TSV file and load it with LOAD DATA LOCAL INFILE; return the row count.
+
+    Needs ``local_infile`` enabled on both the server and the connection.
+    """
+    count = 0
+    handle, path = tempfile.mkstemp(suffix='.tsv', prefix=f"{table}-")
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as out:
+            for row in rows:
+                out.write('\t'.join(_infile_value(value) for value in row) + '\n')
+                count += 1
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table}` CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({', '.join(columns)})", (path,))
+    finally:
+        os.unlink(path)
+    return count
@@ -0,0 +1,425 @@
+"""Synthetic data for load testing.
+
+    python generate_data.py --scale 100
+
+Recreates the database with insertion.py (schema plus the hand-written
+seed rows) and then adds referentially consistent synthetic rows to every
+table, sized by --scale. Popularity is skewed the way real data is: a few
+clients own most projects, some employees sit on far more assignments
+than others, and purchases concentrate on a handful of suppliers. Dates
+lean towards recent years. Rows are generated lazily and sent in
+multi-row INSERT batches. Role is the one table left at its seed rows:
+it is the fixed catalogue of job titles the salary bands are keyed on.
+
+With --fast, secondary indexes and foreign keys are dropped and FK/unique
+checks are switched off for the load, then rebuilt in one pass per table
+(see fastload.py); --infile additionally streams each table through a
+temp file and LOAD DATA LOCAL INFILE.
+
+Connection settings come from DB_HOST / DB_USER / DB_PASSWORD / DB_NAME,
+the same variables the app reads.
+"""
+import argparse
+import datetime
+import math
+import os
+import random
+import runpy
+import time
+from decimal import Decimal
+from itertools import islice
+
+import pymysql
+from werkzeug.security import generate_password_hash
+
+from cache import bump_table_versions
+from fastload import FAST_STMT_LENGTH, FastLoad, load_infile
+from summaries import SUMMARY_TABLES, rebuild_best_prices, rebuild_summaries, recount_dashboard_stats
+
+# Rows added per unit of --scale; child tables follow from their parents
+PER_SCALE = {
+    'Branch': 4,
+    'Department': 2,
+    'Client': 30,
+    'Supplier': 15,
+    'Material': 60,
+    'Employee': 120,
+    'Project': 60,
+    'User': 10,
+    'Purchase': 600,
+    'Payment': 400,
+}
+
+FIRST_DATE = datetime.date(2018, 1, 1)
+LAST_DATE = datetime.date(2025, 12, 31)
+MAX_MONEY = Decimal('9999999999.99')
+
+CITIES = ['Ramallah', 'Nablus', 'Jerusalem', 'Hebron', 'Bethlehem', 'Jenin', 'Tulkarem', 'Qalqilya',
+          'Jericho', 'Salfit', 'Tubas', 'Al-Bireh', 'Beit Jala', 'Birzeit']
+FIRST_NAMES = ['Ahmad', 'Mohammed', 'Omar', 'Khalid', 'Yousef', 'Tariq', 'Sami', 'Rami', 'Fadi', 'Majd',
+               'Fatima', 'Layla', 'Noura', 'Sarah', 'Reem', 'Hanan', 'Dalal', 'Salma', 'Amira', 'Maha']
+LAST_NAMES = ['Amro', 'Haddad', 'Khoury', 'Nasser', 'Saleh', 'Odeh', 'Barghouti', 'Qasem', 'Shalabi',
+              'Hamdan', 'Jaber', 'Darwish', 'Masri', 'Tamimi', 'Zaid', 'Awad', 'Issa', 'Sabbah']
+ORG_WORDS = ['National', 'United', 'Modern', 'Al-Quds', 'Palestine', 'Golden', 'Green', 'Future', 'Eastern']
+CLIENT_KINDS = ['Municipality', 'Holdings', 'Foundation', 'Bank', 'University', 'Hospital', 'Ministry',
+                'Development Co.', 'Real Estate']
+DEPARTMENT_KINDS = ['Engineering', 'Site Operations', 'Procurement', 'Planning', 'Design', 'Quality Control',
+                    'Health & Safety', 'Finance', 'Logistics']
+SUPPLIER_KINDS = ['Building Materials', 'Steel', 'Cement', 'Trading & Supply', 'Hardware', 'Electrical',
+                  'Plumbing', 'Solar Equipment']
+PROJECT_KINDS = {
+    'building': ['Residential Tower', 'School', 'Clinic', 'Office Building', 'Mall', 'Courthouse',
+                 'Student Residences', 'Hotel'],
+    'solar': ['Solar Plant', 'Rooftop PV Array', 'Solar Farm'],
+}
+MATERIALS = [('Concrete Mix', 'm³', 450), ('Steel Rebar', 'ton', 2800), ('Cement', 'bag', 280),
+             ('Bricks', 'piece', 2.5), ('Sand', 'm³', 120), ('Gravel', 'm³', 150), ('Gypsum Board', 'sheet', 45),
+             ('Electrical Wire', 'meter', 15.5), ('PVC Pipe', 'meter', 85), ('Paint', 'gallon', 180),
+             ('Solar Panel', 'piece', 900), ('Inverter', 'piece', 4500), ('Ceramic Tile', 'm²', 60),
+             ('Glass Panel', 'm²', 220), ('Insulation Roll', 'roll', 95)]
+ROLE_SALARIES = {
+    'Construction Worker': 90000, 'Site Supervisor': 120000, 'Engineer': 155000, 'Site Engineer': 150000,
+    'Senior Engineer': 180000, 'Quality Inspector': 130000, 'Procurement Specialist': 140000,
+    'Planning Specialist': 145000, 'Accountant': 110000, 'Project Manager': 195000,
+}
+# Workers dominate headcount; managers are rare
+ROLE_WEIGHTS = {
+    'Construction Worker': 45, 'Site Supervisor': 10, 'Engineer': 12, 'Site Engineer': 10,
+    'Senior Engineer': 5, 'Quality Inspector': 4, 'Procurement Specialist': 4, 'Planning Specialist': 3,
+    'Accountant': 3, 'Project Manager': 4,
+}
+PHASE_NAMES = ['Site Preparation', 'Foundation', 'Structure', 'MEP Installation', 'Finishing', 'Handover']
+PAYMENT_METHODS = ['Bank Transfer', 'Check', 'Cash', 'Credit Card']
+PAYMENT_METHOD_WEIGHTS = [70, 20, 5, 5]
+
+
+def money(value):
+    return min(Decimal(f"{value:.2f}"), MAX_MONEY)
+
+
+def recent_date(rng, start=FIRST_DATE, end=LAST_DATE):
+    """A date in [start, end], skewed towards the end (business grows over time)."""
+    span = (end - start).days
+    return start + datetime.timedelta(days=int(span * rng.betavariate(2.0, 1.2)))
+
+
+def date_between(rng, start, end):
+    return start + datetime.timedelta(days=rng.randint(0, max((end - start).days, 0)))
+
+
+class Skewed:
+    """Picks from ``items`` with fixed random weights, so a few items get most picks."""
+
+    def __init__(self, rng, items, weight):
+        self.items = list(items)
+        self.cum_weights = []
+        total = 0.0
+        for _ in self.items:
+            total += weight(rng)
+            self.cum_weights.append(total)
+
+    def pick(self, rng):
+        return rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def sample(self, rng, k):
+        k = min(k, len(self.items))
+        chosen = set()
+        while len(chosen) < k:
+            chosen.add(self.pick(rng))
+        return list(chosen)
+
+
+class Loader:
+    """Inserts generated rows in multi-row batches and records per-table timings."""
+
+    def __init__(self, db, batch_size, infile=False, stmt_length=None):
+        self.db = db
+        self.cursor = db.cursor()
+        if stmt_length:
+            self.cursor.max_stmt_length = stmt_length
+        self.batch_size = batch_size
+        self.infile = infile
+        self.timings = []
+
+    def next_id(self, table, key):
+        self.cursor.execute(f"SELECT COALESCE(MAX({key}), 0) + 1 FROM {table}")
+        return self.cursor.fetchone()[0]
+
+    def load(self, table, columns, rows):
+        # PyMySQL rewrites executemany on a plain INSERT ... VALUES into
+        # multi-row statements, so each batch is a handful of round trips
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        started = time.monotonic()
+        if self.infile:
+            count = load_infile(self.cursor, table, columns, rows)
+            self.db.commit()
+            self.timings.append((table, count, time.monotonic() - started))
+            return count
+        count = 0
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.cursor.executemany(query, batch)
+            self.db.commit()
+            count += len(batch)
+        self.timings.append((table, count, time.monotonic() - started))
+        return count
+
+
+def generate(db, scale, seed=42, batch_size=5000, admin_password='admin123', infile=False, stmt_length=None):
+    rng = random.Random(seed)
+    loader = Loader(db, batch_size, infile, stmt_length)
+    cursor = loader.cursor
+    counts = {table: per_unit * scale for table, per_unit in PER_SCALE.items()}
+
+    # Branches, clients, suppliers, materials
+    first = loader.next_id('Branch', 'BranchID')
+    branches = []
+    for branch_id in range(first, first + counts['Branch']):
+        city = rng.choice(CITIES)
+        branches.append((branch_id, f"{city} Branch {branch_id}", city, f"{rng.randint(1, 200)} Main Street, {city}",
+                         f"+970-{rng.randint(2, 9)}-{rng.randint(200, 299)}-{rng.randint(1000, 9999)}"))
+    loader.load('Branch', ['BranchID', 'BranchName', 'City', 'Address', 'PhoneNumber'], branches)
+    cursor.execute("SELECT BranchID FROM Branch")
+    branch_ids = [row[0] for row in cursor.fetchall()]
+
+    first = loader.next_id('Client', 'ClientID')
+    client_ids = list(range(first, first + counts['Client']))
+    loader.load('Client', ['ClientID', 'ClientName', 'ContactInfo'], (
+        (client_id, f"{rng.choice(ORG_WORDS)} {rng.choice(CLIENT_KINDS)} {client_id}",
+         f"contact{client_id}@client.ps, +970-2-{rng.randint(200, 299)}-{rng.randint(1000, 9999)}")
+        for client_id in client_ids
+    ))
+    cursor.execute("SELECT ClientID FROM Client")
+    # Heavy-tailed: a few large clients commission most of the projects
+    clients = Skewed(rng, [row[0] for row in cursor.fetchall()], lambda r: r.paretovariate(1.2))
+
+    first = loader.next_id('Supplier', 'SupplierID')
+    supplier_ids = list(range(first, first + counts['Supplier']))
+    loader.load('Supplier', ['SupplierID', 'SupplierName', 'ContactInfo'], (
+        (supplier_id, f"{rng.choice(ORG_WORDS)} {rng.choice(SUPPLIER_KINDS)} Co. {supplier_id}",
+         f"sales{supplier_id}@supplier.ps, +970-2-{rng.randint(200, 299)}-{rng.randint(1000, 9999)}")
+        for supplier_id in supplier_ids
+    ))
+    cursor.execute("SELECT SupplierID FROM Supplier")
+    suppliers = Skewed(rng, [row[0] for row in cursor.fetchall()], lambda r: r.paretovariate(1.5))
+
+    first = loader.next_id('Material', 'MaterialID')
+    new_materials = []
+    for material_id in range(first, first + counts['Material']):
+        name, unit, base = rng.choice(MATERIALS)
+        new_materials.append((material_id, f"{name} Grade {material_id}", money(base * rng.uniform(0.7, 1.4)), unit))
+    loader.load('Material', ['MaterialID', 'MaterialName', 'BaseUnitPrice', 'UnitOfMeasure'], new_materials)
+    cursor.execute("SELECT MaterialID, BaseUnitPrice FROM Material")
+    material_prices = dict(cursor.fetchall())
+    materials = Skewed(rng, material_prices, lambda r: r.paretovariate(2.0))
+
+    loader.load('SupplierMaterial', ['SupplierID', 'MaterialID', 'Price', 'LeadTime'], (
+        (supplier_id, material_id, money(float(base) * rng.uniform(0.8, 1.25)), rng.randint(1, 45))
+        for material_id, _, base, _ in new_materials
+        for supplier_id in suppliers.sample(rng, rng.randint(2, 6))
+    ))
+
+    # Employees: the first few percent are managers the rest report to
+    cursor.execute("SELECT RoleID, Title FROM Role")
+    role_ids = {title: role_id for role_id, title in cursor.fetchall()}
+    cursor.execute("SELECT EmployeeID FROM Employee WHERE IsManager")
+    managers = [row[0] for row in cursor.fetchall()]
+    # New departments are headed by the managers already on staff
+    first = loader.next_id('Department', 'DepartmentID')
+    loader.load('Department', ['DepartmentID', 'DepartmentName', 'ManagerID'], (
+        (dept_id, f"{rng.choice(DEPARTMENT_KINDS)} {rng.choice(CITIES)} {dept_id}",
+         rng.choice(managers) if managers else None)
+        for dept_id in range(first, first + counts['Department'])
+    ))
+    cursor.execute("SELECT DepartmentID FROM Department")
+    dept_ids = [row[0] for row in cursor.fetchall()]
+    titles = [title for title in ROLE_WEIGHTS if title in role_ids]
+    weights = [ROLE_WEIGHTS[title] for title in titles]
+    first = loader.next_id('Employee', 'EmployeeID')
+    manager_count = max(1, counts['Employee'] // 25)
+
+    def employee_rows():
+        for employee_id in range(first, first + counts['Employee']):
+            is_manager = employee_id - first < manager_count
+            title = 'Project Manager' if is_manager and 'Project Manager' in role_ids else rng.choices(titles, weights)[0]
+            salary = money(ROLE_SALARIES.get(title, 120000) * rng.uniform(0.85, 1.25))
+            manager_id = rng.choice(managers) if managers else None
+            yield (employee_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", role_ids[title], salary,
+                   rng.choice(branch_ids), rng.choice(dept_ids), manager_id, is_manager)
+            if is_manager:
+                managers.append(employee_id)
+
+    loader.load('Employee', ['EmployeeID', 'EmployeeName', 'PositionID', 'Salary', 'BranchID', 'DepartmentID',
+                             'ManagerID', 'IsManager'], employee_rows())
+    cursor.execute("SELECT EmployeeID FROM Employee")
+    # Log-normal workload: most people are on a few projects, some on many
+    employees = Skewed(rng, [row[0] for row in cursor.fetchall()], lambda r: r.lognormvariate(0, 0.8))
+
+    # Projects and everything hanging off them
+    first = loader.next_id('Project', 'ProjectID')
+    projects = []
+    for project_id in range(first, first + counts['Project']):
+        project_type = 'solar' if rng.random() < 0.2 else 'building'
+        city = rng.choice(CITIES)
+        revenue = money(rng.lognormvariate(math.log(2000000), 1.0))
+        start = recent_date(rng, FIRST_DATE, LAST_DATE - datetime.timedelta(days=90))
+        end = start + datetime.timedelta(days=int(rng.lognormvariate(math.log(420), 0.45)))
+        projects.append((project_id, f"{rng.choice(PROJECT_KINDS[project_type])} {city} #{project_id}", city,
+                         money(float(revenue) * rng.uniform(0.65, 0.95)), revenue, project_type,
+                         rng.choice(branch_ids), clients.pick(rng), start, end))
+    loader.load('Project', ['ProjectID', 'ProjectName', 'Location', 'Cost', 'Revenue', 'ProjectType',
+                            'BranchID', 'ClientID'], (p[:8] for p in projects))
+
+    def ongoing_end(end):
+        return None if end > LAST_DATE else end
+
+    loader.load('WorkAssignment', ['ProjectID', 'EmployeeID', 'Role', 'HoursWorked', 'StartDate', 'EndDate'], (
+        (p[0], employee_id, rng.choice(titles), money(rng.uniform(40, 2000)), date_between(rng, p[8], p[9]),
+         ongoing_end(p[9]))
+        for p in projects
+        for employee_id in employees.sample(rng, min(25, 3 + int(rng.lognormvariate(1.5, 0.6))))
+    ))
+    loader.load('ProjectMaterial', ['ProjectID', 'MaterialID', 'Quantity', 'UnitPrice'], (
+        (p[0], material_id, money(rng.lognormvariate(math.log(200), 1.2)),
+         money(float(material_prices[material_id]) * rng.uniform(0.9, 1.6)))
+        for p in projects
+        for material_id in materials.sample(rng, rng.randint(4, 15))
+    ))
+    loader.load('Project_Suppliers', ['ProjectID', 'SupplierID'], (
+        (p[0], supplier_id) for p in projects for supplier_id in suppliers.sample(rng, rng.randint(2, 5))
+    ))
+
+    def contract_rows():
+        for p in projects:
+            for _ in range(2 if rng.random() < 0.15 else 1):
+                status = 'completed' if p[9] <= LAST_DATE else rng.choice(['active', 'active', 'active', 'cancelled'])
+                yield (p[0], p[7], p[8], p[9], money(float(p[4]) * rng.uniform(0.9, 1.0)), status)
+
+    loader.load('Contract', ['ProjectID', 'ClientID', 'StartDate', 'EndDate', 'TotalValue', 'Status'],
+                contract_rows())
+
+    def sales_rows():
+        for p in projects:
+            invoices = rng.randint(1, 4)
+            for _ in range(invoices):
+                issued = date_between(rng, p[8], min(p[9], LAST_DATE))
+                yield (p[0], p[7], money(float(p[4]) / invoices * rng.uniform(0.8, 1.2)), issued,
+                       issued + datetime.timedelta(days=rng.choice([30, 45, 60, 90])))
+
+    loader.load('Sales', ['ProjectID', 'ClientID', 'Amount', 'IssueDate', 'DueDate'], sales_rows())
+
+    # Phases split each project's window in order; schedules split each phase
+    first = loader.next_id('Phase', 'PhaseID')
+    phases = []
+    for p in projects:
+        names = PHASE_NAMES[:rng.randint(3, len(PHASE_NAMES))]
+        span = max((p[9] - p[8]).days, len(names))
+        for index, name in enumerate(names):
+            start = p[8] + datetime.timedelta(days=span * index // len(names))
+            end = p[8] + datetime.timedelta(days=span * (index + 1) // len(names) - 1)
+            status = 'completed' if end < LAST_DATE else 'in_progress' if start <= LAST_DATE else 'planned'
+            phases.append((first + len(phases), p[0], name, f"{name} for project {p[0]}", start, end, status))
+    loader.load('Phase', ['PhaseID', 'ProjectID', 'Name', 'Description', 'StartDate', 'EndDate', 'Status'], phases)
+    loader.load('Schedule', ['ProjectID', 'PhaseID', 'StartDate', 'EndDate', 'TaskDetails'], (
+        (phase[1], phase[0], start, date_between(rng, start, phase[5]), f"{phase[2]} task {n + 1}")
+        for phase in phases
+        for n, start in enumerate(sorted(date_between(rng, phase[4], phase[5]) for _ in range(rng.randint(1, 3))))
+    ))
+    del phases
+
+    # Purchases and payments, concentrated on the popular suppliers and clients
+    def purchase_rows():
+        for _ in range(counts['Purchase']):
+            material_id = materials.pick(rng)
+            quantity = money(rng.lognormvariate(math.log(100), 1.0))
+            yield (suppliers.pick(rng), material_id, quantity, recent_date(rng),
+                   money(float(quantity) * float(material_prices[material_id]) * rng.uniform(0.85, 1.2)))
+
+    loader.load('Purchase', ['SupplierID', 'MaterialID', 'Quantity', 'PurchaseDate', 'TotalCost'], purchase_rows())
+
+    def payment_rows():
+        for _ in range(counts['Payment']):
+            from_client = clients.pick(rng) if rng.random() < 0.6 else None
+            yield (from_client, None if from_client else suppliers.pick(rng),
+                   money(rng.lognormvariate(math.log(250000), 1.1)), recent_date(rng),
+                   rng.choices(PAYMENT_METHODS, PAYMENT_METHOD_WEIGHTS)[0])
+
+    loader.load('Payment', ['FromClient', 'ToSupplier', 'Amount', 'PaymentDate', 'PaymentMethod'], payment_rows())
+
+    # Users share one password hash; hashing per row would dominate the run
+    password = generate_password_hash(admin_password)
+    cursor.execute("SELECT Username FROM User")
+    taken = {row[0] for row in cursor.fetchall()}
+    first = loader.next_id('User', 'UserID')
+    users = [] if 'admin' in taken else [('admin', 'admin@abaad.ps', password)]
+    users += [(f"user{n}", f"user{n}@abaad.ps", password) for n in range(first, first + counts['User'])
+              if f"user{n}" not in taken]
+    loader.load('User', ['Username', 'Email', 'Password'], users)
+
+    started = time.monotonic()
+    rebuild_summaries(cursor)
+    rebuild_best_prices(cursor)
+    # Running apps see the loaded rows as a change to every table they read
+    cursor.execute("SHOW TABLES LIKE 'TableVersion'")
+    if cursor.fetchone():
+        loaded = {table for table, _, _ in loader.timings}
+        bump_table_versions(cursor, loaded | set(SUMMARY_TABLES) | {'MaterialBestPrice'})
+    cursor.execute("SHOW TABLES LIKE 'DashboardStats'")
+    if cursor.fetchone():
+        recount_dashboard_stats(cursor)
+    db.commit()
+    loader.timings.append(('summaries', None, time.monotonic() - started))
+    return loader.timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1, help='size multiplier (1, 10, 100, 1000, ...)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed, for reproducible fixtures')
+    parser.add_argument('--batch-size', type=int, help='rows per INSERT batch (default 5000, 50000 with --fast)')
+    parser.add_argument('--fast', action='store_true',
+                        help='load without secondary indexes, foreign keys or unique checks, then rebuild them')
+    parser.add_argument('--infile', action='store_true',
+                        help='load each table with LOAD DATA LOCAL INFILE (server needs local_infile=ON)')
+    parser.add_argument('--admin-password', default=os.environ.get('ADMIN_PASSWORD', 'admin123'))
+    parser.add_argument('--keep', action='store_true', help='add to the existing database instead of recreating it')
+    args = parser.parse_args()
+    if args.scale < 1:
+        parser.error('--scale must be at least 1')
+
+    started = time.monotonic()
+    if not args.keep:
+        runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'insertion.py'))
+    db = pymysql.connect(host=os.environ.get("DB_HOST", "localhost"),
+                         user=os.environ.get("DB_USER", "root"),
+                         password=os.environ.get("DB_PASSWORD", "l18102005"),
+                         database=os.environ.get("DB_NAME", "abaad_contracting"),
+                         local_infile=args.infile)
+    batch_size = args.batch_size or (50000 if args.fast else 5000)
+    try:
+        if args.fast:
+            with FastLoad(db) as fast:
+                timings = generate(db, args.scale, args.seed, batch_size, args.admin_password, args.infile,
+                                   FAST_STMT_LENGTH)
+            timings += fast.timings
+        else:
+            timings = generate(db, args.scale, args.seed, batch_size, args.admin_password, args.infile)
+    finally:
+        db.close()
+
+    total_rows = 0
+    for table, rows, seconds in timings:
+        if rows is None:
+            print(f"{table:<20} {'':>10} {seconds:8.2f}s")
+            continue
+        total_rows += rows
+        rate = f"{rows / seconds:,.0f} rows/s" if seconds else ''
+        print(f"{table:<20} {rows:>10,} {seconds:8.2f}s  {rate}")
+    print(f"{'total':<20} {total_rows:>10,} {time.monotonic() - started:8.2f}s")
+
+
+if __name__ == '__main__':
+    main()
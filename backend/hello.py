@@ -1,15 +1,51 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify, session
+from flask import (Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify, session, g,
+                   make_response, stream_template, has_app_context)
+from jinja2 import FileSystemBytecodeCache
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 import pymysql
+import csv
 from functools import wraps
+from operator import itemgetter
 import os
-
-myDB = pymysql.connect(host="localhost", user="root", password="l18102005")
-myCursor = myDB.cursor()
-
-myCursor.execute("USE abaad_contracting")
+import threading
+import time
+
+from cache import TableVersions, TTLCache, VersionedCache, bump_table_versions, load_table_versions
+from db import ConnectionPool, InstrumentedCursor, InstrumentedSSCursor, SchemaRegistry
+from documents import load_project_document
+from fanout import FanOut
+from summaries import (SUMMARY_TABLES, add_branch_revenue, add_dashboard_stats, add_employee_hours, add_material_spend,
+                       count_dashboard_stats, load_dashboard_stats, money, rebuild_best_prices, rebuild_summaries,
+                       recount_dashboard_stats, refresh_best_price, subtract_project_children)
+from entities import ENTITIES, cascaded_tables
+import resources
+from importer import import_records, iter_records
+import instrumentation
+import metrics
+from slowlog import SlowQueryLog
+from spa import SpaShell
+from assets import AssetStore
+from images import DerivativeCache, UndecodableImage, parse_variant
+from pagination import PAGE_SIZE, decode_page_cursor, keyset_clause, next_page_cursor, normalize_sort_order
+
+db_pool = ConnectionPool(
+    host=os.environ.get("DB_HOST", "localhost"),
+    user=os.environ.get("DB_USER", "root"),
+    password=os.environ.get("DB_PASSWORD", "l18102005"),
+    database=os.environ.get("DB_NAME", "abaad_contracting"),
+    max_size=int(os.environ.get("DB_POOL_SIZE", "10")),
+    timeout=float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+    cursorclass=InstrumentedCursor,
+)
+
+# Statements slower than SLOW_QUERY_MS are aggregated for /admin/slow_queries
+slow_queries = SlowQueryLog(float(os.environ.get("SLOW_QUERY_MS", "200")) / 1000, pool=db_pool)
+InstrumentedCursor.slow_query_log = InstrumentedSSCursor.slow_query_log = slow_queries
+
+# Worker threads for pages that load their lookups alongside the main query
+fan_out = FanOut(db_pool, max_workers=int(os.environ.get("DB_FANOUT_WORKERS", "4")))
 
 # Get the project root directory (parent of backend/)
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,13 +58,145 @@ app = Flask(__name__,
             static_url_path='',
             template_folder=templates_folder)
 app.secret_key = 'my_key'
+
+# Compiled templates are shared on disk by every worker (keyed by a checksum of
+# the source, so an edited template recompiles); see precompile_templates()
+template_cache_folder = os.environ.get("TEMPLATE_CACHE_DIR", os.path.join(project_root, 'cache', 'jinja'))
+os.makedirs(template_cache_folder, exist_ok=True)
+app.jinja_options = {**app.jinja_options,
+                     'bytecode_cache': FileSystemBytecodeCache(template_cache_folder)}
 CORS(app, supports_credentials=True)
 
+# The React build's index.html, read once; send SIGHUP after deploying a new build
+spa_shell = SpaShell(os.path.join(static_folder, 'index.html'), logger=app.logger)
+if os.environ.get("SPA_RELOAD_ON_SIGHUP", "0") == "1":
+    spa_shell.reload_on()
+instrumentation.init_app(app)
+metrics.init_app(app)
+metrics.watch_pool(db_pool)
+
+# Fingerprinted, precompressed copies of static/ and the team photos, built at startup
+asset_stores = {
+    'static': AssetStore(root_static_folder),
+    'media': AssetStore(os.path.join(project_root, 'assets', 'images', 'team'),
+                        os.path.join(project_root, 'assets', 'images')),
+}
+ASSET_ENDPOINTS = {'static': 'serve_static', 'media': 'media'}
+
+# Resized/re-encoded media images (?w=, ?format=), rendered once and kept on disk
+image_derivatives = DerivativeCache(
+    os.environ.get("IMAGE_CACHE_DIR", os.path.join(project_root, 'cache', 'images')),
+    max_bytes=int(os.environ.get("IMAGE_CACHE_MB", "256")) * 1024 * 1024,
+)
+metrics.watch_cache('images', image_derivatives)
+
+@app.template_global()
+def asset_url(endpoint, filename, **params):
+    """URL of the fingerprinted (immutably cacheable) copy of a 'static' or 'media' file."""
+    return url_for(ASSET_ENDPOINTS[endpoint], filename=asset_stores[endpoint].url_name(filename), **params)
+
+@app.template_global()
+def image_srcset(filename, widths, format=None):
+    """A ``srcset`` of resized copies of a media image, e.g. for ``<img srcset=... sizes=...>``."""
+    params = {'format': format} if format else {}
+    # Commas separate srcset candidates, so any in the file name must be escaped
+    return ", ".join(f"{asset_url('media', filename, w=width, **params).replace(',', '%2C')} {width}w"
+                     for width in widths)
+
 # Serve static CSS and images from root static folder
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     """Serve static files from the root static folder (CSS, images, etc.)"""
-    return send_from_directory(root_static_folder, filename)
+    return asset_stores['static'].response(request, filename) or send_from_directory(root_static_folder, filename)
+
+def get_db():
+    """Check out a pooled connection for the current request (returned on teardown)."""
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+    return g.db
+
+def get_cursor():
+    if 'cursor' not in g:
+        g.cursor = get_db().cursor()
+    return g.cursor
+
+@app.teardown_appcontext
+def release_db(exc):
+    cursor = g.pop('cursor', None)
+    if cursor is not None:
+        cursor.close()
+    # A streamed listing that was not read to the end (client went away, or
+    # the template failed) still has rows in flight; dropping the connection
+    # is cheaper than draining them
+    abandoned_stream = g.pop('stream_cursor', None) is not None
+    db = g.pop('db', None)
+    if db is not None:
+        db_pool.release(db, discard=abandoned_stream or isinstance(exc, pymysql.err.OperationalError))
+
+schema = SchemaRegistry()
+
+def refresh_schema():
+    conn = db_pool.acquire()
+    try:
+        schema.refresh(conn)
+    finally:
+        db_pool.release(conn)
+
+def schema_has_column(table, column):
+    if not schema.loaded:
+        refresh_schema()
+    return schema.has_column(table, column)
+
+# Columns with a server-side default (or added by later migrations) that the
+# write routes only send when the connected database actually has them
+OPTIONAL_COLUMNS = {
+    'Project': {'Cost', 'ProjectType'},
+    'Employee': {'IsManager'},
+    'SupplierMaterial': {'LeadTime'},
+    'Contract': {'Status'},
+    'Phase': {'Description', 'Status'},
+    'Schedule': {'TaskDetails'},
+}
+
+def _supported_values(table, values):
+    optional = OPTIONAL_COLUMNS.get(table, ())
+    return {col: val for col, val in values.items() if col not in optional or schema_has_column(table, col)}
+
+def column_supported(table, column):
+    return column not in OPTIONAL_COLUMNS.get(table, ()) or schema_has_column(table, column)
+
+def insert_row(cursor, table, values):
+    values = _supported_values(table, values)
+    columns = ", ".join(values)
+    placeholders = ", ".join(["%s"] * len(values))
+    cursor.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", tuple(values.values()))
+
+def update_row(cursor, table, values, key_column, key):
+    values = _supported_values(table, values)
+    assignments = ", ".join(f"{col} = %s" for col in values)
+    cursor.execute(f"UPDATE {table} SET {assignments} WHERE {key_column} = %s", tuple(values.values()) + (key,))
+
+def summaries_enabled():
+    """True when the database has the materialized report summary tables (see summaries.py)."""
+    return all(schema_has_table(table) for table in SUMMARY_TABLES)
+
+def best_prices_enabled():
+    return schema_has_table('MaterialBestPrice')
+
+def table_versions_enabled():
+    """True when the database keeps per-table versions (TableVersion), which ETags and the lookup/report caches need."""
+    return schema_has_table('TableVersion')
+
+def schema_has_table(table):
+    if not schema.loaded:
+        refresh_schema()
+    return schema.has_table(table)
+
+try:
+    refresh_schema()
+except pymysql.MySQLError as e:
+    # Database not reachable yet; schema_has_column() loads it on first use
+    app.logger.warning("Schema introspection deferred: %s", e)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -42,13 +210,23 @@ class User(UserMixin):
         self.email = email
         self.is_admin = is_admin
 
+# Authenticated users by id, so load_user() skips the User lookup on most requests
+user_cache = TTLCache(max_size=1024, ttl=300)
+metrics.watch_cache('users', user_cache)
+
 @login_manager.user_loader
 def load_user(user_id):
-    myCursor.execute("SELECT UserID, Username, Email FROM User WHERE UserID = %s", (user_id,))
-    user_data = myCursor.fetchone()
+    user = user_cache.get(str(user_id))
+    if user is not None:
+        return user
+    cursor = get_cursor()
+    cursor.execute("SELECT UserID, Username, Email FROM User WHERE UserID = %s", (user_id,))
+    user_data = cursor.fetchone()
     if user_data:
         is_admin = (user_data[1] or "").lower() == "admin"
-        return User(user_data[0], user_data[1], user_data[2], is_admin)
+        user = User(user_data[0], user_data[1], user_data[2], is_admin)
+        user_cache.set(str(user_id), user)
+        return user
     return None
 
 
@@ -63,39 +241,307 @@ def admin_required(view_func):
 
     return wrapped_view
 
+
+login_attempts = metrics.Counter('abaad_login_attempts_total', 'Login attempts, by outcome.', ('outcome',))
+password_hash_seconds = metrics.Histogram('abaad_password_hash_seconds', 'Time spent hashing passwords.',
+                                          ('operation',))
+
+def hash_password(password):
+    started = time.perf_counter()
+    try:
+        return generate_password_hash(password)
+    finally:
+        password_hash_seconds.observe(time.perf_counter() - started, 'generate')
+
+def verify_password(password_hash, password):
+    started = time.perf_counter()
+    try:
+        return check_password_hash(password_hash, password)
+    finally:
+        password_hash_seconds.observe(time.perf_counter() - started, 'check')
+
+
+def fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order):
+    """Run a listing query one keyset page at a time, seeking past the ``cursor`` request arg."""
+    after = decode_page_cursor(request.args.get('cursor'))
+    condition, seek_params, order_by = keyset_clause(order_keys, sort_order, after)
+    if condition:
+        conditions = conditions + [condition]
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order_by} LIMIT %s"
+    cursor.execute(query, tuple(params) + tuple(seek_params) + (PAGE_SIZE + 1,))
+    cols = [c[0] for c in cursor.description]
+    rows = [dict(zip(cols, r)) for r in cursor.fetchall()]
+    return next_page_cursor(rows, order_keys)
+
+
+# Listings that can also be shown in full (?all=1): every matching row is read
+# from an unbuffered cursor while the page is being sent, so the first rows
+# reach the browser at once and memory use does not grow with the table
+STREAM_CHUNK_BYTES = 16 * 1024
+
+def wants_all_rows():
+    return request.args.get('all') == '1'
+
+def stream_listing_rows(query, conditions, params, order_keys, sort_order):
+    """Every row of a listing, in order, fetched from the server as the caller iterates.
+
+    The request's connection is busy until the last row is read, so
+    anything else the page needs (lookups) must be loaded before this.
+    """
+    _, _, order_by = keyset_clause(order_keys, sort_order, None)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order_by}"
+    cursor = g.stream_cursor = get_db().cursor(InstrumentedSSCursor)
+    cursor.execute(query, tuple(params))
+    cols = [c[0] for c in cursor.description]
+
+    def rows():
+        for row in cursor:
+            yield dict(zip(cols, row))
+        g.pop('stream_cursor').close()
+    return rows()
+
+def listing_rows(cursor, query, conditions, params, order_keys, sort_order):
+    """``(rows, next_cursor)``: one keyset page, or with ``?all=1`` a stream of every row."""
+    if wants_all_rows():
+        return stream_listing_rows(query, conditions, params, order_keys, sort_order), None
+    return fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order)
+
+def render_listing(template_name, **context):
+    """render_template, or with ``?all=1`` a response that is sent while the template renders."""
+    if not wants_all_rows():
+        return render_template(template_name, streaming=False, **context)
+    chunks = stream_template(template_name, streaming=True, **context)
+
+    def buffered():
+        # The template yields a few bytes per expression; send them in larger pieces
+        pending, size = [], 0
+        try:
+            for chunk in chunks:
+                pending.append(chunk)
+                size += len(chunk)
+                if size >= STREAM_CHUNK_BYTES:
+                    yield ''.join(pending)
+                    pending, size = [], 0
+            if pending:
+                yield ''.join(pending)
+        finally:
+            chunks.close()
+    return app.response_class(buffered(), mimetype='text/html')
+
+
+def conditional_listing(*tables, tables_for=None):
+    """Answer 304 Not Modified, without running the view, while ``tables`` are unchanged.
+
+    The ETag covers the versions of every table the page reads (lookups
+    included), the full query string (filters, sort, page cursor) and the
+    user, since the navbar differs per user. A pending flash message
+    always gets a fresh page so it is shown. ``tables_for(**view_args)``
+    names the tables when they depend on the URL.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped_view(*args, **kwargs):
+            read = tables_for(**kwargs) if tables_for else tables
+            etag = table_versions.etag(read, request.full_path, current_user.get_id())
+            if etag is None:
+                # No shared table versions to validate against
+                return view_func(*args, **kwargs)
+            if etag in request.if_none_match and not session.get('_flashes'):
+                response = app.response_class(status=304)
+            else:
+                response = make_response(view_func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+
+        return wrapped_view
+
+    return decorator
+
+
+def page_links(next_cursor, streamable=False):
+    args = request.args.to_dict()
+    args.pop('cursor', None)
+    if streamable and args.pop('all', None) == '1':
+        return {'paged_url': url_for(request.endpoint, **args)}
+    return {
+        'next_page_url': url_for(request.endpoint, **args, cursor=next_cursor) if next_cursor else None,
+        'first_page_url': url_for(request.endpoint, **args) if request.args.get('cursor') else None,
+        'all_rows_url': url_for(request.endpoint, **args, all=1) if streamable and next_cursor else None,
+    }
+
+
+def current_table_versions():
+    """``{table: version}`` from TableVersion, read once per request; None if the table does not exist.
+
+    Within a request the versions come from the request's own connection
+    (and so the same snapshot as the page's data); outside one they are
+    read on a pooled connection each time.
+    """
+    if not table_versions_enabled():
+        return None
+    if has_app_context():
+        if 'table_versions' not in g:
+            g.table_versions = load_table_versions(get_cursor())
+        return g.table_versions
+    conn = db_pool.acquire()
+    try:
+        with conn.cursor() as cursor:
+            return load_table_versions(cursor)
+    finally:
+        db_pool.release(conn)
+
+table_versions = TableVersions(current_table_versions)
+# Reloaded when a source table's version moves, and at least every LOOKUP_CACHE_TTL seconds
+lookup_cache = VersionedCache(table_versions, ttl=int(os.environ.get("LOOKUP_CACHE_TTL", "300")))
+metrics.watch_cache('lookups', lookup_cache)
+
+def mark_tables_changed(*tables, deleted=False):
+    """Bump the version of every table a write touched (cascades included for deletes).
+
+    Call it just before the write's commit: the versions are bumped in the
+    same transaction, so every worker sees them move when the data does.
+    """
+    changed = cascaded_tables(*tables) if deleted else set(tables)
+    if table_versions_enabled():
+        bump_table_versions(get_cursor(), changed)
+        g.pop('table_versions', None)
+    if 'User' in changed:
+        user_cache.clear()
+
+
+# Dropdown/reference lists shared by the listing pages: name -> (source tables, query)
+LOOKUPS = {
+    'branches': (('Branch',), "SELECT BranchID, BranchName FROM Branch ORDER BY BranchName"),
+    'cities': (('Branch',), "SELECT DISTINCT City FROM Branch ORDER BY City"),
+    'departments': (('Department',), "SELECT DepartmentID, DepartmentName FROM Department ORDER BY DepartmentName"),
+    'roles': (('Role',), "SELECT RoleID, Title FROM Role ORDER BY Title"),
+    'employees': (('Employee',), "SELECT EmployeeID, EmployeeName FROM Employee ORDER BY EmployeeName"),
+    'managers': (('Employee',), "SELECT EmployeeID, EmployeeName FROM Employee WHERE IsManager = TRUE ORDER BY EmployeeName"),
+    'clients': (('Client',), "SELECT ClientID, ClientName FROM Client ORDER BY ClientName"),
+    'projects': (('Project',), "SELECT ProjectID, ProjectName FROM Project ORDER BY ProjectName"),
+    'phases': (('Phase',), "SELECT PhaseID, Name, ProjectID FROM Phase ORDER BY PhaseID"),
+    'materials': (('Material',), "SELECT MaterialID, MaterialName FROM Material ORDER BY MaterialName"),
+    'units': (('Material',), "SELECT DISTINCT UnitOfMeasure FROM Material WHERE UnitOfMeasure IS NOT NULL ORDER BY UnitOfMeasure"),
+    'suppliers': (('Supplier',), "SELECT SupplierID, SupplierName FROM Supplier ORDER BY SupplierName"),
+    'assignment_roles': (('WorkAssignment',), "SELECT DISTINCT Role FROM WorkAssignment ORDER BY Role"),
+}
+
+def get_lookup(name, cursor=None):
+    tables, query = LOOKUPS[name]
+
+    def load():
+        c = cursor or get_cursor()
+        c.execute(query)
+        return [dict(zip([col[0] for col in c.description], r)) for r in c.fetchall()]
+
+    return lookup_cache.get_or_load(name, tables, load)
+
+def fetch_with_lookups(fetch, *names):
+    """Run ``fetch(cursor)`` on the request's connection while the named lookups that are not cached load concurrently.
+
+    Returns fetch's result and a dict of every named lookup.
+    """
+    lookups = {}
+    pending = {}
+    for name in names:
+        value = lookup_cache.get(name, LOOKUPS[name][0])
+        if value is not None:
+            lookups[name] = value
+        else:
+            pending[name] = lambda cursor, name=name: get_lookup(name, cursor)
+    result, loaded = fan_out.run(get_cursor(), fetch, pending)
+    lookups.update(loaded)
+    return result, lookups
+
+def dashboard_stats_enabled():
+    """True when the database keeps the home page counters in DashboardStats, updated by each write's transaction."""
+    return schema_has_table('DashboardStats')
+
+def add_dashboard_deltas(**deltas):
+    """Apply a write's counter deltas; call it before the write's commit, like mark_tables_changed."""
+    if dashboard_stats_enabled():
+        add_dashboard_stats(get_cursor(), **deltas)
+
+def recount_dashboard():
+    """For writes whose cascades change counters by an unknown amount; also before the commit."""
+    if dashboard_stats_enabled():
+        recount_dashboard_stats(get_cursor())
+
+# Every worker runs this check; drift means rows changed outside the app (manual SQL)
+STATS_RECONCILE_INTERVAL = int(os.environ.get("STATS_RECONCILE_INTERVAL", "300"))
+_stats_reconciler_lock = threading.Lock()
+_stats_reconciler = None
+
+def reconcile_dashboard_stats():
+    """Recount DashboardStats in a transaction of its own and return the drift it corrected."""
+    conn = db_pool.acquire()
+    try:
+        with conn.cursor() as cursor:
+            drift = recount_dashboard_stats(cursor)
+        conn.commit()
+        return drift
+    finally:
+        db_pool.release(conn)
+
+def _reconcile_dashboard_stats_forever():
+    while True:
+        time.sleep(STATS_RECONCILE_INTERVAL)
+        try:
+            drift = reconcile_dashboard_stats()
+            if drift:
+                app.logger.warning("Dashboard counters drifted, reset from tables: %s", drift)
+        except Exception as e:
+            app.logger.error("Dashboard counter reconciliation failed: %s", e)
+
+def start_stats_reconciler():
+    global _stats_reconciler
+    with _stats_reconciler_lock:
+        if _stats_reconciler is None:
+            _stats_reconciler = threading.Thread(target=_reconcile_dashboard_stats_forever,
+                                                 name='counter-reconciler', daemon=True)
+            _stats_reconciler.start()
+
+def get_dashboard_stats():
+    cursor = get_cursor()
+    if not dashboard_stats_enabled():
+        # Databases created before DashboardStats existed: count on every read
+        return count_dashboard_stats(cursor)
+    start_stats_reconciler()
+    return load_dashboard_stats(cursor)
+
 # API Routes
 @app.route('/api/stats')
 def api_stats():
-    stats_query = """
-        SELECT 
-            (SELECT COUNT(*) FROM Branch) as branch_count,
-            (SELECT COUNT(*) FROM Employee) as employee_count,
-            (SELECT COUNT(*) FROM Project) as project_count,
-            (SELECT COUNT(*) FROM Client) as client_count,
-            (SELECT SUM(Revenue) FROM Project) as total_revenue,
-            (SELECT COUNT(*) FROM Supplier) as supplier_count
-    """
-    myCursor.execute(stats_query)
-    columns = [col[0] for col in myCursor.description]
-    stats = [dict(zip(columns, row)) for row in myCursor.fetchall()]
-    return jsonify(stats[0] if stats else {})
+    return jsonify(get_dashboard_stats())
 
 @app.route('/api/login', methods=['POST'])
 def api_login():
+    cursor = get_cursor()
     data = request.get_json()
     username = data.get('username')
     password = data.get('password')
     
     if not username or not password:
+        login_attempts.inc('incomplete')
         return jsonify({'success': False, 'message': 'Please enter both username and password'}), 400
     
-    myCursor.execute("SELECT UserID, Username, Email, Password FROM User WHERE Username = %s", (username,))
-    user_data = myCursor.fetchone()
+    cursor.execute("SELECT UserID, Username, Email, Password FROM User WHERE Username = %s", (username,))
+    user_data = cursor.fetchone()
     
-    if user_data and check_password_hash(user_data[3], password):
+    if user_data and verify_password(user_data[3], password):
         is_admin = (user_data[1] or "").lower() == "admin"
         user = User(user_data[0], user_data[1], user_data[2], is_admin)
         login_user(user)
+        user_cache.set(str(user.id), user)
+        login_attempts.inc('success')
         return jsonify({
             'success': True,
             'user': {
@@ -106,16 +552,20 @@ def api_login():
             }
         })
     else:
+        login_attempts.inc('failure')
         return jsonify({'success': False, 'message': 'Invalid username or password'}), 401
 
 @app.route('/api/logout', methods=['POST'])
 @login_required
 def api_logout():
+    user_cache.pop(str(current_user.id))
     logout_user()
     return jsonify({'success': True})
 
 @app.route('/api/signup', methods=['POST'])
 def api_signup():
+    db = get_db()
+    cursor = get_cursor()
     data = request.get_json()
     username = data.get('username')
     email = data.get('email')
@@ -131,46 +581,32 @@ def api_signup():
     if len(password) < 6:
         return jsonify({'success': False, 'message': 'Password must be at least 6 characters long'}), 400
     
-    myCursor.execute("SELECT UserID FROM User WHERE Username = %s OR Email = %s", (username, email))
-    if myCursor.fetchone():
+    cursor.execute("SELECT UserID FROM User WHERE Username = %s OR Email = %s", (username, email))
+    if cursor.fetchone():
         return jsonify({'success': False, 'message': 'Username or email already exists'}), 400
     
-    hashed_password = generate_password_hash(password)
-    myCursor.execute("INSERT INTO User (Username, Email, Password) VALUES (%s, %s, %s)", 
-                    (username, email, hashed_password))
-    myDB.commit()
+    hashed_password = hash_password(password)
+    cursor.execute("INSERT INTO User (Username, Email, Password) VALUES (%s, %s, %s)", 
+                   (username, email, hashed_password))
+    mark_tables_changed('User')
+    db.commit()
     
     return jsonify({'success': True, 'message': 'Account created successfully! Please log in.'})
 
 # Legacy template routes (for backward compatibility)
 @app.route('/')
 def index():
-    # Check if React build exists, serve it if available
-    react_build_path = os.path.join(project_root, 'static', 'react-build', 'index.html')
-    if os.path.exists(react_build_path):
-        return send_from_directory(os.path.join(project_root, 'static', 'react-build'), 'index.html')
+    # Serve the React build if there is one
+    if spa_shell.available:
+        return spa_shell.response(request)
     # Otherwise serve template
-    stats_query = """
-        SELECT 
-            (SELECT COUNT(*) FROM Branch) as branch_count,
-            (SELECT COUNT(*) FROM Employee) as employee_count,
-            (SELECT COUNT(*) FROM Project) as project_count,
-            (SELECT COUNT(*) FROM Client) as client_count,
-            (SELECT SUM(Revenue) FROM Project) as total_revenue,
-            (SELECT COUNT(*) FROM Supplier) as supplier_count
-    """
-    myCursor.execute(stats_query)
-    columns = [col[0] for col in myCursor.description]
-    stats = [dict(zip(columns, row)) for row in myCursor.fetchall()]
-    return render_template('index.html', stats=stats[0] if stats else {})
+    return render_template('index.html', stats=get_dashboard_stats())
 
 
 @app.route('/about')
 def about():
-    # Check if React build exists
-    react_build_path = os.path.join(project_root, 'static', 'react-build', 'index.html')
-    if os.path.exists(react_build_path):
-        return send_from_directory(os.path.join(project_root, 'static', 'react-build'), 'index.html')
+    if spa_shell.available:
+        return spa_shell.response(request)
     return render_template('about.html')
 
 
@@ -178,14 +614,24 @@ def about():
 def media(filename):
     # Serve image files from assets folder
     assets_path = os.path.join(project_root, 'assets', 'images', 'team')
-    return send_from_directory(assets_path, filename)
+    store = asset_stores['media']
+    asset, cache_control = store.find(filename)
+    if asset is not None and image_derivatives.available:
+        try:
+            variant = parse_variant(request.args, asset.mimetype)
+        except ValueError as e:
+            return str(e), 400
+        if variant is not None:
+            try:
+                return image_derivatives.response(request, asset, cache_control, *variant)
+            except UndecodableImage as e:
+                return str(e), 415
+    return store.response(request, filename) or send_from_directory(assets_path, filename)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
-    # Check if React build exists
-    react_build_path = os.path.join(project_root, 'static', 'react-build', 'index.html')
-    if os.path.exists(react_build_path):
-        return send_from_directory(os.path.join(project_root, 'static', 'react-build'), 'index.html')
+    if spa_shell.available:
+        return spa_shell.response(request)
     
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -195,30 +641,33 @@ def login():
         password = request.form.get('password')
         
         if not username or not password:
+            login_attempts.inc('incomplete')
             flash('Please enter both username and password', 'error')
             return render_template('login.html')
         
-        myCursor.execute("SELECT UserID, Username, Email, Password FROM User WHERE Username = %s", (username,))
-        user_data = myCursor.fetchone()
+        cursor = get_cursor()
+        cursor.execute("SELECT UserID, Username, Email, Password FROM User WHERE Username = %s", (username,))
+        user_data = cursor.fetchone()
         
-        if user_data and check_password_hash(user_data[3], password):
+        if user_data and verify_password(user_data[3], password):
             is_admin = (user_data[1] or "").lower() == "admin"
             user = User(user_data[0], user_data[1], user_data[2], is_admin)
             login_user(user)
+            user_cache.set(str(user.id), user)
+            login_attempts.inc('success')
             flash('Login successful!', 'success')
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('index'))
         else:
+            login_attempts.inc('failure')
             flash('Invalid username or password', 'error')
     
     return render_template('login.html')
 
 @app.route('/signup', methods=['GET', 'POST'])
 def signup():
-    # Check if React build exists
-    react_build_path = os.path.join(project_root, 'static', 'react-build', 'index.html')
-    if os.path.exists(react_build_path):
-        return send_from_directory(os.path.join(project_root, 'static', 'react-build'), 'index.html')
+    if spa_shell.available:
+        return spa_shell.response(request)
     
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -241,15 +690,18 @@ def signup():
             flash('Password must be at least 6 characters long', 'error')
             return render_template('signup.html')
         
-        myCursor.execute("SELECT UserID FROM User WHERE Username = %s OR Email = %s", (username, email))
-        if myCursor.fetchone():
+        db = get_db()
+        cursor = get_cursor()
+        cursor.execute("SELECT UserID FROM User WHERE Username = %s OR Email = %s", (username, email))
+        if cursor.fetchone():
             flash('Username or email already exists', 'error')
             return render_template('signup.html')
         
-        hashed_password = generate_password_hash(password)
-        myCursor.execute("INSERT INTO User (Username, Email, Password) VALUES (%s, %s, %s)", 
-                        (username, email, hashed_password))
-        myDB.commit()
+        hashed_password = hash_password(password)
+        cursor.execute("INSERT INTO User (Username, Email, Password) VALUES (%s, %s, %s)", 
+                       (username, email, hashed_password))
+        mark_tables_changed('User')
+        db.commit()
         
         flash('Account created successfully! Please log in.', 'success')
         return redirect(url_for('login'))
@@ -259,13 +711,16 @@ def signup():
 @app.route('/logout')
 @login_required
 def logout():
+    user_cache.pop(str(current_user.id))
     logout_user()
     flash('You have been logged out', 'success')
     return redirect(url_for('index'))
 
 @app.route('/branches')
 @admin_required
+@conditional_listing('Branch', 'Employee', 'Project')
 def branches():
+    cursor = get_cursor()
     filter_city = request.args.get('filter_city', '').strip() or None
     
     query = """
@@ -280,53 +735,66 @@ def branches():
     if filter_city:
         query += " WHERE b.City = %s"
         query += " GROUP BY b.BranchID ORDER BY b.BranchName"
-        myCursor.execute(query, (filter_city,))
+        cursor.execute(query, (filter_city,))
     else:
         query += " GROUP BY b.BranchID ORDER BY b.BranchName"
-        myCursor.execute(query)
+        cursor.execute(query)
     
-    cols = [c[0] for c in myCursor.description]
-    branches = [dict(zip(cols, r)) for r in myCursor.fetchall()]
+    cols = [c[0] for c in cursor.description]
+    branches = [dict(zip(cols, r)) for r in cursor.fetchall()]
     
-    myCursor.execute("SELECT DISTINCT City FROM Branch ORDER BY City")
-    cities = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    cities = get_lookup('cities')
     
     return render_template('branches.html', branches=branches, cities=cities, filter_city=filter_city)
 
 @app.route('/branches/add', methods=['POST'])
 def add_branch():
+    db = get_db()
+    cursor = get_cursor()
     branch_name = request.form.get('branch_name')
     city = request.form.get('city')
     address = request.form.get('address')
     phone = request.form.get('phone')
     
     query = "INSERT INTO Branch (BranchName, City, Address, PhoneNumber) VALUES (%s, %s, %s, %s)"
-    myCursor.execute(query, (branch_name, city, address, phone))
-    myDB.commit()
+    cursor.execute(query, (branch_name, city, address, phone))
+    add_dashboard_deltas(branch_count=1)
+    mark_tables_changed('Branch')
+    db.commit()
     
     flash('Branch added successfully!', 'success')
     return redirect(url_for('branches'))
 
 @app.route('/branches/update/<int:branch_id>', methods=['POST'])
 def update_branch(branch_id):
+    db = get_db()
+    cursor = get_cursor()
     branch_name = request.form.get('branch_name')
     city = request.form.get('city')
     address = request.form.get('address')
     phone = request.form.get('phone')
     
     query = "UPDATE Branch SET BranchName = %s, City = %s, Address = %s, PhoneNumber = %s WHERE BranchID = %s"
-    myCursor.execute(query, (branch_name, city, address, phone, branch_id))
-    myDB.commit()
+    cursor.execute(query, (branch_name, city, address, phone, branch_id))
+    mark_tables_changed('Branch')
+    db.commit()
     
     flash('Branch updated successfully!', 'success')
     return redirect(url_for('branches'))
 
 @app.route('/branches/delete/<int:branch_id>', methods=['POST'])
 def delete_branch(branch_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Branch WHERE BranchID = %s"
-        myCursor.execute(query, (branch_id,))
-        myDB.commit()
+        cursor.execute(query, (branch_id,))
+        if summaries_enabled():
+            rebuild_summaries(cursor)
+        # Cascades to the branch's employees and projects; recount within the delete's transaction
+        recount_dashboard()
+        mark_tables_changed('Branch', deleted=True)
+        db.commit()
         flash('Branch deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting branch: {str(e)}', 'error')
@@ -334,6 +802,7 @@ def delete_branch(branch_id):
 
 @app.route('/employees')
 @admin_required
+@conditional_listing('Employee', 'Branch', 'Department', 'Role')
 def employees():
     filter_branch = request.args.get('filter_branch', '').strip() or None
     filter_department = request.args.get('filter_department', '').strip() or None
@@ -372,40 +841,26 @@ def employees():
         conditions.append("e.IsManager = %s")
         params.append(filter_is_manager == 'true')
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
     valid_sort_columns = ['EmployeeName', 'Salary']
     if sort_by not in valid_sort_columns:
         sort_by = 'EmployeeName'
+    sort_order = normalize_sort_order(sort_order)
     
-    query += f" ORDER BY e.{sort_by} {sort_order.upper()}"
+    order_keys = [(f"e.{sort_by}", itemgetter(sort_by)), ("e.EmployeeID", itemgetter('EmployeeID'))]
+    (employees, next_cursor), lookups = fetch_with_lookups(
+        lambda cursor: fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order),
+        'branches', 'departments', 'roles', 'managers')
     
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    cols = [c[0] for c in myCursor.description]
-    employees = [dict(zip(cols, r)) for r in myCursor.fetchall()]
-    
-    myCursor.execute("SELECT BranchID, BranchName FROM Branch ORDER BY BranchName")
-    branches = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT DepartmentID, DepartmentName FROM Department ORDER BY DepartmentName")
-    departments = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT RoleID, Title FROM Role ORDER BY Title")
-    roles = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT EmployeeID, EmployeeName FROM Employee WHERE IsManager = TRUE ORDER BY EmployeeName")
-    managers = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    
-    return render_template('employees.html', employees=employees, branches=branches, 
-                         departments=departments, roles=roles, managers=managers,
+    return render_template('employees.html', employees=employees, **lookups,
                          filter_branch=filter_branch, filter_department=filter_department,
                          filter_role=filter_role, filter_manager=filter_manager,
-                         filter_is_manager=filter_is_manager, sort_by=sort_by, sort_order=sort_order)
+                         filter_is_manager=filter_is_manager, sort_by=sort_by, sort_order=sort_order,
+                         **page_links(next_cursor))
 
 @app.route('/employees/add', methods=['POST'])
 def add_employee():
+    db = get_db()
+    cursor = get_cursor()
     name = request.form.get('employee_name')
     position_id = request.form.get('position_id')
     salary = request.form.get('salary')
@@ -414,18 +869,26 @@ def add_employee():
     manager_id = request.form.get('manager_id') or None
     is_manager = request.form.get('is_manager') == 'on'
     
-    query = """
-        INSERT INTO Employee (EmployeeName, PositionID, Salary, BranchID, DepartmentID, ManagerID, IsManager)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-    """
-    myCursor.execute(query, (name, position_id, salary, branch_id, dept_id, manager_id, is_manager))
-    myDB.commit()
+    insert_row(cursor, 'Employee', {
+        'EmployeeName': name,
+        'PositionID': position_id,
+        'Salary': salary,
+        'BranchID': branch_id,
+        'DepartmentID': dept_id,
+        'ManagerID': manager_id,
+        'IsManager': is_manager,
+    })
+    add_dashboard_deltas(employee_count=1)
+    mark_tables_changed('Employee')
+    db.commit()
     
     flash('Employee added successfully!', 'success')
     return redirect(url_for('employees'))
 
 @app.route('/employees/update/<int:employee_id>', methods=['POST'])
 def update_employee(employee_id):
+    db = get_db()
+    cursor = get_cursor()
     name = request.form.get('employee_name')
     position_id = request.form.get('position_id')
     salary = request.form.get('salary')
@@ -434,23 +897,32 @@ def update_employee(employee_id):
     manager_id = request.form.get('manager_id') or None
     is_manager = request.form.get('is_manager') == 'on'
     
-    query = """
-        UPDATE Employee SET EmployeeName = %s, PositionID = %s, Salary = %s, 
-        BranchID = %s, DepartmentID = %s, ManagerID = %s, IsManager = %s 
-        WHERE EmployeeID = %s
-    """
-    myCursor.execute(query, (name, position_id, salary, branch_id, dept_id, manager_id, is_manager, employee_id))
-    myDB.commit()
+    update_row(cursor, 'Employee', {
+        'EmployeeName': name,
+        'PositionID': position_id,
+        'Salary': salary,
+        'BranchID': branch_id,
+        'DepartmentID': dept_id,
+        'ManagerID': manager_id,
+        'IsManager': is_manager,
+    }, 'EmployeeID', employee_id)
+    mark_tables_changed('Employee')
+    db.commit()
     
     flash('Employee updated successfully!', 'success')
     return redirect(url_for('employees'))
 
 @app.route('/employees/delete/<int:employee_id>', methods=['POST'])
 def delete_employee(employee_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Employee WHERE EmployeeID = %s"
-        myCursor.execute(query, (employee_id,))
-        myDB.commit()
+        cursor.execute(query, (employee_id,))
+        deleted = cursor.rowcount
+        add_dashboard_deltas(employee_count=-deleted)
+        mark_tables_changed('Employee', deleted=True)
+        db.commit()
         flash('Employee deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting employee: {str(e)}', 'error')
@@ -458,7 +930,9 @@ def delete_employee(employee_id):
 
 @app.route('/departments')
 @admin_required
+@conditional_listing('Department', 'Employee')
 def departments():
+    cursor = get_cursor()
     filter_manager = request.args.get('filter_manager', '').strip() or None
     
     query = """
@@ -472,62 +946,77 @@ def departments():
     if filter_manager:
         query += " WHERE d.ManagerID = %s"
         query += " GROUP BY d.DepartmentID ORDER BY d.DepartmentName"
-        myCursor.execute(query, (filter_manager,))
+        cursor.execute(query, (filter_manager,))
     else:
         query += " GROUP BY d.DepartmentID ORDER BY d.DepartmentName"
-        myCursor.execute(query)
+        cursor.execute(query)
     
-    cols = [c[0] for c in myCursor.description]
-    departments = [dict(zip(cols, r)) for r in myCursor.fetchall()]
+    cols = [c[0] for c in cursor.description]
+    departments = [dict(zip(cols, r)) for r in cursor.fetchall()]
     
-    myCursor.execute("SELECT EmployeeID, EmployeeName FROM Employee WHERE IsManager = TRUE ORDER BY EmployeeName")
-    managers = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    managers = get_lookup('managers')
     employees = managers
     
     return render_template('departments.html', departments=departments, managers=managers, employees=employees, filter_manager=filter_manager)
 
 @app.route('/departments/add', methods=['POST'])
 def add_department():
+    db = get_db()
+    cursor = get_cursor()
     dept_name = request.form.get('department_name')
     manager_id = request.form.get('manager_id') or None
     
     query = "INSERT INTO Department (DepartmentName, ManagerID) VALUES (%s, %s)"
-    myCursor.execute(query, (dept_name, manager_id))
-    myDB.commit()
+    cursor.execute(query, (dept_name, manager_id))
+    mark_tables_changed('Department')
+    db.commit()
     
     flash('Department added successfully!', 'success')
     return redirect(url_for('departments'))
 
 @app.route('/departments/set_manager', methods=['POST'])
 def set_department_manager():
+    db = get_db()
+    cursor = get_cursor()
     dept_id = request.form.get('department_id')
     manager_id = request.form.get('manager_id') or None
     
     query = "UPDATE Department SET ManagerID = %s WHERE DepartmentID = %s"
-    myCursor.execute(query, (manager_id, dept_id))
-    myDB.commit()
+    cursor.execute(query, (manager_id, dept_id))
+    mark_tables_changed('Department')
+    db.commit()
     
     flash('Department manager updated successfully!', 'success')
     return redirect(url_for('departments'))
 
 @app.route('/departments/update/<int:dept_id>', methods=['POST'])
 def update_department(dept_id):
+    db = get_db()
+    cursor = get_cursor()
     dept_name = request.form.get('department_name')
     manager_id = request.form.get('manager_id') or None
     
     query = "UPDATE Department SET DepartmentName = %s, ManagerID = %s WHERE DepartmentID = %s"
-    myCursor.execute(query, (dept_name, manager_id, dept_id))
-    myDB.commit()
+    cursor.execute(query, (dept_name, manager_id, dept_id))
+    mark_tables_changed('Department')
+    db.commit()
     
     flash('Department updated successfully!', 'success')
     return redirect(url_for('departments'))
 
 @app.route('/departments/delete/<int:dept_id>', methods=['POST'])
 def delete_department(dept_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
+        # The department's employees are deleted with it (ON DELETE CASCADE)
+        cursor.execute("SELECT COUNT(*) FROM Employee WHERE DepartmentID = %s FOR UPDATE", (dept_id,))
+        employees = cursor.fetchone()[0]
         query = "DELETE FROM Department WHERE DepartmentID = %s"
-        myCursor.execute(query, (dept_id,))
-        myDB.commit()
+        cursor.execute(query, (dept_id,))
+        add_dashboard_deltas(employee_count=-employees)
+        mark_tables_changed('Department', deleted=True)
+        db.commit()
         flash('Department deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting department: {str(e)}', 'error')
@@ -535,7 +1024,9 @@ def delete_department(dept_id):
 
 @app.route('/clients')
 @admin_required
+@conditional_listing('Client', 'Project')
 def clients():
+    cursor = get_cursor()
     filter_has_projects = request.args.get('filter_has_projects', '').strip() or None
     
     query = """
@@ -553,40 +1044,54 @@ def clients():
     
     query += " ORDER BY c.ClientName"
     
-    myCursor.execute(query)
-    clients = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    cursor.execute(query)
+    clients = [dict(zip([c[0] for c in cursor.description], r)) for r in cursor.fetchall()]
     return render_template('clients.html', clients=clients, filter_has_projects=filter_has_projects)
 
 @app.route('/clients/add', methods=['POST'])
 def add_client():
+    db = get_db()
+    cursor = get_cursor()
     name = request.form.get('client_name')
     contact = request.form.get('contact_info')
     
     query = "INSERT INTO Client (ClientName, ContactInfo) VALUES (%s, %s)"
-    myCursor.execute(query, (name, contact))
-    myDB.commit()
+    cursor.execute(query, (name, contact))
+    add_dashboard_deltas(client_count=1)
+    mark_tables_changed('Client')
+    db.commit()
     
     flash('Client added successfully!', 'success')
     return redirect(url_for('clients'))
 
 @app.route('/clients/update/<int:client_id>', methods=['POST'])
 def update_client(client_id):
+    db = get_db()
+    cursor = get_cursor()
     name = request.form.get('client_name')
     contact = request.form.get('contact_info')
     
     query = "UPDATE Client SET ClientName = %s, ContactInfo = %s WHERE ClientID = %s"
-    myCursor.execute(query, (name, contact, client_id))
-    myDB.commit()
+    cursor.execute(query, (name, contact, client_id))
+    mark_tables_changed('Client')
+    db.commit()
     
     flash('Client updated successfully!', 'success')
     return redirect(url_for('clients'))
 
 @app.route('/clients/delete/<int:client_id>', methods=['POST'])
 def delete_client(client_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Client WHERE ClientID = %s"
-        myCursor.execute(query, (client_id,))
-        myDB.commit()
+        cursor.execute(query, (client_id,))
+        if summaries_enabled():
+            rebuild_summaries(cursor)
+        # Cascades to the client's projects; recount within the delete's transaction
+        recount_dashboard()
+        mark_tables_changed('Client', deleted=True)
+        db.commit()
         flash('Client deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting client: {str(e)}', 'error')
@@ -594,7 +1099,9 @@ def delete_client(client_id):
 
 @app.route('/projects')
 @admin_required
+@conditional_listing('Project', 'Branch', 'Client')
 def projects():
+    cursor = get_cursor()
     filter_type = request.args.get('filter_type', '').strip() or None
     filter_branch = request.args.get('filter_branch', '').strip() or None
     filter_client = request.args.get('filter_client', '').strip() or None
@@ -611,7 +1118,7 @@ def projects():
     conditions = []
     params = []
     
-    if filter_type:
+    if filter_type and schema_has_column('Project', 'ProjectType'):
         conditions.append("p.ProjectType = %s")
         params.append(filter_type)
     if filter_branch:
@@ -621,80 +1128,39 @@ def projects():
         conditions.append("p.ClientID = %s")
         params.append(filter_client)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
     valid_sort_columns = ['ProjectID', 'Cost', 'Revenue']
     if sort_by not in valid_sort_columns:
         sort_by = 'ProjectID'
+    sort_order = normalize_sort_order(sort_order)
     
-    query += f" ORDER BY p.{sort_by} {sort_order.upper()}"
+    order_keys = [("p.ProjectID", itemgetter('ProjectID'))]
+    if sort_by == 'Cost':
+        # Cost is nullable; a NULL would fall out of the seek comparison
+        order_keys.insert(0, ("COALESCE(p.Cost, 0)", lambda row: row['Cost'] or 0))
+    elif sort_by == 'Revenue':
+        order_keys.insert(0, ("p.Revenue", itemgetter('Revenue')))
+    projects, next_cursor = fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order)
     
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    cols = [c[0] for c in myCursor.description]
-    projects = [dict(zip(cols, r)) for r in myCursor.fetchall()]
-    
-    myCursor.execute("SELECT BranchID, BranchName FROM Branch ORDER BY BranchName")
-    branches = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT ClientID, ClientName FROM Client ORDER BY ClientName")
-    clients = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    branches = get_lookup('branches')
+    clients = get_lookup('clients')
     
     return render_template('projects.html', projects=projects, branches=branches, clients=clients,
                          filter_type=filter_type, filter_branch=filter_branch, filter_client=filter_client,
-                         sort_by=sort_by, sort_order=sort_order)
+                         sort_by=sort_by, sort_order=sort_order, **page_links(next_cursor))
 
 @app.route('/projects/<int:project_id>')
 @admin_required
 def project_details(project_id):
-    query = """
-        SELECT p.*, b.BranchName, c.ClientName
-        FROM Project p
-        JOIN Branch b ON p.BranchID = b.BranchID
-        JOIN Client c ON p.ClientID = c.ClientID
-        WHERE p.ProjectID = %s
-    """
-    myCursor.execute(query, (project_id,))
-    cols = [c[0] for c in myCursor.description]
-    project = [dict(zip(cols, r)) for r in myCursor.fetchall()]
-    
-    if not project:
+    document = load_project_document(get_cursor(), fan_out, project_id)
+    if document is None:
         flash('Project not found', 'error')
         return redirect(url_for('projects'))
-    
-    assignments_query = """
-        SELECT wa.*, e.EmployeeName, r.Title as Position
-        FROM WorkAssignment wa
-        JOIN Employee e ON wa.EmployeeID = e.EmployeeID
-        JOIN Role r ON e.PositionID = r.RoleID
-        WHERE wa.ProjectID = %s
-    """
-    myCursor.execute(assignments_query, (project_id,))
-    assignments = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    
-    materials_query = """
-        SELECT pm.*, m.MaterialName, m.UnitOfMeasure
-        FROM ProjectMaterial pm
-        JOIN Material m ON pm.MaterialID = m.MaterialID
-        WHERE pm.ProjectID = %s
-    """
-    myCursor.execute(materials_query, (project_id,))
-    materials = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    
-    total_material_cost = 0.0
-    if materials:
-        for m in materials:
-            quantity = float(m.get('Quantity', 0) or 0)
-            unit_price = float(m.get('UnitPrice', 0) or 0)
-            total_material_cost += quantity * unit_price
-    
-    return render_template('manage_project.html', project=project[0], assignments=assignments, materials=materials, total_material_cost=total_material_cost)
+    return render_template('manage_project.html', **document)
 
 @app.route('/projects/add', methods=['POST'])
 def add_project():
+    db = get_db()
+    cursor = get_cursor()
     try:
         name = request.form.get('project_name')
         location = request.form.get('location')
@@ -704,23 +1170,21 @@ def add_project():
         branch_id = request.form.get('branch_id')
         client_id = request.form.get('client_id')
         
-        myCursor.execute("SHOW COLUMNS FROM Project LIKE 'ProjectType'")
-        has_project_type = myCursor.fetchone() is not None
-        
-        if has_project_type:
-            query = """
-                INSERT INTO Project (ProjectName, Location, Cost, Revenue, ProjectType, BranchID, ClientID)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            myCursor.execute(query, (name, location, cost, revenue, project_type, branch_id, client_id))
-        else:
-            query = """
-                INSERT INTO Project (ProjectName, Location, Cost, Revenue, BranchID, ClientID)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            myCursor.execute(query, (name, location, cost, revenue, branch_id, client_id))
+        insert_row(cursor, 'Project', {
+            'ProjectName': name,
+            'Location': location,
+            'Cost': cost,
+            'Revenue': revenue,
+            'ProjectType': project_type,
+            'BranchID': branch_id,
+            'ClientID': client_id,
+        })
+        if summaries_enabled():
+            add_branch_revenue(cursor, branch_id, 1, money(revenue))
+        add_dashboard_deltas(project_count=1, total_revenue=money(revenue))
         
-        myDB.commit()
+        mark_tables_changed('Project')
+        db.commit()
         flash('Project added successfully!', 'success')
     except Exception as e:
         flash(f'Error adding project: {str(e)}', 'error')
@@ -729,6 +1193,8 @@ def add_project():
 
 @app.route('/projects/update/<int:project_id>', methods=['POST'])
 def update_project(project_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         name = request.form.get('project_name')
         location = request.form.get('location')
@@ -738,25 +1204,25 @@ def update_project(project_id):
         branch_id = request.form.get('branch_id')
         client_id = request.form.get('client_id')
         
-        myCursor.execute("SHOW COLUMNS FROM Project LIKE 'ProjectType'")
-        has_project_type = myCursor.fetchone() is not None
+        cursor.execute("SELECT BranchID, Revenue FROM Project WHERE ProjectID = %s FOR UPDATE", (project_id,))
+        old = cursor.fetchone()
+        update_row(cursor, 'Project', {
+            'ProjectName': name,
+            'Location': location,
+            'Cost': cost,
+            'Revenue': revenue,
+            'ProjectType': project_type,
+            'BranchID': branch_id,
+            'ClientID': client_id,
+        }, 'ProjectID', project_id)
+        if old and summaries_enabled():
+            add_branch_revenue(cursor, old[0], -1, -old[1])
+            add_branch_revenue(cursor, branch_id, 1, money(revenue))
+        if old:
+            add_dashboard_deltas(total_revenue=money(revenue) - old[1])
         
-        if has_project_type:
-            query = """
-                UPDATE Project SET ProjectName = %s, Location = %s, Cost = %s, 
-                Revenue = %s, ProjectType = %s, BranchID = %s, ClientID = %s 
-                WHERE ProjectID = %s
-            """
-            myCursor.execute(query, (name, location, cost, revenue, project_type, branch_id, client_id, project_id))
-        else:
-            query = """
-                UPDATE Project SET ProjectName = %s, Location = %s, Cost = %s, 
-                Revenue = %s, BranchID = %s, ClientID = %s 
-                WHERE ProjectID = %s
-            """
-            myCursor.execute(query, (name, location, cost, revenue, branch_id, client_id, project_id))
-        
-        myDB.commit()
+        mark_tables_changed('Project')
+        db.commit()
         flash('Project updated successfully!', 'success')
     except Exception as e:
         flash(f'Error updating project: {str(e)}', 'error')
@@ -765,10 +1231,20 @@ def update_project(project_id):
 
 @app.route('/projects/delete/<int:project_id>', methods=['POST'])
 def delete_project(project_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
+        cursor.execute("SELECT BranchID, Revenue FROM Project WHERE ProjectID = %s FOR UPDATE", (project_id,))
+        old = cursor.fetchone()
+        if old and summaries_enabled():
+            add_branch_revenue(cursor, old[0], -1, -old[1])
+            subtract_project_children(cursor, project_id)
         query = "DELETE FROM Project WHERE ProjectID = %s"
-        myCursor.execute(query, (project_id,))
-        myDB.commit()
+        cursor.execute(query, (project_id,))
+        if old:
+            add_dashboard_deltas(project_count=-1, total_revenue=-old[1])
+        mark_tables_changed('Project', deleted=True)
+        db.commit()
         flash('Project deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting project: {str(e)}', 'error')
@@ -776,7 +1252,9 @@ def delete_project(project_id):
 
 @app.route('/suppliers')
 @admin_required
+@conditional_listing('Supplier', 'SupplierMaterial')
 def suppliers():
+    cursor = get_cursor()
     filter_has_materials = request.args.get('filter_has_materials', '').strip() or None
     
     query = """
@@ -794,40 +1272,58 @@ def suppliers():
     
     query += " ORDER BY s.SupplierName"
     
-    myCursor.execute(query)
-    suppliers = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    cursor.execute(query)
+    suppliers = [dict(zip([c[0] for c in cursor.description], r)) for r in cursor.fetchall()]
     return render_template('suppliers.html', suppliers=suppliers, filter_has_materials=filter_has_materials)
 
 @app.route('/suppliers/add', methods=['POST'])
 def add_supplier():
+    db = get_db()
+    cursor = get_cursor()
     name = request.form.get('supplier_name')
     contact = request.form.get('contact_info')
     
     query = "INSERT INTO Supplier (SupplierName, ContactInfo) VALUES (%s, %s)"
-    myCursor.execute(query, (name, contact))
-    myDB.commit()
+    cursor.execute(query, (name, contact))
+    add_dashboard_deltas(supplier_count=1)
+    mark_tables_changed('Supplier')
+    db.commit()
     
     flash('Supplier added successfully!', 'success')
     return redirect(url_for('suppliers'))
 
 @app.route('/suppliers/update/<int:supplier_id>', methods=['POST'])
 def update_supplier(supplier_id):
+    db = get_db()
+    cursor = get_cursor()
     name = request.form.get('supplier_name')
     contact = request.form.get('contact_info')
     
     query = "UPDATE Supplier SET SupplierName = %s, ContactInfo = %s WHERE SupplierID = %s"
-    myCursor.execute(query, (name, contact, supplier_id))
-    myDB.commit()
+    cursor.execute(query, (name, contact, supplier_id))
+    mark_tables_changed('Supplier')
+    db.commit()
     
     flash('Supplier updated successfully!', 'success')
     return redirect(url_for('suppliers'))
 
 @app.route('/suppliers/delete/<int:supplier_id>', methods=['POST'])
 def delete_supplier(supplier_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
+        offered = []
+        if best_prices_enabled():
+            cursor.execute("SELECT MaterialID FROM SupplierMaterial WHERE SupplierID = %s", (supplier_id,))
+            offered = [row[0] for row in cursor.fetchall()]
         query = "DELETE FROM Supplier WHERE SupplierID = %s"
-        myCursor.execute(query, (supplier_id,))
-        myDB.commit()
+        cursor.execute(query, (supplier_id,))
+        deleted = cursor.rowcount
+        for material_id in offered:
+            refresh_best_price(cursor, material_id)
+        add_dashboard_deltas(supplier_count=-deleted)
+        mark_tables_changed('Supplier', deleted=True)
+        db.commit()
         flash('Supplier deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting supplier: {str(e)}', 'error')
@@ -835,7 +1331,9 @@ def delete_supplier(supplier_id):
 
 @app.route('/materials')
 @admin_required
+@conditional_listing('Material')
 def materials():
+    cursor = get_cursor()
     filter_unit = request.args.get('filter_unit', '').strip() or None
     sort_by = request.args.get('sort_by', 'MaterialName')
     sort_order = request.args.get('sort_order', 'asc')
@@ -848,59 +1346,60 @@ def materials():
         conditions.append("UnitOfMeasure = %s")
         params.append(filter_unit)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
     valid_sort_columns = ['MaterialName', 'BaseUnitPrice']
     if sort_by not in valid_sort_columns:
         sort_by = 'MaterialName'
+    sort_order = normalize_sort_order(sort_order)
     
-    query += f" ORDER BY {sort_by} {sort_order.upper()}"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    materials = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    order_keys = [(sort_by, itemgetter(sort_by)), ("MaterialID", itemgetter('MaterialID'))]
+    materials, next_cursor = fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order)
     
-    myCursor.execute("SELECT DISTINCT UnitOfMeasure FROM Material WHERE UnitOfMeasure IS NOT NULL ORDER BY UnitOfMeasure")
-    units = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    units = get_lookup('units')
     
-    return render_template('materials.html', materials=materials, units=units, filter_unit=filter_unit, sort_by=sort_by, sort_order=sort_order)
+    return render_template('materials.html', materials=materials, units=units, filter_unit=filter_unit, sort_by=sort_by, sort_order=sort_order,
+                         **page_links(next_cursor))
 
 @app.route('/materials/add', methods=['POST'])
 def add_material():
+    db = get_db()
+    cursor = get_cursor()
     name = request.form.get('material_name')
     base_price = request.form.get('base_unit_price')
     unit = request.form.get('unit_of_measure')
     
     query = "INSERT INTO Material (MaterialName, BaseUnitPrice, UnitOfMeasure) VALUES (%s, %s, %s)"
-    myCursor.execute(query, (name, base_price, unit))
-    myDB.commit()
+    cursor.execute(query, (name, base_price, unit))
+    mark_tables_changed('Material')
+    db.commit()
     
     flash('Material added successfully!', 'success')
     return redirect(url_for('materials'))
 
 @app.route('/materials/update/<int:material_id>', methods=['POST'])
 def update_material(material_id):
+    db = get_db()
+    cursor = get_cursor()
     name = request.form.get('material_name')
     base_price = request.form.get('base_unit_price')
     unit = request.form.get('unit_of_measure')
     
     query = "UPDATE Material SET MaterialName = %s, BaseUnitPrice = %s, UnitOfMeasure = %s WHERE MaterialID = %s"
-    myCursor.execute(query, (name, base_price, unit, material_id))
-    myDB.commit()
+    cursor.execute(query, (name, base_price, unit, material_id))
+    mark_tables_changed('Material')
+    db.commit()
     
     flash('Material updated successfully!', 'success')
     return redirect(url_for('materials'))
 
 @app.route('/materials/delete/<int:material_id>', methods=['POST'])
 def delete_material(material_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Material WHERE MaterialID = %s"
-        myCursor.execute(query, (material_id,))
-        myDB.commit()
+        cursor.execute(query, (material_id,))
+        mark_tables_changed('Material', deleted=True)
+        db.commit()
         flash('Material deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting material: {str(e)}', 'error')
@@ -908,31 +1407,34 @@ def delete_material(material_id):
 
 @app.route('/work_assignments')
 @admin_required
+@conditional_listing('WorkAssignment', 'Project', 'Employee', 'Role')
 def work_assignments():
+    cursor = get_cursor()
     query = """
         SELECT wa.*, p.ProjectName, e.EmployeeName, r.Title as Position
         FROM WorkAssignment wa
         JOIN Project p ON wa.ProjectID = p.ProjectID
         JOIN Employee e ON wa.EmployeeID = e.EmployeeID
         JOIN Role r ON e.PositionID = r.RoleID
-        ORDER BY wa.StartDate DESC
     """
-    myCursor.execute(query)
-    cols = [c[0] for c in myCursor.description]
-    assignments = [dict(zip(cols, r)) for r in myCursor.fetchall()]
+    order_keys = [
+        ("wa.StartDate", itemgetter('StartDate')),
+        ("wa.ProjectID", itemgetter('ProjectID')),
+        ("wa.EmployeeID", itemgetter('EmployeeID')),
+    ]
+    projects = get_lookup('projects')
+    employees = get_lookup('employees')
+    roles = get_lookup('assignment_roles')
     
-    myCursor.execute("SELECT ProjectID, ProjectName FROM Project ORDER BY ProjectName")
-    projects = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT EmployeeID, EmployeeName FROM Employee ORDER BY EmployeeName")
-    employees = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT DISTINCT Role FROM WorkAssignment ORDER BY Role")
-    roles = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    assignments, next_cursor = listing_rows(cursor, query, [], [], order_keys, 'desc')
     
-    return render_template('work_assignments.html', assignments=assignments, projects=projects, 
-                         employees=employees, roles=roles)
+    return render_listing('work_assignments.html', assignments=assignments, projects=projects, 
+                         employees=employees, roles=roles, **page_links(next_cursor, streamable=True))
 
 @app.route('/work_assignments/add', methods=['POST'])
 def add_work_assignment():
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     employee_id = request.form.get('employee_id')
     role = request.form.get('role')
@@ -944,46 +1446,52 @@ def add_work_assignment():
         INSERT INTO WorkAssignment (ProjectID, EmployeeID, Role, HoursWorked, StartDate, EndDate)
         VALUES (%s, %s, %s, %s, %s, %s)
     """
-    myCursor.execute(query, (project_id, employee_id, role, hours, start_date, end_date))
-    myDB.commit()
+    cursor.execute(query, (project_id, employee_id, role, hours, start_date, end_date))
+    if summaries_enabled():
+        add_employee_hours(cursor, employee_id, 1, money(hours))
+    mark_tables_changed('WorkAssignment')
+    db.commit()
     
     flash('Work assignment added successfully!', 'success')
     return redirect(url_for('work_assignments'))
 
-@app.route('/work_assignments/update/<int:assignment_id>', methods=['POST'])
-def update_work_assignment(assignment_id):
-    project_id = request.form.get('project_id')
-    employee_id = request.form.get('employee_id')
-    role = request.form.get('role')
-    hours = request.form.get('hours_worked') or 0
-    start_date = request.form.get('start_date')
-    end_date = request.form.get('end_date') or None
-    
-    query = """
-        UPDATE WorkAssignment SET ProjectID = %s, EmployeeID = %s, Role = %s, 
-        HoursWorked = %s, StartDate = %s, EndDate = %s 
-        WHERE AssignmentID = %s
-    """
-    myCursor.execute(query, (project_id, employee_id, role, hours, start_date, end_date, assignment_id))
-    myDB.commit()
-    
-    flash('Work assignment updated successfully!', 'success')
+@app.route('/work_assignments/update/<int:project_id>/<int:employee_id>', methods=['POST'])
+def update_work_assignment(project_id, employee_id):
+    values = {
+        'ProjectID': request.form.get('project_id'),
+        'EmployeeID': request.form.get('employee_id'),
+        'Role': request.form.get('role'),
+        'HoursWorked': request.form.get('hours_worked') or 0,
+        'StartDate': request.form.get('start_date'),
+        'EndDate': request.form.get('end_date') or None,
+    }
+    try:
+        if write_form_row('work_assignments', (project_id, employee_id), values):
+            flash('Work assignment updated successfully!', 'success')
+        else:
+            flash('Work assignment not found', 'error')
+    except Exception as e:
+        get_db().rollback()
+        flash(f'Error updating work assignment: {str(e)}', 'error')
     return redirect(url_for('work_assignments'))
 
-@app.route('/work_assignments/delete/<int:assignment_id>', methods=['POST'])
-def delete_work_assignment(assignment_id):
+@app.route('/work_assignments/delete/<int:project_id>/<int:employee_id>', methods=['POST'])
+def delete_work_assignment(project_id, employee_id):
     try:
-        query = "DELETE FROM WorkAssignment WHERE AssignmentID = %s"
-        myCursor.execute(query, (assignment_id,))
-        myDB.commit()
-        flash('Work assignment deleted successfully!', 'success')
+        if write_form_row('work_assignments', (project_id, employee_id)):
+            flash('Work assignment deleted successfully!', 'success')
+        else:
+            flash('Work assignment not found', 'error')
     except Exception as e:
+        get_db().rollback()
         flash(f'Error deleting work assignment: {str(e)}', 'error')
     return redirect(url_for('work_assignments'))
 
 @app.route('/project_materials')
 @admin_required
+@conditional_listing('ProjectMaterial', 'Project', 'Material')
 def project_materials():
+    cursor = get_cursor()
     filter_project = request.args.get('filter_project', '').strip() or None
     filter_material = request.args.get('filter_material', '').strip() or None
     sort_by = request.args.get('sort_by', 'UnitPrice')
@@ -1006,37 +1514,30 @@ def project_materials():
         conditions.append("pm.MaterialID = %s")
         params.append(filter_material)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
     valid_sort_columns = ['UnitPrice', 'TotalCost']
     if sort_by not in valid_sort_columns:
         sort_by = 'UnitPrice'
+    sort_order = normalize_sort_order(sort_order)
     
     if sort_by == 'TotalCost':
-        query += f" ORDER BY (pm.Quantity * pm.UnitPrice) {sort_order.upper()}"
-    else:
-        query += f" ORDER BY pm.{sort_by} {sort_order.upper()}"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
+        sort_key = ("(pm.Quantity * pm.UnitPrice)", lambda row: row['Quantity'] * row['UnitPrice'])
     else:
-        myCursor.execute(query)
+        sort_key = ("pm.UnitPrice", itemgetter('UnitPrice'))
+    order_keys = [sort_key, ("pm.ProjectID", itemgetter('ProjectID')), ("pm.MaterialID", itemgetter('MaterialID'))]
+    project_materials, next_cursor = fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order)
     
-    project_materials = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    
-    myCursor.execute("SELECT ProjectID, ProjectName FROM Project ORDER BY ProjectName")
-    projects = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT MaterialID, MaterialName FROM Material ORDER BY MaterialName")
-    materials = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    projects = get_lookup('projects')
+    materials = get_lookup('materials')
     
     return render_template('project_materials.html', project_materials=project_materials, 
                          projects=projects, materials=materials,
                          filter_project=filter_project, filter_material=filter_material,
-                         sort_by=sort_by, sort_order=sort_order)
+                         sort_by=sort_by, sort_order=sort_order, **page_links(next_cursor))
 
 @app.route('/project_materials/add', methods=['POST'])
 def add_project_material():
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     material_id = request.form.get('material_id')
     quantity = request.form.get('quantity')
@@ -1046,44 +1547,50 @@ def add_project_material():
         INSERT INTO ProjectMaterial (ProjectID, MaterialID, Quantity, UnitPrice)
         VALUES (%s, %s, %s, %s)
     """
-    myCursor.execute(query, (project_id, material_id, quantity, unit_price))
-    myDB.commit()
+    cursor.execute(query, (project_id, material_id, quantity, unit_price))
+    if summaries_enabled():
+        add_material_spend(cursor, material_id, 1, money(quantity) * money(unit_price))
+    mark_tables_changed('ProjectMaterial')
+    db.commit()
     
     flash('Project material added successfully!', 'success')
     return redirect(url_for('project_materials'))
 
-@app.route('/project_materials/update/<int:project_material_id>', methods=['POST'])
-def update_project_material(project_material_id):
-    project_id = request.form.get('project_id')
-    material_id = request.form.get('material_id')
-    quantity = request.form.get('quantity')
-    unit_price = request.form.get('unit_price')
-    
-    query = """
-        UPDATE ProjectMaterial SET ProjectID = %s, MaterialID = %s, 
-        Quantity = %s, UnitPrice = %s 
-        WHERE ProjectMaterialID = %s
-    """
-    myCursor.execute(query, (project_id, material_id, quantity, unit_price, project_material_id))
-    myDB.commit()
-    
-    flash('Project material updated successfully!', 'success')
+@app.route('/project_materials/update/<int:project_id>/<int:material_id>', methods=['POST'])
+def update_project_material(project_id, material_id):
+    values = {
+        'ProjectID': request.form.get('project_id'),
+        'MaterialID': request.form.get('material_id'),
+        'Quantity': request.form.get('quantity'),
+        'UnitPrice': request.form.get('unit_price'),
+    }
+    try:
+        if write_form_row('project_materials', (project_id, material_id), values):
+            flash('Project material updated successfully!', 'success')
+        else:
+            flash('Project material not found', 'error')
+    except Exception as e:
+        get_db().rollback()
+        flash(f'Error updating project material: {str(e)}', 'error')
     return redirect(url_for('project_materials'))
 
-@app.route('/project_materials/delete/<int:project_material_id>', methods=['POST'])
-def delete_project_material(project_material_id):
+@app.route('/project_materials/delete/<int:project_id>/<int:material_id>', methods=['POST'])
+def delete_project_material(project_id, material_id):
     try:
-        query = "DELETE FROM ProjectMaterial WHERE ProjectMaterialID = %s"
-        myCursor.execute(query, (project_material_id,))
-        myDB.commit()
-        flash('Project material deleted successfully!', 'success')
+        if write_form_row('project_materials', (project_id, material_id)):
+            flash('Project material deleted successfully!', 'success')
+        else:
+            flash('Project material not found', 'error')
     except Exception as e:
+        get_db().rollback()
         flash(f'Error deleting project material: {str(e)}', 'error')
     return redirect(url_for('project_materials'))
 
 @app.route('/supplier_materials')
 @admin_required
+@conditional_listing('SupplierMaterial', 'Supplier', 'Material')
 def supplier_materials():
+    cursor = get_cursor()
     filter_supplier = request.args.get('filter_supplier', '').strip() or None
     filter_material = request.args.get('filter_material', '').strip() or None
     sort_by = request.args.get('sort_by', 'Price')
@@ -1106,76 +1613,78 @@ def supplier_materials():
         conditions.append("sm.MaterialID = %s")
         params.append(filter_material)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
-    query += f" ORDER BY sm.Price {sort_order.upper()}"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    supplier_materials = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    sort_order = normalize_sort_order(sort_order)
+    order_keys = [
+        ("sm.Price", itemgetter('Price')),
+        ("sm.SupplierID", itemgetter('SupplierID')),
+        ("sm.MaterialID", itemgetter('MaterialID')),
+    ]
+    supplier_materials, next_cursor = fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order)
     
-    myCursor.execute("SELECT SupplierID, SupplierName FROM Supplier ORDER BY SupplierName")
-    suppliers = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT MaterialID, MaterialName FROM Material ORDER BY MaterialName")
-    materials = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    suppliers = get_lookup('suppliers')
+    materials = get_lookup('materials')
     
     return render_template('supplier_materials.html', supplier_materials=supplier_materials,
                          suppliers=suppliers, materials=materials,
                          filter_supplier=filter_supplier, filter_material=filter_material,
-                         sort_by=sort_by, sort_order=sort_order)
+                         sort_by=sort_by, sort_order=sort_order, **page_links(next_cursor))
 
 @app.route('/supplier_materials/add', methods=['POST'])
 def add_supplier_material():
+    db = get_db()
+    cursor = get_cursor()
     supplier_id = request.form.get('supplier_id')
     material_id = request.form.get('material_id')
     price = request.form.get('price')
     lead_time = request.form.get('lead_time') or None
     
-    query = """
-        INSERT INTO SupplierMaterial (SupplierID, MaterialID, Price, LeadTime)
-        VALUES (%s, %s, %s, %s)
-    """
-    myCursor.execute(query, (supplier_id, material_id, price, lead_time))
-    myDB.commit()
+    insert_row(cursor, 'SupplierMaterial', {
+        'SupplierID': supplier_id,
+        'MaterialID': material_id,
+        'Price': price,
+        'LeadTime': lead_time,
+    })
+    if best_prices_enabled():
+        refresh_best_price(cursor, material_id)
+    mark_tables_changed('SupplierMaterial')
+    db.commit()
     
     flash('Supplier material added successfully!', 'success')
     return redirect(url_for('supplier_materials'))
 
-@app.route('/supplier_materials/update/<int:supplier_material_id>', methods=['POST'])
-def update_supplier_material(supplier_material_id):
-    supplier_id = request.form.get('supplier_id')
-    material_id = request.form.get('material_id')
-    price = request.form.get('price')
-    lead_time = request.form.get('lead_time') or None
-    
-    query = """
-        UPDATE SupplierMaterial SET SupplierID = %s, MaterialID = %s, 
-        Price = %s, LeadTime = %s 
-        WHERE SupplierMaterialID = %s
-    """
-    myCursor.execute(query, (supplier_id, material_id, price, lead_time, supplier_material_id))
-    myDB.commit()
-    
-    flash('Supplier material updated successfully!', 'success')
+@app.route('/supplier_materials/update/<int:supplier_id>/<int:material_id>', methods=['POST'])
+def update_supplier_material(supplier_id, material_id):
+    values = {
+        'SupplierID': request.form.get('supplier_id'),
+        'MaterialID': request.form.get('material_id'),
+        'Price': request.form.get('price'),
+        'LeadTime': request.form.get('lead_time') or None,
+    }
+    try:
+        if write_form_row('supplier_materials', (supplier_id, material_id), values):
+            flash('Supplier material updated successfully!', 'success')
+        else:
+            flash('Supplier material not found', 'error')
+    except Exception as e:
+        get_db().rollback()
+        flash(f'Error updating supplier material: {str(e)}', 'error')
     return redirect(url_for('supplier_materials'))
 
-@app.route('/supplier_materials/delete/<int:supplier_material_id>', methods=['POST'])
-def delete_supplier_material(supplier_material_id):
+@app.route('/supplier_materials/delete/<int:supplier_id>/<int:material_id>', methods=['POST'])
+def delete_supplier_material(supplier_id, material_id):
     try:
-        query = "DELETE FROM SupplierMaterial WHERE SupplierMaterialID = %s"
-        myCursor.execute(query, (supplier_material_id,))
-        myDB.commit()
-        flash('Supplier material deleted successfully!', 'success')
+        if write_form_row('supplier_materials', (supplier_id, material_id)):
+            flash('Supplier material deleted successfully!', 'success')
+        else:
+            flash('Supplier material not found', 'error')
     except Exception as e:
+        get_db().rollback()
         flash(f'Error deleting supplier material: {str(e)}', 'error')
     return redirect(url_for('supplier_materials'))
 
 @app.route('/contracts')
 @admin_required
+@conditional_listing('Contract', 'Project', 'Client')
 def contracts():
     filter_status = request.args.get('filter_status', '').strip() or None
     filter_project = request.args.get('filter_project', '').strip() or None
@@ -1203,30 +1712,20 @@ def contracts():
         conditions.append("c.ClientID = %s")
         params.append(filter_client)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
-    query += f" ORDER BY c.TotalValue {sort_order.upper()}"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    cols = [c[0] for c in myCursor.description]
-    contracts = [dict(zip(cols, r)) for r in myCursor.fetchall()]
-    
-    myCursor.execute("SELECT ProjectID, ProjectName FROM Project ORDER BY ProjectName")
-    projects = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT ClientID, ClientName FROM Client ORDER BY ClientName")
-    clients = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    sort_order = normalize_sort_order(sort_order, 'desc')
+    order_keys = [("c.TotalValue", itemgetter('TotalValue')), ("c.ContractID", itemgetter('ContractID'))]
+    (contracts, next_cursor), lookups = fetch_with_lookups(
+        lambda cursor: fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order),
+        'projects', 'clients')
     
-    return render_template('contracts.html', contracts=contracts, projects=projects, clients=clients,
+    return render_template('contracts.html', contracts=contracts, **lookups,
                          filter_status=filter_status, filter_project=filter_project, filter_client=filter_client,
-                         sort_by=sort_by, sort_order=sort_order)
+                         sort_by=sort_by, sort_order=sort_order, **page_links(next_cursor))
 
 @app.route('/contracts/add', methods=['POST'])
 def add_contract():
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     client_id = request.form.get('client_id')
     start_date = request.form.get('start_date')
@@ -1234,18 +1733,24 @@ def add_contract():
     total_value = request.form.get('total_value')
     status = request.form.get('status', 'active')
     
-    query = """
-        INSERT INTO Contract (ProjectID, ClientID, StartDate, EndDate, TotalValue, Status)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """
-    myCursor.execute(query, (project_id, client_id, start_date, end_date, total_value, status))
-    myDB.commit()
+    insert_row(cursor, 'Contract', {
+        'ProjectID': project_id,
+        'ClientID': client_id,
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'TotalValue': total_value,
+        'Status': status,
+    })
+    mark_tables_changed('Contract')
+    db.commit()
     
     flash('Contract added successfully!', 'success')
     return redirect(url_for('contracts'))
 
 @app.route('/contracts/update/<int:contract_id>', methods=['POST'])
 def update_contract(contract_id):
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     client_id = request.form.get('client_id')
     start_date = request.form.get('start_date')
@@ -1253,23 +1758,29 @@ def update_contract(contract_id):
     total_value = request.form.get('total_value')
     status = request.form.get('status', 'active')
     
-    query = """
-        UPDATE Contract SET ProjectID = %s, ClientID = %s, StartDate = %s, 
-        EndDate = %s, TotalValue = %s, Status = %s 
-        WHERE ContractID = %s
-    """
-    myCursor.execute(query, (project_id, client_id, start_date, end_date, total_value, status, contract_id))
-    myDB.commit()
+    update_row(cursor, 'Contract', {
+        'ProjectID': project_id,
+        'ClientID': client_id,
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'TotalValue': total_value,
+        'Status': status,
+    }, 'ContractID', contract_id)
+    mark_tables_changed('Contract')
+    db.commit()
     
     flash('Contract updated successfully!', 'success')
     return redirect(url_for('contracts'))
 
 @app.route('/contracts/delete/<int:contract_id>', methods=['POST'])
 def delete_contract(contract_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Contract WHERE ContractID = %s"
-        myCursor.execute(query, (contract_id,))
-        myDB.commit()
+        cursor.execute(query, (contract_id,))
+        mark_tables_changed('Contract', deleted=True)
+        db.commit()
         flash('Contract deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting contract: {str(e)}', 'error')
@@ -1277,7 +1788,9 @@ def delete_contract(contract_id):
 
 @app.route('/phases')
 @admin_required
+@conditional_listing('Phase', 'Project')
 def phases():
+    cursor = get_cursor()
     filter_project = request.args.get('filter_project', '').strip() or None
     filter_status = request.args.get('filter_status', '').strip() or None
     
@@ -1297,26 +1810,18 @@ def phases():
         conditions.append("ph.Status = %s")
         params.append(filter_status)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
-    query += " ORDER BY ph.PhaseID DESC"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    phases = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    order_keys = [("ph.PhaseID", itemgetter('PhaseID'))]
+    phases, next_cursor = fetch_keyset_page(cursor, query, conditions, params, order_keys, 'desc')
     
-    myCursor.execute("SELECT ProjectID, ProjectName FROM Project ORDER BY ProjectName")
-    projects = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    projects = get_lookup('projects')
     
     return render_template('phases.html', phases=phases, projects=projects,
-                         filter_project=filter_project, filter_status=filter_status)
+                         filter_project=filter_project, filter_status=filter_status, **page_links(next_cursor))
 
 @app.route('/phases/add', methods=['POST'])
 def add_phase():
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     name = request.form.get('name')
     description = request.form.get('description') or None
@@ -1324,18 +1829,24 @@ def add_phase():
     end_date = request.form.get('end_date') or None
     status = request.form.get('status', 'planned')
     
-    query = """
-        INSERT INTO Phase (ProjectID, Name, Description, StartDate, EndDate, Status)
-        VALUES (%s, %s, %s, %s, %s, %s)
-    """
-    myCursor.execute(query, (project_id, name, description, start_date, end_date, status))
-    myDB.commit()
+    insert_row(cursor, 'Phase', {
+        'ProjectID': project_id,
+        'Name': name,
+        'Description': description,
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'Status': status,
+    })
+    mark_tables_changed('Phase')
+    db.commit()
     
     flash('Phase added successfully!', 'success')
     return redirect(url_for('phases'))
 
 @app.route('/phases/update/<int:phase_id>', methods=['POST'])
 def update_phase(phase_id):
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     name = request.form.get('name')
     description = request.form.get('description') or None
@@ -1343,23 +1854,29 @@ def update_phase(phase_id):
     end_date = request.form.get('end_date') or None
     status = request.form.get('status', 'planned')
     
-    query = """
-        UPDATE Phase SET ProjectID = %s, Name = %s, Description = %s, 
-        StartDate = %s, EndDate = %s, Status = %s 
-        WHERE PhaseID = %s
-    """
-    myCursor.execute(query, (project_id, name, description, start_date, end_date, status, phase_id))
-    myDB.commit()
+    update_row(cursor, 'Phase', {
+        'ProjectID': project_id,
+        'Name': name,
+        'Description': description,
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'Status': status,
+    }, 'PhaseID', phase_id)
+    mark_tables_changed('Phase')
+    db.commit()
     
     flash('Phase updated successfully!', 'success')
     return redirect(url_for('phases'))
 
 @app.route('/phases/delete/<int:phase_id>', methods=['POST'])
 def delete_phase(phase_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Phase WHERE PhaseID = %s"
-        myCursor.execute(query, (phase_id,))
-        myDB.commit()
+        cursor.execute(query, (phase_id,))
+        mark_tables_changed('Phase', deleted=True)
+        db.commit()
         flash('Phase deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting phase: {str(e)}', 'error')
@@ -1367,6 +1884,7 @@ def delete_phase(phase_id):
 
 @app.route('/schedules')
 @admin_required
+@conditional_listing('Schedule', 'Project', 'Phase')
 def schedules():
     filter_project = request.args.get('filter_project', '').strip() or None
     filter_phase = request.args.get('filter_phase', '').strip() or None
@@ -1388,69 +1906,69 @@ def schedules():
         conditions.append("s.PhaseID = %s")
         params.append(filter_phase)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
-    query += " ORDER BY s.ScheduleID DESC"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    schedules = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    order_keys = [("s.ScheduleID", itemgetter('ScheduleID'))]
+    (schedules, next_cursor), lookups = fetch_with_lookups(
+        lambda cursor: fetch_keyset_page(cursor, query, conditions, params, order_keys, 'desc'),
+        'projects', 'phases')
     
-    myCursor.execute("SELECT ProjectID, ProjectName FROM Project ORDER BY ProjectName")
-    projects = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT PhaseID, Name, ProjectID FROM Phase ORDER BY PhaseID")
-    phases = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    
-    return render_template('schedules.html', schedules=schedules, projects=projects, phases=phases,
-                         filter_project=filter_project, filter_phase=filter_phase)
+    return render_template('schedules.html', schedules=schedules, **lookups,
+                         filter_project=filter_project, filter_phase=filter_phase, **page_links(next_cursor))
 
 @app.route('/schedules/add', methods=['POST'])
 def add_schedule():
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     phase_id = request.form.get('phase_id')
     start_date = request.form.get('start_date')
     end_date = request.form.get('end_date') or None
     task_details = request.form.get('task_details') or None
     
-    query = """
-        INSERT INTO Schedule (ProjectID, PhaseID, StartDate, EndDate, TaskDetails)
-        VALUES (%s, %s, %s, %s, %s)
-    """
-    myCursor.execute(query, (project_id, phase_id, start_date, end_date, task_details))
-    myDB.commit()
+    insert_row(cursor, 'Schedule', {
+        'ProjectID': project_id,
+        'PhaseID': phase_id,
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'TaskDetails': task_details,
+    })
+    mark_tables_changed('Schedule')
+    db.commit()
     
     flash('Schedule added successfully!', 'success')
     return redirect(url_for('schedules'))
 
 @app.route('/schedules/update/<int:schedule_id>', methods=['POST'])
 def update_schedule(schedule_id):
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     phase_id = request.form.get('phase_id')
     start_date = request.form.get('start_date')
     end_date = request.form.get('end_date') or None
     task_details = request.form.get('task_details') or None
     
-    query = """
-        UPDATE Schedule SET ProjectID = %s, PhaseID = %s, StartDate = %s, 
-        EndDate = %s, TaskDetails = %s 
-        WHERE ScheduleID = %s
-    """
-    myCursor.execute(query, (project_id, phase_id, start_date, end_date, task_details, schedule_id))
-    myDB.commit()
+    update_row(cursor, 'Schedule', {
+        'ProjectID': project_id,
+        'PhaseID': phase_id,
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'TaskDetails': task_details,
+    }, 'ScheduleID', schedule_id)
+    mark_tables_changed('Schedule')
+    db.commit()
     
     flash('Schedule updated successfully!', 'success')
     return redirect(url_for('schedules'))
 
 @app.route('/schedules/delete/<int:schedule_id>', methods=['POST'])
 def delete_schedule(schedule_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Schedule WHERE ScheduleID = %s"
-        myCursor.execute(query, (schedule_id,))
-        myDB.commit()
+        cursor.execute(query, (schedule_id,))
+        mark_tables_changed('Schedule', deleted=True)
+        db.commit()
         flash('Schedule deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting schedule: {str(e)}', 'error')
@@ -1458,7 +1976,9 @@ def delete_schedule(schedule_id):
 
 @app.route('/sales')
 @admin_required
+@conditional_listing('Sales', 'Project', 'Client')
 def sales():
+    cursor = get_cursor()
     filter_project = request.args.get('filter_project', '').strip() or None
     filter_client = request.args.get('filter_client', '').strip() or None
     sort_by = request.args.get('sort_by', 'SaleID')
@@ -1481,34 +2001,27 @@ def sales():
         conditions.append("s.ClientID = %s")
         params.append(filter_client)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
     valid_sort_columns = ['SaleID', 'Amount']
     if sort_by not in valid_sort_columns:
         sort_by = 'SaleID'
+    sort_order = normalize_sort_order(sort_order, 'desc')
     
-    query += f" ORDER BY s.{sort_by} {sort_order.upper()}"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    cols = [c[0] for c in myCursor.description]
-    sales = [dict(zip(cols, r)) for r in myCursor.fetchall()]
+    order_keys = [("s.SaleID", itemgetter('SaleID'))]
+    if sort_by == 'Amount':
+        order_keys.insert(0, ("s.Amount", itemgetter('Amount')))
+    sales, next_cursor = fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order)
     
-    myCursor.execute("SELECT ProjectID, ProjectName FROM Project ORDER BY ProjectName")
-    projects = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT ClientID, ClientName FROM Client ORDER BY ClientName")
-    clients = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    projects = get_lookup('projects')
+    clients = get_lookup('clients')
     
     return render_template('sales.html', sales=sales, projects=projects, clients=clients,
                          filter_project=filter_project, filter_client=filter_client,
-                         sort_by=sort_by, sort_order=sort_order)
+                         sort_by=sort_by, sort_order=sort_order, **page_links(next_cursor))
 
 @app.route('/sales/add', methods=['POST'])
 def add_sale():
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     client_id = request.form.get('client_id')
     amount = request.form.get('amount')
@@ -1519,14 +2032,17 @@ def add_sale():
         INSERT INTO Sales (ProjectID, ClientID, Amount, IssueDate, DueDate)
         VALUES (%s, %s, %s, %s, %s)
     """
-    myCursor.execute(query, (project_id, client_id, amount, issue_date, due_date))
-    myDB.commit()
+    cursor.execute(query, (project_id, client_id, amount, issue_date, due_date))
+    mark_tables_changed('Sales')
+    db.commit()
     
     flash('Sale added successfully!', 'success')
     return redirect(url_for('sales'))
 
 @app.route('/sales/update/<int:sale_id>', methods=['POST'])
 def update_sale(sale_id):
+    db = get_db()
+    cursor = get_cursor()
     project_id = request.form.get('project_id')
     client_id = request.form.get('client_id')
     amount = request.form.get('amount')
@@ -1538,18 +2054,22 @@ def update_sale(sale_id):
         IssueDate = %s, DueDate = %s 
         WHERE SaleID = %s
     """
-    myCursor.execute(query, (project_id, client_id, amount, issue_date, due_date, sale_id))
-    myDB.commit()
+    cursor.execute(query, (project_id, client_id, amount, issue_date, due_date, sale_id))
+    mark_tables_changed('Sales')
+    db.commit()
     
     flash('Sale updated successfully!', 'success')
     return redirect(url_for('sales'))
 
 @app.route('/sales/delete/<int:sale_id>', methods=['POST'])
 def delete_sale(sale_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Sales WHERE SaleID = %s"
-        myCursor.execute(query, (sale_id,))
-        myDB.commit()
+        cursor.execute(query, (sale_id,))
+        mark_tables_changed('Sales', deleted=True)
+        db.commit()
         flash('Sale deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting sale: {str(e)}', 'error')
@@ -1557,7 +2077,9 @@ def delete_sale(sale_id):
 
 @app.route('/purchases')
 @admin_required
+@conditional_listing('Purchase', 'Supplier', 'Material')
 def purchases():
+    cursor = get_cursor()
     filter_supplier = request.args.get('filter_supplier', '').strip() or None
     filter_material = request.args.get('filter_material', '').strip() or None
     sort_by = request.args.get('sort_by', 'TotalCost')
@@ -1580,29 +2102,20 @@ def purchases():
         conditions.append("pu.MaterialID = %s")
         params.append(filter_material)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
-    query += f" ORDER BY pu.TotalCost {sort_order.upper()}"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
-    else:
-        myCursor.execute(query)
-    
-    purchases = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    sort_order = normalize_sort_order(sort_order, 'desc')
+    order_keys = [("pu.TotalCost", itemgetter('TotalCost')), ("pu.PurchaseID", itemgetter('PurchaseID'))]
+    suppliers = get_lookup('suppliers')
+    materials = get_lookup('materials')
+    purchases, next_cursor = listing_rows(cursor, query, conditions, params, order_keys, sort_order)
     
-    myCursor.execute("SELECT SupplierID, SupplierName FROM Supplier ORDER BY SupplierName")
-    suppliers = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT MaterialID, MaterialName FROM Material ORDER BY MaterialName")
-    materials = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    
-    return render_template('purchases.html', purchases=purchases, suppliers=suppliers, materials=materials,
+    return render_listing('purchases.html', purchases=purchases, suppliers=suppliers, materials=materials,
                          filter_supplier=filter_supplier, filter_material=filter_material,
-                         sort_by=sort_by, sort_order=sort_order)
+                         sort_by=sort_by, sort_order=sort_order, **page_links(next_cursor, streamable=True))
 
 @app.route('/purchases/add', methods=['POST'])
 def add_purchase():
+    db = get_db()
+    cursor = get_cursor()
     supplier_id = request.form.get('supplier_id')
     material_id = request.form.get('material_id')
     quantity = request.form.get('quantity')
@@ -1613,14 +2126,17 @@ def add_purchase():
         INSERT INTO Purchase (SupplierID, MaterialID, Quantity, PurchaseDate, TotalCost)
         VALUES (%s, %s, %s, %s, %s)
     """
-    myCursor.execute(query, (supplier_id, material_id, quantity, purchase_date, total_cost))
-    myDB.commit()
+    cursor.execute(query, (supplier_id, material_id, quantity, purchase_date, total_cost))
+    mark_tables_changed('Purchase')
+    db.commit()
     
     flash('Purchase added successfully!', 'success')
     return redirect(url_for('purchases'))
 
 @app.route('/purchases/update/<int:purchase_id>', methods=['POST'])
 def update_purchase(purchase_id):
+    db = get_db()
+    cursor = get_cursor()
     supplier_id = request.form.get('supplier_id')
     material_id = request.form.get('material_id')
     quantity = request.form.get('quantity')
@@ -1632,18 +2148,22 @@ def update_purchase(purchase_id):
         PurchaseDate = %s, TotalCost = %s 
         WHERE PurchaseID = %s
     """
-    myCursor.execute(query, (supplier_id, material_id, quantity, purchase_date, total_cost, purchase_id))
-    myDB.commit()
+    cursor.execute(query, (supplier_id, material_id, quantity, purchase_date, total_cost, purchase_id))
+    mark_tables_changed('Purchase')
+    db.commit()
     
     flash('Purchase updated successfully!', 'success')
     return redirect(url_for('purchases'))
 
 @app.route('/purchases/delete/<int:purchase_id>', methods=['POST'])
 def delete_purchase(purchase_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Purchase WHERE PurchaseID = %s"
-        myCursor.execute(query, (purchase_id,))
-        myDB.commit()
+        cursor.execute(query, (purchase_id,))
+        mark_tables_changed('Purchase', deleted=True)
+        db.commit()
         flash('Purchase deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting purchase: {str(e)}', 'error')
@@ -1651,6 +2171,7 @@ def delete_purchase(purchase_id):
 
 @app.route('/payments')
 @admin_required
+@conditional_listing('Payment', 'Client', 'Supplier')
 def payments():
     filter_type = request.args.get('filter_type', '').strip() or None
     filter_client = request.args.get('filter_client', '').strip() or None
@@ -1680,29 +2201,25 @@ def payments():
         conditions.append("py.ToSupplier = %s")
         params.append(filter_supplier)
     
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    
-    query += f" ORDER BY py.Amount {sort_order.upper()}"
-    
-    if params:
-        myCursor.execute(query, tuple(params))
+    sort_order = normalize_sort_order(sort_order, 'desc')
+    order_keys = [("py.Amount", itemgetter('Amount')), ("py.PaymentID", itemgetter('PaymentID'))]
+    if wants_all_rows():
+        # The stream holds the connection, so the lookups go first
+        lookups = {name: get_lookup(name) for name in ('clients', 'suppliers')}
+        payments, next_cursor = listing_rows(None, query, conditions, params, order_keys, sort_order)
     else:
-        myCursor.execute(query)
-    
-    payments = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+        (payments, next_cursor), lookups = fetch_with_lookups(
+            lambda cursor: fetch_keyset_page(cursor, query, conditions, params, order_keys, sort_order),
+            'clients', 'suppliers')
     
-    myCursor.execute("SELECT ClientID, ClientName FROM Client ORDER BY ClientName")
-    clients = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    myCursor.execute("SELECT SupplierID, SupplierName FROM Supplier ORDER BY SupplierName")
-    suppliers = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
-    
-    return render_template('payments.html', payments=payments, clients=clients, suppliers=suppliers,
+    return render_listing('payments.html', payments=payments, **lookups,
                          filter_type=filter_type, filter_client=filter_client, filter_supplier=filter_supplier,
-                         sort_by=sort_by, sort_order=sort_order)
+                         sort_by=sort_by, sort_order=sort_order, **page_links(next_cursor, streamable=True))
 
 @app.route('/payments/add', methods=['POST'])
 def add_payment():
+    db = get_db()
+    cursor = get_cursor()
     from_client = request.form.get('from_client') or None
     to_supplier = request.form.get('to_supplier') or None
     amount = request.form.get('amount')
@@ -1713,14 +2230,17 @@ def add_payment():
         INSERT INTO Payment (FromClient, ToSupplier, Amount, PaymentDate, PaymentMethod)
         VALUES (%s, %s, %s, %s, %s)
     """
-    myCursor.execute(query, (from_client, to_supplier, amount, payment_date, payment_method))
-    myDB.commit()
+    cursor.execute(query, (from_client, to_supplier, amount, payment_date, payment_method))
+    mark_tables_changed('Payment')
+    db.commit()
     
     flash('Payment added successfully!', 'success')
     return redirect(url_for('payments'))
 
 @app.route('/payments/update/<int:payment_id>', methods=['POST'])
 def update_payment(payment_id):
+    db = get_db()
+    cursor = get_cursor()
     from_client = request.form.get('from_client') or None
     to_supplier = request.form.get('to_supplier') or None
     amount = request.form.get('amount')
@@ -1732,23 +2252,40 @@ def update_payment(payment_id):
         PaymentDate = %s, PaymentMethod = %s 
         WHERE PaymentID = %s
     """
-    myCursor.execute(query, (from_client, to_supplier, amount, payment_date, payment_method, payment_id))
-    myDB.commit()
+    cursor.execute(query, (from_client, to_supplier, amount, payment_date, payment_method, payment_id))
+    mark_tables_changed('Payment')
+    db.commit()
     
     flash('Payment updated successfully!', 'success')
     return redirect(url_for('payments'))
 
 @app.route('/payments/delete/<int:payment_id>', methods=['POST'])
 def delete_payment(payment_id):
+    db = get_db()
+    cursor = get_cursor()
     try:
         query = "DELETE FROM Payment WHERE PaymentID = %s"
-        myCursor.execute(query, (payment_id,))
-        myDB.commit()
+        cursor.execute(query, (payment_id,))
+        mark_tables_changed('Payment', deleted=True)
+        db.commit()
         flash('Payment deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting payment: {str(e)}', 'error')
     return redirect(url_for('payments'))
 
+# Analytics reports are recomputed when one of the tables they read has been
+# written since the cached result was built, and at least every REPORT_CACHE_TTL seconds
+report_cache = VersionedCache(table_versions, ttl=int(os.environ.get("REPORT_CACHE_TTL", "300")))
+metrics.watch_cache('reports', report_cache)
+
+def cached_report(name, tables, query):
+    def load():
+        cursor = get_cursor()
+        cursor.execute(query)
+        return [dict(zip([c[0] for c in cursor.description], r)) for r in cursor.fetchall()]
+
+    return report_cache.get_or_load(name, tables, load)
+
 @app.route('/all_queries')
 @admin_required
 def all_queries():
@@ -1801,8 +2338,7 @@ def query_project_profit():
         FROM Project p
         ORDER BY Profit DESC
     """
-    myCursor.execute(query)
-    results = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    results = cached_report('project_profit', ('Project',), query)
     return render_template('query_profitability.html', results=results)
 
 @app.route('/query/supplier_projects')
@@ -1815,76 +2351,421 @@ def query_supplier_projects():
         GROUP BY s.SupplierID, s.SupplierName
         ORDER BY ProjectCount DESC
     """
-    myCursor.execute(query)
-    results = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    results = cached_report('supplier_projects', ('Supplier', 'Project_Suppliers'), query)
     return render_template('query_supplier_impact.html', results=results)
 
 @app.route('/query/material_spending')
 @admin_required
 def query_material_spending():
-    query = """
-        SELECT m.MaterialID, m.MaterialName, SUM(pm.Quantity * pm.UnitPrice) as TotalSpend
-        FROM Material m
-        JOIN ProjectMaterial pm ON m.MaterialID = pm.MaterialID
-        GROUP BY m.MaterialID, m.MaterialName
-        ORDER BY TotalSpend DESC
-    """
-    myCursor.execute(query)
-    results = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    if summaries_enabled():
+        query = """
+            SELECT m.MaterialID, m.MaterialName, s.TotalSpend
+            FROM Material m
+            JOIN MaterialSpendSummary s ON m.MaterialID = s.MaterialID
+            WHERE s.LineCount > 0
+            ORDER BY TotalSpend DESC
+        """
+    else:
+        query = """
+            SELECT m.MaterialID, m.MaterialName, SUM(pm.Quantity * pm.UnitPrice) as TotalSpend
+            FROM Material m
+            JOIN ProjectMaterial pm ON m.MaterialID = pm.MaterialID
+            GROUP BY m.MaterialID, m.MaterialName
+            ORDER BY TotalSpend DESC
+        """
+    results = cached_report('material_spending', ('Material', 'ProjectMaterial'), query)
     return render_template('query_cost_driver_materials.html', results=results)
 
 @app.route('/query/employee_hours')
 @admin_required
 def query_employee_hours():
-    query = """
-        SELECT e.EmployeeID, e.EmployeeName, SUM(wa.HoursWorked) as TotalHours
-        FROM Employee e
-        LEFT JOIN WorkAssignment wa ON e.EmployeeID = wa.EmployeeID
-        GROUP BY e.EmployeeID, e.EmployeeName
-        ORDER BY TotalHours DESC
-    """
-    myCursor.execute(query)
-    results = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    if summaries_enabled():
+        query = """
+            SELECT e.EmployeeID, e.EmployeeName,
+                   CASE WHEN s.AssignmentCount > 0 THEN s.TotalHours END as TotalHours
+            FROM Employee e
+            LEFT JOIN EmployeeHoursSummary s ON e.EmployeeID = s.EmployeeID
+            ORDER BY TotalHours DESC
+        """
+    else:
+        query = """
+            SELECT e.EmployeeID, e.EmployeeName, SUM(wa.HoursWorked) as TotalHours
+            FROM Employee e
+            LEFT JOIN WorkAssignment wa ON e.EmployeeID = wa.EmployeeID
+            GROUP BY e.EmployeeID, e.EmployeeName
+            ORDER BY TotalHours DESC
+        """
+    results = cached_report('employee_hours', ('Employee', 'WorkAssignment'), query)
     return render_template('query_employee_utilization.html', results=results)
 
 @app.route('/query/high_prices')
 @admin_required
 def query_high_prices():
-    query = """
-        SELECT pm.ProjectID, p.ProjectName, m.MaterialName, pm.UnitPrice, MIN(sm.Price) as MinPrice
-        FROM ProjectMaterial pm
-        JOIN Material m ON pm.MaterialID = m.MaterialID
-        JOIN SupplierMaterial sm ON pm.MaterialID = sm.MaterialID
-        JOIN Project p ON pm.ProjectID = p.ProjectID
-        GROUP BY pm.ProjectID, p.ProjectName, m.MaterialName, pm.UnitPrice
-        HAVING pm.UnitPrice > MIN(sm.Price) * 1.2
-        ORDER BY pm.UnitPrice DESC
-    """
-    myCursor.execute(query)
-    results = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    if best_prices_enabled():
+        query = """
+            SELECT pm.ProjectID, p.ProjectName, m.MaterialName, pm.UnitPrice, bp.BestPrice as MinPrice
+            FROM ProjectMaterial pm
+            JOIN MaterialBestPrice bp ON pm.MaterialID = bp.MaterialID
+            JOIN Material m ON pm.MaterialID = m.MaterialID
+            JOIN Project p ON pm.ProjectID = p.ProjectID
+            WHERE pm.UnitPrice > bp.BestPrice * 1.2
+            ORDER BY pm.UnitPrice DESC
+        """
+    else:
+        query = """
+            SELECT pm.ProjectID, p.ProjectName, m.MaterialName, pm.UnitPrice, MIN(sm.Price) as MinPrice
+            FROM ProjectMaterial pm
+            JOIN Material m ON pm.MaterialID = m.MaterialID
+            JOIN SupplierMaterial sm ON pm.MaterialID = sm.MaterialID
+            JOIN Project p ON pm.ProjectID = p.ProjectID
+            GROUP BY pm.ProjectID, p.ProjectName, m.MaterialName, pm.UnitPrice
+            HAVING pm.UnitPrice > MIN(sm.Price) * 1.2
+            ORDER BY pm.UnitPrice DESC
+        """
+    results = cached_report('high_prices', ('ProjectMaterial', 'Material', 'SupplierMaterial', 'Project'), query)
     return render_template('query_price_anomalies.html', results=results)
 
 @app.route('/query/branch_revenue')
 @admin_required
 def query_branch_revenue():
-    query = """
-        SELECT b.BranchID, b.BranchName, b.City, COUNT(p.ProjectID) as ProjectCount, SUM(p.Revenue) as TotalRevenue
-        FROM Branch b
-        LEFT JOIN Project p ON b.BranchID = p.BranchID
-        GROUP BY b.BranchID, b.BranchName, b.City
-        ORDER BY TotalRevenue DESC
-    """
-    myCursor.execute(query)
-    results = [dict(zip([c[0] for c in myCursor.description], r)) for r in myCursor.fetchall()]
+    if summaries_enabled():
+        query = """
+            SELECT b.BranchID, b.BranchName, b.City, COALESCE(s.ProjectCount, 0) as ProjectCount,
+                   CASE WHEN s.ProjectCount > 0 THEN s.TotalRevenue END as TotalRevenue
+            FROM Branch b
+            LEFT JOIN BranchRevenueSummary s ON b.BranchID = s.BranchID
+            ORDER BY TotalRevenue DESC
+        """
+    else:
+        query = """
+            SELECT b.BranchID, b.BranchName, b.City, COUNT(p.ProjectID) as ProjectCount, SUM(p.Revenue) as TotalRevenue
+            FROM Branch b
+            LEFT JOIN Project p ON b.BranchID = p.BranchID
+            GROUP BY b.BranchID, b.BranchName, b.City
+            ORDER BY TotalRevenue DESC
+        """
+    results = cached_report('branch_revenue', ('Branch', 'Project'), query)
     return render_template('query_branch_performance.html', results=results)
 
+@app.route('/admin/schema/refresh', methods=['POST'])
+@admin_required
+def refresh_schema_registry():
+    refresh_schema()
+    return jsonify({'success': True, 'tables': schema.tables()})
+
+@app.route('/admin/spa/reload', methods=['POST'])
+@admin_required
+def reload_spa_shell():
+    """Re-read the React build's index.html in this worker after a frontend deploy."""
+    return jsonify({'success': True, 'available': spa_shell.load()})
+
+@app.route('/admin/slow_queries')
+@admin_required
+def slow_query_report():
+    return render_template('slow_queries.html', entries=slow_queries.entries(),
+                           threshold_ms=slow_queries.threshold * 1000)
+
+@app.route('/admin/slow_queries/reset', methods=['POST'])
+@admin_required
+def reset_slow_queries():
+    slow_queries.clear()
+    flash('Slow query log cleared.', 'success')
+    return redirect(url_for('slow_query_report'))
+
+DASHBOARD_TABLES = {'Branch', 'Employee', 'Project', 'Client', 'Supplier'}
+
+@app.route('/import/<entity_name>', methods=['POST'])
+@admin_required
+def bulk_import(entity_name):
+    """Load an uploaded CSV / JSON / JSON Lines file into one entity's table in a single transaction.
+
+    Foreign keys may be given as IDs or by name (e.g. BranchName instead of
+    BranchID). Any bad row rolls the whole import back unless
+    ``skip_invalid`` is set, in which case only the good rows are kept.
+    """
+    entity = ENTITIES.get(entity_name)
+    if entity is None:
+        return jsonify({'success': False, 'message': f'Unknown entity: {entity_name}'}), 404
+    if any(field.secret for field in entity.fields):
+        return jsonify({'success': False, 'message': f'{entity_name} cannot be bulk imported'}), 400
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'success': False, 'message': 'No file uploaded'}), 400
+    fmt = (request.form.get('format') or os.path.splitext(upload.filename)[1].lstrip('.')).lower()
+    skip_invalid = request.form.get('skip_invalid', '').lower() in ('1', 'true', 'on', 'yes')
+
+    db = get_db()
+    cursor = get_cursor()
+    try:
+        result = import_records(cursor, entity, iter_records(upload.stream, fmt),
+                                supported=column_supported, skip_invalid=skip_invalid)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    committed = result.inserted > 0 and (skip_invalid or not result.error_count)
+    if committed:
+        if entity.table in ('Project', 'WorkAssignment', 'ProjectMaterial') and summaries_enabled():
+            rebuild_summaries(cursor)
+        if entity.table == 'SupplierMaterial' and best_prices_enabled():
+            rebuild_best_prices(cursor)
+        if entity.table in DASHBOARD_TABLES:
+            recount_dashboard()
+        mark_tables_changed(entity.table)
+        db.commit()
+    else:
+        db.rollback()
+        result.inserted = 0
+
+    status = 200 if committed or not result.error_count else 422
+    return jsonify({'success': committed, **result.as_dict()}), status
+
+def api_admin_required(view_func):
+    """admin_required for JSON endpoints: answer 401/403 instead of redirecting to the login page."""
+    @wraps(view_func)
+    def wrapped_view(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify({'success': False, 'message': 'Please log in'}), 401
+        if not getattr(current_user, "is_admin", False):
+            return jsonify({'success': False, 'message': 'Admin access required'}), 403
+        return view_func(*args, **kwargs)
+
+    return wrapped_view
+
+DASHBOARD_COUNTS = {'Branch': 'branch_count', 'Employee': 'employee_count', 'Project': 'project_count',
+                    'Client': 'client_count', 'Supplier': 'supplier_count'}
+SUMMARY_SOURCES = {'Project', 'WorkAssignment', 'ProjectMaterial'}
+
+def apply_row_change(cursor, table, old, new):
+    """Carry one API write into the summary tables, after the write and inside its transaction.
+
+    ``old`` and ``new`` are the row before and after the write (None when
+    it did not or no longer exists). A deleted project's children must be
+    subtracted before the delete cascades them away. Returns the dashboard
+    counter deltas for DashboardStats, or None when a cascade means they
+    must be recounted.
+    """
+    deltas = {}
+    if table in DASHBOARD_COUNTS:
+        deltas[DASHBOARD_COUNTS[table]] = (new is not None) - (old is not None)
+    if table == 'Project':
+        deltas['total_revenue'] = (money(new['Revenue']) if new else 0) - (old['Revenue'] if old else 0)
+    cascaded = cascaded_tables(table) - {table} if new is None else set()
+
+    if summaries_enabled():
+        for row, sign in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            if table == 'Project':
+                add_branch_revenue(cursor, row['BranchID'], sign, sign * money(row['Revenue']))
+            elif table == 'WorkAssignment':
+                add_employee_hours(cursor, row['EmployeeID'], sign, sign * money(row['HoursWorked']))
+            elif table == 'ProjectMaterial':
+                add_material_spend(cursor, row['MaterialID'], sign,
+                                   sign * money(row['Quantity']) * money(row['UnitPrice']))
+        if table != 'Project' and cascaded & SUMMARY_SOURCES:
+            rebuild_summaries(cursor)
+
+    if best_prices_enabled():
+        if table == 'SupplierMaterial':
+            for material_id in {row['MaterialID'] for row in (old, new) if row is not None}:
+                refresh_best_price(cursor, material_id)
+        elif 'SupplierMaterial' in cascaded:
+            rebuild_best_prices(cursor)
+
+    return None if cascaded & DASHBOARD_TABLES else deltas
+
+def finish_api_write(db, entity, deltas, deleted=False):
+    if deltas is None:
+        recount_dashboard()
+    else:
+        add_dashboard_deltas(**deltas)
+    mark_tables_changed(entity.table, deleted=deleted)
+    db.commit()
+
+def write_form_row(entity_name, key, values=None):
+    """Update (or, without ``values``, delete) one row by primary key for an HTML form, as the API does.
+
+    Returns False, with nothing written, when no row has that key.
+    """
+    entity = ENTITIES[entity_name]
+    readable = api_readable(entity)
+    cursor = get_cursor()
+    old = resources.fetch_row(cursor, entity, readable, key, for_update=True)
+    if old is None:
+        get_db().rollback()
+        return False
+    if values is None:
+        resources.delete(cursor, entity, key)
+        new = None
+    else:
+        values = _supported_values(entity.table, values)
+        resources.update(cursor, entity, key, values)
+        new_key = tuple(values.get(column, value) for column, value in zip(entity.key_columns, key))
+        new = resources.fetch_row(cursor, entity, readable, new_key)
+    finish_api_write(get_db(), entity, apply_row_change(cursor, entity.table, old, new), deleted=values is None)
+    return True
+
+def api_tables(entity_name, **_):
+    entity = ENTITIES.get(entity_name)
+    return (entity.table,) if entity else ()
+
+def api_entity_or_404(entity_name):
+    entity = ENTITIES.get(entity_name)
+    if entity is None:
+        return None, (jsonify({'success': False, 'message': f'Unknown entity: {entity_name}'}), 404)
+    return entity, None
+
+def api_readable(entity):
+    if not schema.loaded:
+        refresh_schema()
+    return resources.readable_columns(entity, schema.columns(entity.table))
+
+def api_write_values(entity, data, partial):
+    values = resources.coerce_values(entity, data, column_supported, partial=partial)
+    for field in entity.fields:
+        if field.secret and field.column in values:
+            if len(values[field.column] or '') < 6:
+                raise ValueError(f"{field.column} must be at least 6 characters long")
+            values[field.column] = hash_password(values[field.column])
+    return values
+
+def api_database_error(e):
+    get_db().rollback()
+    status = 409 if isinstance(e, pymysql.err.IntegrityError) else 400
+    return jsonify({'success': False, 'message': e.args[-1] if e.args else str(e)}), status
+
+@app.route('/api/<entity_name>', methods=['GET'])
+@api_admin_required
+@conditional_listing(tables_for=api_tables)
+def api_list(entity_name):
+    """One page of an entity's rows, filtered and sorted like its HTML listing; ``fields=`` picks the columns."""
+    entity, error = api_entity_or_404(entity_name)
+    if error:
+        return error
+    readable = api_readable(entity)
+    try:
+        columns = resources.select_columns(entity, readable, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    items, next_cursor = resources.list_page(get_cursor(), entity, readable, columns, request.args)
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+@app.route('/api/<entity_name>/<key>', methods=['GET'])
+@api_admin_required
+@conditional_listing(tables_for=api_tables)
+def api_detail(entity_name, key):
+    entity, error = api_entity_or_404(entity_name)
+    if error:
+        return error
+    readable = api_readable(entity)
+    try:
+        columns = resources.select_columns(entity, readable, request.args.get('fields'))
+        key = resources.parse_key(entity, key)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    row = resources.fetch_row(get_cursor(), entity, columns, key)
+    if row is None:
+        return jsonify({'success': False, 'message': 'Not found'}), 404
+    return jsonify(resources.json_row(row, columns))
+
+@app.route('/api/<entity_name>', methods=['POST'])
+@api_admin_required
+def api_create(entity_name):
+    entity, error = api_entity_or_404(entity_name)
+    if error:
+        return error
+    readable = api_readable(entity)
+    try:
+        values = api_write_values(entity, request.get_json(silent=True), partial=False)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    cursor = get_cursor()
+    try:
+        key = resources.insert(cursor, entity, values)
+        row = resources.fetch_row(cursor, entity, readable, key)
+        deltas = apply_row_change(cursor, entity.table, None, row)
+    except pymysql.MySQLError as e:
+        return api_database_error(e)
+    finish_api_write(get_db(), entity, deltas)
+    return jsonify(resources.json_row(row, readable)), 201
+
+@app.route('/api/<entity_name>/<key>', methods=['PUT', 'PATCH'])
+@api_admin_required
+def api_update(entity_name, key):
+    """PUT replaces every writable column; PATCH changes only the columns in the body."""
+    entity, error = api_entity_or_404(entity_name)
+    if error:
+        return error
+    readable = api_readable(entity)
+    try:
+        key = resources.parse_key(entity, key)
+        values = api_write_values(entity, request.get_json(silent=True), partial=request.method == 'PATCH')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not values:
+        return jsonify({'success': False, 'message': 'Nothing to update'}), 400
+    cursor = get_cursor()
+    try:
+        old = resources.fetch_row(cursor, entity, readable, key, for_update=True)
+        if old is None:
+            get_db().rollback()
+            return jsonify({'success': False, 'message': 'Not found'}), 404
+        resources.update(cursor, entity, key, values)
+        new_key = tuple(values.get(column, value) for column, value in zip(entity.key_columns, key))
+        row = resources.fetch_row(cursor, entity, readable, new_key)
+        deltas = apply_row_change(cursor, entity.table, old, row)
+    except pymysql.MySQLError as e:
+        return api_database_error(e)
+    finish_api_write(get_db(), entity, deltas)
+    return jsonify(resources.json_row(row, readable))
+
+@app.route('/api/<entity_name>/<key>', methods=['DELETE'])
+@api_admin_required
+def api_delete(entity_name, key):
+    entity, error = api_entity_or_404(entity_name)
+    if error:
+        return error
+    readable = api_readable(entity)
+    try:
+        key = resources.parse_key(entity, key)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    cursor = get_cursor()
+    try:
+        old = resources.fetch_row(cursor, entity, readable, key, for_update=True)
+        if old is None:
+            get_db().rollback()
+            return jsonify({'success': False, 'message': 'Not found'}), 404
+        if entity.table == 'Project' and summaries_enabled():
+            subtract_project_children(cursor, old['ProjectID'])
+        resources.delete(cursor, entity, key)
+        deltas = apply_row_change(cursor, entity.table, old, None)
+    except pymysql.MySQLError as e:
+        return api_database_error(e)
+    finish_api_write(get_db(), entity, deltas, deleted=True)
+    return jsonify({'success': True})
+
 # Serve React app for all routes (SPA routing)
 @app.route('/<path:path>')
 def serve_react(path):
-    react_build_path = os.path.join(project_root, 'static', 'react-build', 'index.html')
-    if os.path.exists(react_build_path):
-        return send_from_directory(os.path.join(project_root, 'static', 'react-build'), 'index.html')
+    if spa_shell.available:
+        return spa_shell.response(request)
     return redirect(url_for('index'))
 
+def precompile_templates():
+    """Load every template now, so no request pays for compiling one.
+
+    The first worker to start after a deploy compiles them and writes the
+    bytecode cache; the rest (and recycled workers) only unmarshal it.
+    """
+    start = time.perf_counter()
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    app.logger.info("Loaded %d templates in %.0f ms", len(names), (time.perf_counter() - start) * 1000)
+
+precompile_templates()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
@@ -0,0 +1,203 @@
+"""Resized and re-encoded copies of media images, made once on demand.
+
+``/media/<file>?w=480&format=webp`` serves the image scaled down to 480
+pixels wide and encoded as WebP. Requested widths are rounded up to one
+of WIDTHS, so each image has only a handful of possible derivatives, and
+images are never scaled up. A derivative is rendered the first time it
+is asked for and written to a cache directory whose total size is kept
+under a limit by removing the least recently used files.
+
+Pillow is optional: without it the ``w`` and ``format`` arguments are
+ignored and the original image is served.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+
+# format argument -> (Pillow format, mimetype, save options)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', 'image/png', {'optimize': True}),
+}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+
+SOURCE_FORMATS = {'image/webp': 'webp', 'image/jpeg': 'jpeg', 'image/png': 'png'}
+
+
+class UndecodableImage(Exception):
+    pass
+
+
+def snap_width(width):
+    return next((w for w in WIDTHS if w >= width), WIDTHS[-1])
+
+
+def parse_variant(args, mimetype):
+    """``(width, format)`` from the query string, or None when neither is given; raise ValueError on bad values."""
+    raw_width = args.get('w')
+    fmt = (args.get('format') or '').lower()
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if not raw_width and not fmt:
+        return None
+    width = None
+    if raw_width:
+        try:
+            width = int(raw_width)
+        except ValueError:
+            raise ValueError(f"Invalid width: {raw_width}")
+        if width < 1:
+            raise ValueError(f"Invalid width: {raw_width}")
+        width = snap_width(width)
+    if fmt and fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt} (use {', '.join(sorted(FORMATS))})")
+    return width, fmt or SOURCE_FORMATS.get(mimetype, 'png')
+
+
+def render(path, width, fmt):
+    """The image at ``path`` scaled and encoded; raise UndecodableImage if Pillow cannot read or convert it."""
+    pil_format, _, options = FORMATS[fmt]
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            if width and width < image.width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            out = io.BytesIO()
+            image.save(out, pil_format, **options)
+            return out.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # Not an image Pillow can decode (SVG, GIF animation to JPEG, truncated file, ...)
+        raise UndecodableImage(f"Cannot convert {os.path.basename(path)}: {e}") from e
+
+
+class DerivativeCache:
+    """On-disk derivatives, evicted least recently used first once past ``max_bytes``.
+
+    Recency is kept in memory and mirrored to the files' mtimes, so the
+    order survives a restart. The directory may be shared by several
+    worker processes, so every new render rescans it before evicting: the
+    limit applies to the directory as a whole, oldest mtime first. Each
+    derivative is rendered by one thread at a time; concurrent requests
+    for it wait and then read the file.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rendering = {}
+        self._entries = OrderedDict()
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._rescan()
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def _rescan(self):
+        """Reload the entries from the directory, least recently used first, and evict down to the limit."""
+        files = []
+        for entry in os.scandir(self.directory):
+            # Dot files are renders still being written (possibly by another worker)
+            if not entry.is_file() or entry.name.startswith('.'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+        files.sort()
+        with self._lock:
+            self._entries = OrderedDict((name, size) for _, name, size in files)
+            self._total = sum(size for _, _, size in files)
+            self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _read(self, name):
+        """The cached derivative's bytes, or None if it is not (or no longer) on disk."""
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed by another worker process sharing the directory
+            with self._lock:
+                self._total -= self._entries.pop(name, 0)
+            return None
+        return data
+
+    def get(self, asset, width, fmt):
+        """The derivative's bytes, rendering and caching it if needed."""
+        name = f"{asset.digest}-{width or 'full'}.{fmt}"
+        data = self._read(name)
+        if data is not None:
+            with self._lock:
+                self.hits += 1
+            return data
+        with self._lock:
+            rendering = self._rendering.setdefault(name, threading.Lock())
+        with rendering:
+            try:
+                data = self._read(name)
+                if data is not None:
+                    with self._lock:
+                        self.hits += 1
+                    return data
+                data = render(asset.path, width, fmt)
+                path = os.path.join(self.directory, name)
+                tmp = os.path.join(self.directory, f".{name}.{threading.get_ident()}.tmp")
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+                with self._lock:
+                    self.misses += 1
+                # Picks up what other workers have written since, so they share the limit
+                self._rescan()
+            finally:
+                # Also after a failed render, or the entry would outlive every request for it
+                with self._lock:
+                    self._rendering.pop(name, None)
+        return data
+
+    def response(self, request, asset, cache_control, width, fmt):
+        etag = f"{asset.etag}-{width or 'full'}-{fmt}"
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(self.get(asset, width, fmt), mimetype=FORMATS[fmt][1])
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {'files': len(self._entries), 'bytes': self._total, 'max_bytes': self.max_bytes}
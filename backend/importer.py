@@ -0,0 +1,211 @@
+"""Bulk import of CSV / JSON records into one entity's table.
+
+Records are parsed lazily from the upload and handled in chunks: each
+chunk is validated, its name references are resolved with one query per
+referenced table, and the valid rows go in with a single ``executemany``.
+Everything runs on the caller's connection and transaction; committing
+or rolling back is left to the caller.
+"""
+import codecs
+import csv
+import json
+import time
+
+import pymysql
+
+from entities import ENTITIES_BY_TABLE, coerce
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+AMBIGUOUS = object()
+
+
+def iter_records(stream, fmt):
+    """Yield ``(row_number, record)`` pairs from a binary upload stream.
+
+    CSV and JSON Lines are read incrementally; a plain JSON array has to be
+    parsed whole.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+        for number, record in enumerate(reader, start=1):
+            yield number, record
+    elif fmt in ('jsonl', 'ndjson'):
+        number = 0
+        for line in codecs.iterdecode(stream, 'utf-8-sig'):
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, e
+    elif fmt == 'json':
+        records = json.load(codecs.getreader('utf-8-sig')(stream))
+        if isinstance(records, dict):
+            records = records.get('rows')
+        if not isinstance(records, list):
+            raise ValueError("JSON upload must be an array of objects")
+        for number, record in enumerate(records, start=1):
+            yield number, record
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+class NameResolver:
+    """Maps names to IDs for foreign-key columns, one IN (...) query per table and chunk."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self._ids = {}
+
+    def resolve(self, table, names):
+        target = ENTITIES_BY_TABLE[table]
+        known = self._ids.setdefault(table, {})
+        missing = [name for name in set(names) if name not in known]
+        if missing:
+            placeholders = ", ".join(["%s"] * len(missing))
+            self.cursor.execute(
+                f"SELECT {target.key}, {target.name_column} FROM {table} "
+                f"WHERE {target.name_column} IN ({placeholders})", missing)
+            for key, name in self.cursor.fetchall():
+                known[name] = AMBIGUOUS if name in known else key
+            for name in missing:
+                known.setdefault(name, None)
+        return known
+
+
+class ImportResult:
+    def __init__(self, entity):
+        self.entity = entity
+        self.rows = 0
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    def error(self, row, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def as_dict(self):
+        return {
+            'entity': self.entity.name,
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows / self.seconds, 1) if self.seconds else None,
+        }
+
+
+def _validate_chunk(chunk, fields, resolver, result):
+    """Coerce a chunk of records to value tuples, recording per-row errors."""
+    rows = []
+    for number, record in chunk:
+        if not isinstance(record, dict):
+            result.error(number, f"Not a record: {record}")
+            continue
+        values, problems = [], []
+        for field in fields:
+            raw = record.get(field.column)
+            if field.ref and raw in (None, '') and record.get(field.alias) not in (None, ''):
+                values.append(None)  # resolved by name below
+                continue
+            try:
+                values.append(coerce(field, raw))
+            except ValueError as e:
+                if field.ref and raw in (None, ''):
+                    problems.append(f"{field.column} or {field.alias} is required")
+                else:
+                    problems.append(str(e))
+                values.append(None)
+        rows.append((number, record, values, problems))
+
+    for index, field in enumerate(fields):
+        if not field.ref:
+            continue
+        pending = [(record, values, problems) for _, record, values, problems in rows
+                   if values[index] is None and record.get(field.alias) not in (None, '')]
+        if not pending:
+            continue
+        ids = resolver.resolve(field.ref, [str(record[field.alias]).strip() for record, _, _ in pending])
+        for record, values, problems in pending:
+            name = str(record[field.alias]).strip()
+            key = ids.get(name)
+            if key is None:
+                problems.append(f"No {field.ref} named {name!r}")
+            elif key is AMBIGUOUS:
+                problems.append(f"More than one {field.ref} is named {name!r}; give {field.column} instead")
+            else:
+                values[index] = key
+
+    valid = []
+    for number, _, values, problems in rows:
+        if problems:
+            result.error(number, "; ".join(problems))
+        else:
+            valid.append((number, tuple(values)))
+    return valid
+
+
+def _insert_chunk(cursor, query, valid, result):
+    cursor.execute("SAVEPOINT import_chunk")
+    try:
+        cursor.executemany(query, [values for _, values in valid])
+        result.inserted += len(valid)
+        return
+    except pymysql.MySQLError:
+        cursor.execute("ROLLBACK TO SAVEPOINT import_chunk")
+    # Something in the batch was rejected by the database (duplicate key,
+    # dangling ID, ...); replay it row by row to pin the error on its row
+    for number, values in valid:
+        cursor.execute("SAVEPOINT import_row")
+        try:
+            cursor.execute(query, values)
+            result.inserted += 1
+        except pymysql.MySQLError as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT import_row")
+            result.error(number, e.args[-1] if e.args else str(e))
+
+
+def import_records(cursor, entity, records, supported=None, skip_invalid=False, chunk_size=CHUNK_SIZE):
+    """Insert ``(row_number, record)`` pairs into ``entity``'s table and return an ImportResult.
+
+    ``supported(table, column)`` drops fields the live schema lacks. Unless
+    ``skip_invalid`` is set, inserting stops at the first bad row (the
+    caller should roll back) but the rest of the file is still validated
+    so every error is reported in one pass.
+    """
+    fields = [f for f in entity.fields if supported is None or supported(entity.table, f.column)]
+    columns = ", ".join(f.column for f in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    query = f"INSERT INTO {entity.table} ({columns}) VALUES ({placeholders})"
+    resolver = NameResolver(cursor)
+    result = ImportResult(entity)
+
+    chunk = []
+    for number, record in records:
+        result.rows += 1
+        if isinstance(record, Exception):
+            result.error(number, str(record))
+            continue
+        chunk.append((number, record))
+        if len(chunk) >= chunk_size:
+            _flush(cursor, query, chunk, fields, resolver, result, skip_invalid)
+            chunk = []
+    if chunk:
+        _flush(cursor, query, chunk, fields, resolver, result, skip_invalid)
+
+    result.seconds = time.monotonic() - result.started
+    return result
+
+
+def _flush(cursor, query, chunk, fields, resolver, result, skip_invalid):
+    valid = _validate_chunk(chunk, fields, resolver, result)
+    if valid and (skip_invalid or not result.error_count):
+        _insert_chunk(cursor, query, valid, result)
@@ -1,14 +1,28 @@
+import os
 import pymysql
 from decimal import Decimal
 
-myDB = pymysql.connect(host="localhost", user="root", password="l18102005")
+from cache import VERSION_SEED
+from summaries import rebuild_best_prices, rebuild_summaries, recount_dashboard_stats
+
+DB_NAME = os.environ.get("DB_NAME", "abaad_contracting")
+
+myDB = pymysql.connect(host=os.environ.get("DB_HOST", "localhost"),
+                       user=os.environ.get("DB_USER", "root"),
+                       password=os.environ.get("DB_PASSWORD", "l18102005"))
 myCursor = myDB.cursor()
 
-myCursor.execute("DROP DATABASE IF EXISTS abaad_contracting")
-myCursor.execute("CREATE DATABASE abaad_contracting")
-myCursor.execute("USE abaad_contracting")
+myCursor.execute(f"DROP DATABASE IF EXISTS `{DB_NAME}`")
+myCursor.execute(f"CREATE DATABASE `{DB_NAME}`")
+myCursor.execute(f"USE `{DB_NAME}`")
 myCursor.execute("SET SQL_SAFE_UPDATES=0")
 
+myCursor.execute("DROP TABLE IF EXISTS BranchRevenueSummary")
+myCursor.execute("DROP TABLE IF EXISTS EmployeeHoursSummary")
+myCursor.execute("DROP TABLE IF EXISTS MaterialSpendSummary")
+myCursor.execute("DROP TABLE IF EXISTS TableVersion")
+myCursor.execute("DROP TABLE IF EXISTS DashboardStats")
+myCursor.execute("DROP TABLE IF EXISTS MaterialBestPrice")
 myCursor.execute("DROP TABLE IF EXISTS Payment")
 myCursor.execute("DROP TABLE IF EXISTS Purchase")
 myCursor.execute("DROP TABLE IF EXISTS Project_Suppliers")
@@ -68,6 +82,8 @@ CREATE TABLE Employee (
     INDEX idx_department (DepartmentID),
     INDEX idx_manager (ManagerID),
     INDEX idx_position (PositionID),
+    INDEX idx_name (EmployeeName),
+    INDEX idx_salary (Salary),
     FOREIGN KEY (BranchID) REFERENCES Branch(BranchID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (DepartmentID) REFERENCES Department(DepartmentID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (ManagerID) REFERENCES Employee(EmployeeID) ON DELETE SET NULL ON UPDATE CASCADE,
@@ -113,6 +129,7 @@ CREATE TABLE Project (
     INDEX idx_branch (BranchID),
     INDEX idx_client (ClientID),
     INDEX idx_project_type (ProjectType),
+    INDEX idx_revenue (Revenue),
     FOREIGN KEY (BranchID) REFERENCES Branch(BranchID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (ClientID) REFERENCES Client(ClientID) ON DELETE CASCADE ON UPDATE CASCADE
 )
@@ -123,7 +140,9 @@ CREATE TABLE Material (
     MaterialID INT AUTO_INCREMENT PRIMARY KEY,
     MaterialName VARCHAR(100) NOT NULL,
     BaseUnitPrice DECIMAL(12,2) NOT NULL,
-    UnitOfMeasure VARCHAR(50) NOT NULL
+    UnitOfMeasure VARCHAR(50) NOT NULL,
+    INDEX idx_name (MaterialName),
+    INDEX idx_base_price (BaseUnitPrice)
 )
 """)
 
@@ -146,6 +165,7 @@ CREATE TABLE WorkAssignment (
     PRIMARY KEY (ProjectID, EmployeeID),
     INDEX idx_project (ProjectID),
     INDEX idx_employee (EmployeeID),
+    INDEX idx_start_date (StartDate),
     FOREIGN KEY (ProjectID) REFERENCES Project(ProjectID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (EmployeeID) REFERENCES Employee(EmployeeID) ON DELETE CASCADE ON UPDATE CASCADE
 )
@@ -160,6 +180,7 @@ CREATE TABLE ProjectMaterial (
     PRIMARY KEY (ProjectID, MaterialID),
     INDEX idx_project (ProjectID),
     INDEX idx_material (MaterialID),
+    INDEX idx_unit_price (UnitPrice),
     FOREIGN KEY (ProjectID) REFERENCES Project(ProjectID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (MaterialID) REFERENCES Material(MaterialID) ON DELETE CASCADE ON UPDATE CASCADE
 )
@@ -174,6 +195,8 @@ CREATE TABLE SupplierMaterial (
     PRIMARY KEY (SupplierID, MaterialID),
     INDEX idx_supplier (SupplierID),
     INDEX idx_material (MaterialID),
+    INDEX idx_price (Price),
+    INDEX idx_material_price (MaterialID, Price),
     FOREIGN KEY (SupplierID) REFERENCES Supplier(SupplierID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (MaterialID) REFERENCES Material(MaterialID) ON DELETE CASCADE ON UPDATE CASCADE
 )
@@ -190,6 +213,7 @@ CREATE TABLE Contract (
     Status VARCHAR(50) DEFAULT 'active',
     INDEX idx_project (ProjectID),
     INDEX idx_client (ClientID),
+    INDEX idx_total_value (TotalValue),
     FOREIGN KEY (ProjectID) REFERENCES Project(ProjectID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (ClientID) REFERENCES Client(ClientID) ON DELETE CASCADE ON UPDATE CASCADE
 )
@@ -234,6 +258,7 @@ CREATE TABLE Sales (
     DueDate DATE NULL,
     INDEX idx_project (ProjectID),
     INDEX idx_client (ClientID),
+    INDEX idx_amount (Amount),
     FOREIGN KEY (ProjectID) REFERENCES Project(ProjectID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (ClientID) REFERENCES Client(ClientID) ON DELETE CASCADE ON UPDATE CASCADE
 )
@@ -261,6 +286,7 @@ CREATE TABLE Purchase (
     TotalCost DECIMAL(12,2) NOT NULL,
     INDEX idx_supplier (SupplierID),
     INDEX idx_material (MaterialID),
+    INDEX idx_total_cost (TotalCost),
     FOREIGN KEY (SupplierID) REFERENCES Supplier(SupplierID) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (MaterialID) REFERENCES Material(MaterialID) ON DELETE CASCADE ON UPDATE CASCADE
 )
@@ -276,11 +302,71 @@ CREATE TABLE Payment (
     PaymentMethod VARCHAR(50) NOT NULL,
     INDEX idx_client (FromClient),
     INDEX idx_supplier (ToSupplier),
+    INDEX idx_amount (Amount),
     FOREIGN KEY (FromClient) REFERENCES Client(ClientID) ON DELETE SET NULL ON UPDATE CASCADE,
     FOREIGN KEY (ToSupplier) REFERENCES Supplier(SupplierID) ON DELETE SET NULL ON UPDATE CASCADE
 )
 """)
 
+# Materialized report summaries, maintained by the app's write routes
+myCursor.execute("""
+CREATE TABLE BranchRevenueSummary (
+    BranchID INT PRIMARY KEY,
+    ProjectCount INT NOT NULL DEFAULT 0,
+    TotalRevenue DECIMAL(16,2) NOT NULL DEFAULT 0.00,
+    INDEX idx_total_revenue (TotalRevenue),
+    FOREIGN KEY (BranchID) REFERENCES Branch(BranchID) ON DELETE CASCADE ON UPDATE CASCADE
+)
+""")
+
+myCursor.execute("""
+CREATE TABLE EmployeeHoursSummary (
+    EmployeeID INT PRIMARY KEY,
+    AssignmentCount INT NOT NULL DEFAULT 0,
+    TotalHours DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    INDEX idx_total_hours (TotalHours),
+    FOREIGN KEY (EmployeeID) REFERENCES Employee(EmployeeID) ON DELETE CASCADE ON UPDATE CASCADE
+)
+""")
+
+myCursor.execute("""
+CREATE TABLE MaterialSpendSummary (
+    MaterialID INT PRIMARY KEY,
+    LineCount INT NOT NULL DEFAULT 0,
+    TotalSpend DECIMAL(24,4) NOT NULL DEFAULT 0.0000,
+    INDEX idx_total_spend (TotalSpend),
+    FOREIGN KEY (MaterialID) REFERENCES Material(MaterialID) ON DELETE CASCADE ON UPDATE CASCADE
+)
+""")
+
+# Cheapest and runner-up supplier offer per material
+myCursor.execute("""
+CREATE TABLE MaterialBestPrice (
+    MaterialID INT PRIMARY KEY,
+    BestPrice DECIMAL(12,2) NOT NULL,
+    BestSupplierID INT NOT NULL,
+    SecondBestPrice DECIMAL(12,2) NULL,
+    INDEX idx_best_supplier (BestSupplierID),
+    FOREIGN KEY (MaterialID) REFERENCES Material(MaterialID) ON DELETE CASCADE ON UPDATE CASCADE
+)
+""")
+
+# Per-table change counters shared by every app process (ETags, lookup and report caches)
+myCursor.execute("""
+CREATE TABLE TableVersion (
+    TableName VARCHAR(64) PRIMARY KEY,
+    Version BIGINT NOT NULL
+)
+""")
+
+# Home page counters, updated in the same transaction as each write that changes them
+myCursor.execute("""
+CREATE TABLE DashboardStats (
+    StatName VARCHAR(32) PRIMARY KEY,
+    Value DECIMAL(20,2) NOT NULL
+)
+""")
+
 myCursor.execute("""
 INSERT INTO Branch (BranchName, City, Address, PhoneNumber) VALUES
 ('Ramallah Main Office', 'Ramallah', '6 Hanna Naqara Street', '+970-2-298-9898'),
@@ -691,3 +777,13 @@ VALUES (%s, %s, %s, %s, %s)
 """, payments)
 
 myDB.commit()
+
+rebuild_summaries(myCursor)
+rebuild_best_prices(myCursor)
+recount_dashboard_stats(myCursor)
+myCursor.execute(f"""
+INSERT INTO TableVersion (TableName, Version)
+SELECT TABLE_NAME, {VERSION_SEED} FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME <> 'TableVersion'
+""")
+myDB.commit()
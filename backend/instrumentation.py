@@ -0,0 +1,107 @@
+"""Per-request timing: database work, template rendering and payload size.
+
+Every response gets a ``Server-Timing`` header (visible in the browser's
+network panel), and one JSON line per request goes to the
+``abaad.requests`` logger. Set REQUEST_LOG=0 to silence the log lines.
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+from flask import before_render_template, g, request, template_rendered
+
+from db import start_query_stats, stop_query_stats
+
+request_log = logging.getLogger('abaad.requests')
+if not request_log.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    request_log.addHandler(_handler)
+    request_log.propagate = False
+request_log.setLevel(logging.INFO if os.environ.get('REQUEST_LOG', '1') != '0' else logging.WARNING)
+
+SLOW_SQL_PREVIEW = 200
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _one_line(query, limit=SLOW_SQL_PREVIEW):
+    if not query:
+        return None
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    query = " ".join(query.split())
+    return query if len(query) <= limit else query[:limit - 3] + '...'
+
+
+def request_timings():
+    """The current request's measurements so far, as a dict (None outside an instrumented request)."""
+    stats = g.get('query_stats')
+    if stats is None:
+        return None
+    return {
+        'total_ms': _ms(time.perf_counter() - g.request_started),
+        'queries': stats.queries,
+        'db_ms': _ms(stats.seconds),
+        'rows': stats.rows,
+        'slowest_ms': _ms(stats.slowest_seconds),
+        'slowest_sql': _one_line(stats.slowest_query),
+        'render_ms': _ms(g.get('render_seconds', 0.0)),
+    }
+
+
+def server_timing_header(timings, payload_bytes):
+    parts = [
+        f'db;dur={timings["db_ms"]};desc="{timings["queries"]} queries, {timings["rows"]} rows"',
+        f'db-slowest;dur={timings["slowest_ms"]}',
+        f'render;dur={timings["render_ms"]}',
+        f'app;dur={timings["total_ms"]}',
+    ]
+    if payload_bytes is not None:
+        parts.append(f'payload;desc="{payload_bytes} bytes"')
+    return ", ".join(parts)
+
+
+def init_app(app):
+    @app.before_request
+    def start_request_timing():
+        g.request_started = time.perf_counter()
+        g.render_seconds = 0.0
+        g.query_stats = start_query_stats()
+
+    @app.after_request
+    def report_request_timing(response):
+        timings = request_timings()
+        if timings is None:
+            return response
+        payload_bytes = None if response.is_streamed else response.calculate_content_length()
+        response.headers['Server-Timing'] = server_timing_header(timings, payload_bytes)
+        if request_log.isEnabledFor(logging.INFO):
+            request_log.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                **timings,
+                'bytes': payload_bytes,
+            }))
+        return response
+
+    @app.teardown_request
+    def stop_request_timing(exc):
+        stop_query_stats()
+
+    def render_started(sender, template, context, **extra):
+        g.render_started = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        started = g.pop('render_started', None)
+        if started is not None:
+            g.render_seconds = g.get('render_seconds', 0.0) + time.perf_counter() - started
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
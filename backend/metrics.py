@@ -0,0 +1,277 @@
+"""Prometheus metrics in the text exposition format, served at ``/metrics``.
+
+Counters and histograms are sharded per thread: a request thread only
+ever writes to its own shard, so recording a sample takes no lock. A
+scrape sums the shards, and folds the shards of threads that have
+finished into one retired total so they do not pile up under a
+thread-per-request server.
+
+Values owned by other components (pool occupancy, cache hit counts) are
+sampled by callbacks at scrape time instead of being pushed on the hot
+path. Set METRICS_TOKEN to require ``Authorization: Bearer <token>``;
+without it only direct (unproxied) requests from the loopback interface
+may scrape.
+"""
+import bisect
+import hmac
+import ipaddress
+import os
+import threading
+import time
+
+from flask import Response, abort, g, request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics = []
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _ShardedMetric:
+    """Per-thread ``{label values: [numbers]}`` shards, summed on collection."""
+
+    kind = None
+    width = 1
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._fold_finished()
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def _slot(self, labelvalues):
+        shard = self._shard()
+        slot = shard.get(labelvalues)
+        if slot is None:
+            slot = shard[labelvalues] = [0] * self.width
+        return slot
+
+    @staticmethod
+    def _merge(into, values):
+        for key, slot in values.copy().items():
+            total = into.get(key)
+            if total is None:
+                into[key] = list(slot)
+            else:
+                for i, value in enumerate(slot):
+                    total[i] += value
+
+    def _fold_finished(self):
+        # Called with the lock held; a finished thread can no longer write to its shard
+        live = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                live.append((thread, values))
+            else:
+                self._merge(self._retired, values)
+        self._shards = live
+
+    def totals(self):
+        with self._lock:
+            self._fold_finished()
+            totals = {key: list(slot) for key, slot in self._retired.items()}
+            for _, values in self._shards:
+                self._merge(totals, values)
+        return totals
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for labelvalues, slot in sorted(self.totals().items()):
+            lines.extend(self._sample_lines(labelvalues, slot))
+        return lines
+
+
+class Counter(_ShardedMetric):
+    kind = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        self._slot(labelvalues)[0] += amount
+
+    def _sample_lines(self, labelvalues, slot):
+        return [f'{self.name}{_labels(self.labelnames, labelvalues)} {_format_value(slot[0])}']
+
+
+class Histogram(_ShardedMetric):
+    """Observations counted into fixed buckets; a slot is [per-bucket counts..., sum, count]."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.width = len(self.buckets) + 2
+        super().__init__(name, help, labelnames)
+
+    def observe(self, value, *labelvalues):
+        slot = self._slot(labelvalues)
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            slot[index] += 1
+        slot[-2] += value
+        slot[-1] += 1
+
+    def _sample_lines(self, labelvalues, slot):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), slot[:len(self.buckets)] + [None]):
+            cumulative = slot[-1] if count is None else cumulative + count
+            le = (('le', _format_value(bound)),)
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {_format_value(cumulative)}')
+        labels = _labels(self.labelnames, labelvalues)
+        lines.append(f'{self.name}_sum{labels} {_format_value(slot[-2])}')
+        lines.append(f'{self.name}_count{labels} {_format_value(slot[-1])}')
+        return lines
+
+
+class Sampled:
+    """A gauge or counter read from ``sample()`` at scrape time; it returns ``[(label values, value)]``."""
+
+    def __init__(self, name, kind, help, labelnames, sample):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.sample = sample
+        _metrics.append(self)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for labelvalues, value in self.sample():
+            lines.append(f'{self.name}{_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+def render():
+    return '\n'.join(line for metric in _metrics for line in metric.expose()) + '\n'
+
+
+# Request metrics, recorded by the hooks init_app() installs
+http_requests = Counter('abaad_http_requests_total', 'HTTP requests handled, by route and status.',
+                        ('method', 'endpoint', 'status'))
+http_request_seconds = Histogram('abaad_http_request_duration_seconds', 'Time to produce a response, by route.',
+                                 ('method', 'endpoint'))
+_requests_started = Counter('abaad_http_requests_started_total', 'HTTP requests started.')
+_requests_finished = Counter('abaad_http_requests_finished_total', 'HTTP requests finished (including failures).')
+
+
+def _in_flight():
+    started = _requests_started.totals().get((), [0])[0]
+    finished = _requests_finished.totals().get((), [0])[0]
+    return [((), started - finished)]
+
+
+Sampled('abaad_http_requests_in_flight', 'gauge', 'HTTP requests currently being handled.', (), _in_flight)
+
+
+def watch_pool(pool):
+    """Export ``pool.stats()`` occupancy gauges and wait counters."""
+    gauges = {'size': 'Open connections.', 'in_use': 'Connections checked out.',
+              'idle': 'Connections waiting in the pool.', 'max_size': 'Configured pool size.'}
+    for key, help in gauges.items():
+        Sampled(f'abaad_db_pool_{key}', 'gauge', help, (), lambda key=key: [((), pool.stats()[key])])
+    counters = {
+        'acquired': ('abaad_db_pool_acquires_total', 'Connections handed out.'),
+        'waited': ('abaad_db_pool_waits_total', 'Acquires that had to wait for a free connection.'),
+        'wait_seconds': ('abaad_db_pool_wait_seconds_total', 'Time spent waiting for a free connection.'),
+        'timeouts': ('abaad_db_pool_timeouts_total', 'Acquires that gave up waiting.'),
+    }
+    for key, (name, help) in counters.items():
+        Sampled(name, 'counter', help, (), lambda key=key: [((), pool.stats()[key])])
+
+
+_caches = {}
+
+
+def watch_cache(name, cache):
+    """Export hit/miss counts of a cache that keeps ``hits`` and ``misses`` attributes."""
+    _caches[name] = cache
+
+
+def _cache_ratio():
+    samples = []
+    for name, cache in sorted(_caches.items()):
+        lookups = cache.hits + cache.misses
+        samples.append(((name,), cache.hits / lookups if lookups else 0))
+    return samples
+
+
+Sampled('abaad_cache_hits_total', 'counter', 'Cache lookups answered from the cache.', ('cache',),
+        lambda: [((name,), cache.hits) for name, cache in sorted(_caches.items())])
+Sampled('abaad_cache_misses_total', 'counter', 'Cache lookups that had to load.', ('cache',),
+        lambda: [((name,), cache.misses) for name, cache in sorted(_caches.items())])
+Sampled('abaad_cache_hit_ratio', 'gauge', 'Hits over lookups since start.', ('cache',), _cache_ratio)
+
+
+def _local_request():
+    """True for a request made directly from this host, not relayed by a reverse proxy on it."""
+    if 'X-Forwarded-For' in request.headers or 'Forwarded' in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+def init_app(app):
+    token = os.environ.get('METRICS_TOKEN')
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        _requests_started.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            http_requests.inc(request.method, endpoint, str(response.status_code))
+            http_request_seconds.observe(time.perf_counter() - started, request.method, endpoint)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        if g.pop('metrics_started', None) is not None:
+            _requests_finished.inc()
+
+    @app.route('/metrics')
+    def metrics():
+        if token:
+            if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                abort(401)
+        elif not _local_request():
+            abort(403)
+        return Response(render(), content_type=CONTENT_TYPE)
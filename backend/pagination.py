@@ -0,0 +1,92 @@
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal, InvalidOperation
+
+PAGE_SIZE = 50
+
+
+def normalize_sort_order(sort_order, default='asc'):
+    sort_order = (sort_order or '').lower()
+    return sort_order if sort_order in ('asc', 'desc') else default
+
+
+def _encode_value(value):
+    if value is None:
+        return ['z', None]
+    if isinstance(value, bool):
+        return ['i', int(value)]
+    if isinstance(value, int):
+        return ['i', value]
+    if isinstance(value, (Decimal, float)):
+        return ['n', str(value)]
+    if isinstance(value, datetime.datetime):
+        return ['t', value.isoformat()]
+    if isinstance(value, datetime.date):
+        return ['d', value.isoformat()]
+    return ['s', str(value)]
+
+
+def _decode_value(item):
+    kind, value = item
+    if kind == 'z':
+        return None
+    if kind == 'i':
+        return int(value)
+    if kind == 'n':
+        return Decimal(value)
+    if kind == 't':
+        return datetime.datetime.fromisoformat(value)
+    if kind == 'd':
+        return datetime.date.fromisoformat(value)
+    if kind == 's':
+        return str(value)
+    raise ValueError(kind)
+
+
+def encode_page_cursor(values):
+    """Serialize the sort-key values of the last row on a page into an opaque token."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_page_cursor(token):
+    """Return the sort-key values stored in a page token, or None if it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        return [_decode_value(item) for item in json.loads(raw)]
+    except (binascii.Error, ValueError, TypeError, InvalidOperation):
+        return None
+
+
+def keyset_clause(order_keys, sort_order, after):
+    """Build the seek condition and ORDER BY for a keyset page.
+
+    ``order_keys`` is a list of ``(sql_expression, row_getter)`` pairs, the
+    last of which must be unique (normally the primary key) so the ordering
+    is total. Returns ``(condition, params, order_by)``; ``condition`` is
+    None on the first page.
+    """
+    exprs = [expr for expr, _ in order_keys]
+    direction = 'DESC' if sort_order == 'desc' else 'ASC'
+    order_by = ", ".join(f"{expr} {direction}" for expr in exprs)
+    if after is None or len(after) != len(exprs) or any(v is None for v in after):
+        return None, [], order_by
+    op = '<' if sort_order == 'desc' else '>'
+    if len(exprs) == 1:
+        condition = f"{exprs[0]} {op} %s"
+    else:
+        condition = f"({', '.join(exprs)}) {op} ({', '.join(['%s'] * len(exprs))})"
+    return condition, list(after), order_by
+
+
+def next_page_cursor(rows, order_keys, page_size=PAGE_SIZE):
+    """Trim the look-ahead row fetched past ``page_size`` and return ``(rows, next_cursor)``."""
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_page_cursor([getter(last) for _, getter in order_keys])
@@ -0,0 +1,174 @@
+"""Generic reads and writes behind the ``/api/<entity>`` JSON endpoints.
+
+Queries are built from the entity registry in entities.py: listings take
+the same ``filter_*``, ``sort_by`` and ``sort_order`` arguments as the
+HTML pages and are paged by keyset, and ``fields=`` narrows the SELECT
+to the named columns. Column names only ever reach SQL after being
+checked against the live schema's columns for the table.
+"""
+import datetime
+from decimal import Decimal
+from operator import itemgetter
+
+from entities import coerce
+from pagination import PAGE_SIZE, decode_page_cursor, keyset_clause, next_page_cursor, normalize_sort_order
+
+MAX_PAGE_SIZE = 500
+
+_SORT_KEY = '_sort_key'
+
+
+def readable_columns(entity, table_columns):
+    """The table's columns minus the write-only ones."""
+    secret = {field.column for field in entity.fields if field.secret}
+    return [column for column in table_columns if column not in secret]
+
+
+def select_columns(entity, readable, fields):
+    """Columns named by a ``fields=a,b`` argument (all readable columns if empty); raise ValueError on unknown ones."""
+    if not fields:
+        return list(readable)
+    requested = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in requested if name not in readable]
+    if unknown:
+        raise ValueError(f"Unknown fields for {entity.name}: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
+
+def parse_key(entity, raw):
+    """Key values from a URL segment: ``7``, or ``3,7`` for a composite key."""
+    parts = raw.split(',')
+    if len(parts) != len(entity.key_columns):
+        raise ValueError(f"{entity.name} are identified by {', '.join(entity.key_columns)}")
+    try:
+        return tuple(int(part) for part in parts)
+    except ValueError:
+        raise ValueError(f"Invalid key: {raw}")
+
+
+def _key_condition(entity):
+    return " AND ".join(f"{column} = %s" for column in entity.key_columns)
+
+
+def json_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    return value
+
+
+def json_row(row, columns):
+    return {column: json_value(row[column]) for column in columns}
+
+
+def list_conditions(entity, readable, args):
+    conditions, params = [], []
+    for arg, spec in entity.filters.items():
+        value = (args.get(arg) or '').strip()
+        if not value:
+            continue
+        if callable(spec):
+            clause = spec(value)
+            if clause is not None:
+                conditions.append(clause[0])
+                params.extend(clause[1])
+        elif spec in readable:
+            conditions.append(f"{spec} = %s")
+            params.append(value)
+    return conditions, params
+
+
+def list_page(cursor, entity, readable, columns, args):
+    """One keyset page of ``columns``; returns ``(rows, next_cursor)``."""
+    sort_by = args.get('sort_by') or entity.default_sort
+    if sort_by not in entity.sorts:
+        sort_by = entity.default_sort
+    sort_order = normalize_sort_order(args.get('sort_order'), entity.default_order)
+    try:
+        page_size = min(max(int(args.get('limit') or PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = PAGE_SIZE
+
+    # The sort and key values are needed to build the next page's cursor
+    # even when the client did not ask for them
+    selected = list(dict.fromkeys(columns + list(entity.key_columns)))
+    order_keys = []
+    if sort_by:
+        expression = entity.sorts[sort_by]
+        selected.append(f"{expression} AS {_SORT_KEY}")
+        order_keys.append((expression, itemgetter(_SORT_KEY)))
+    order_keys.extend((column, itemgetter(column)) for column in entity.key_columns)
+
+    conditions, params = list_conditions(entity, readable, args)
+    condition, seek_params, order_by = keyset_clause(order_keys, sort_order, decode_page_cursor(args.get('cursor')))
+    if condition:
+        conditions.append(condition)
+    query = f"SELECT {', '.join(selected)} FROM {entity.table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order_by} LIMIT %s"
+    cursor.execute(query, tuple(params) + tuple(seek_params) + (page_size + 1,))
+    names = [c[0] for c in cursor.description]
+    rows = [dict(zip(names, r)) for r in cursor.fetchall()]
+    rows, next_cursor = next_page_cursor(rows, order_keys, page_size)
+    return [json_row(row, columns) for row in rows], next_cursor
+
+
+def fetch_row(cursor, entity, columns, key, for_update=False):
+    query = f"SELECT {', '.join(columns)} FROM {entity.table} WHERE {_key_condition(entity)}"
+    if for_update:
+        query += " FOR UPDATE"
+    cursor.execute(query, key)
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([c[0] for c in cursor.description], row))
+
+
+def coerce_values(entity, data, supported, partial=False):
+    """Validate a JSON body into ``{column: value}``; raise ValueError listing every problem.
+
+    With ``partial`` (PATCH) only the columns present in the body are
+    checked and returned.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    fields = {field.column: field for field in entity.fields if supported(entity.table, field.column)}
+    unknown = [name for name in data if name not in fields]
+    if unknown:
+        raise ValueError(f"Unknown or read-only fields for {entity.name}: {', '.join(unknown)}")
+    values, problems = {}, []
+    for column, field in fields.items():
+        if partial and column not in data:
+            continue
+        try:
+            values[column] = coerce(field, data.get(column))
+        except ValueError as e:
+            problems.append(str(e))
+    if problems:
+        raise ValueError("; ".join(problems))
+    return values
+
+
+def insert(cursor, entity, values):
+    """Insert a row and return its key."""
+    columns = ", ".join(values)
+    placeholders = ", ".join(["%s"] * len(values))
+    cursor.execute(f"INSERT INTO {entity.table} ({columns}) VALUES ({placeholders})", tuple(values.values()))
+    if entity.auto_key:
+        return (cursor.lastrowid,)
+    return tuple(values[column] for column in entity.key_columns)
+
+
+def update(cursor, entity, key, values):
+    assignments = ", ".join(f"{column} = %s" for column in values)
+    cursor.execute(f"UPDATE {entity.table} SET {assignments} WHERE {_key_condition(entity)}",
+                   tuple(values.values()) + tuple(key))
+
+
+def delete(cursor, entity, key):
+    cursor.execute(f"DELETE FROM {entity.table} WHERE {_key_condition(entity)}", key)
+    return cursor.rowcount
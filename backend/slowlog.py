@@ -0,0 +1,145 @@
+"""Slow-query log aggregated by statement shape.
+
+Statements slower than the threshold are grouped by fingerprint (the SQL
+with literals and placeholders replaced by ``?``). Each group keeps its
+count, total and worst time, and the parameters of its latest
+occurrence. The first occurrence of a SELECT also gets an EXPLAIN, so
+the plan is on hand without reproducing the request.
+
+The EXPLAIN is queued and run by a background thread on a connection of
+its own from the pool: the slow statement's connection may still have
+rows or further result sets pending, which running anything else on it
+would discard.
+"""
+import datetime
+import json
+import logging
+import queue
+import re
+import threading
+
+import pymysql.cursors
+
+logger = logging.getLogger('abaad.slow_queries')
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+PARAMS_PREVIEW = 500
+
+
+def fingerprint(query):
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    shape = _STRING.sub('?', query)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?+)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+def _preview(args):
+    if args is None:
+        return None
+    text = repr(args)
+    return text if len(text) <= PARAMS_PREVIEW else text[:PARAMS_PREVIEW - 3] + '...'
+
+
+def explainable(shape):
+    """Only a single SELECT statement is worth (and safe) to EXPLAIN."""
+    return shape.lstrip('( ').upper().startswith('SELECT') and ';' not in shape.rstrip('; ')
+
+
+class SlowQueryLog:
+    def __init__(self, threshold, max_entries=200, pool=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Where EXPLAINs get their connection; without one they are skipped
+        self.pool = pool
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._explains = queue.Queue()
+        self._explainer = None
+
+    def record(self, cursor, query, args, seconds):
+        shape = fingerprint(query)
+        now = datetime.datetime.now()
+        with self._lock:
+            entry = self._entries.get(shape)
+            first = entry is None
+            if first:
+                if len(self._entries) >= self.max_entries:
+                    # Make room by forgetting the group that has cost the least in total
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k]['total_seconds'])]
+                entry = self._entries[shape] = {
+                    'fingerprint': shape, 'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                    'first_seen': now, 'last_seen': now, 'last_params': None, 'explain': None,
+                }
+            entry['count'] += 1
+            entry['total_seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            entry['last_seen'] = now
+            entry['last_params'] = _preview(args)
+
+        logger.warning(json.dumps({
+            'ms': round(seconds * 1000, 2),
+            'fingerprint': shape,
+            'params': entry['last_params'],
+        }))
+        if first and self.pool is not None and explainable(shape):
+            # mogrify only escapes the arguments; it does not touch the wire
+            self._explains.put((entry, cursor.mogrify(query, args)))
+            self._start_explainer()
+
+    def _start_explainer(self):
+        with self._lock:
+            if self._explainer is not None:
+                return
+            self._explainer = threading.Thread(target=self._explain_forever, name='slow-query-explain', daemon=True)
+        self._explainer.start()
+
+    def _explain_forever(self):
+        while True:
+            entry, statement = self._explains.get()
+            try:
+                entry['explain'] = self._explain(statement)
+            finally:
+                self._explains.task_done()
+
+    def _explain(self, statement):
+        # A plain cursor: the EXPLAIN must not be timed (or logged) itself
+        discard = False
+        try:
+            conn = self.pool.acquire()
+        except Exception as e:
+            return {'error': str(e)}
+        try:
+            with conn.cursor(pymysql.cursors.Cursor) as explain:
+                explain.execute("EXPLAIN " + statement)
+                columns = [column[0] for column in explain.description]
+                return {'columns': columns, 'rows': [list(row) for row in explain.fetchall()]}
+        except pymysql.err.OperationalError as e:
+            discard = True
+            return {'error': str(e)}
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            self.pool.release(conn, discard=discard)
+
+    def wait_for_explains(self):
+        """Block until every queued EXPLAIN has run."""
+        self._explains.join()
+
+    def entries(self):
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        for entry in entries:
+            entry['avg_seconds'] = entry['total_seconds'] / entry['count']
+        return sorted(entries, key=lambda entry: entry['total_seconds'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
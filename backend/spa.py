@@ -0,0 +1,75 @@
+"""The React build's index.html, held in memory.
+
+The shell is read once at startup (and again by ``load()`` after a new
+frontend build is deployed) together with its gzip variant, plus a
+brotli variant when the ``brotli`` package is installed; each encoding
+has its own ETag. Serving an SPA route is then a dictionary lookup: no
+stat or open per request.
+"""
+import hashlib
+import signal
+
+from flask import Response
+
+from assets import compressed_variants, negotiate, variant_etag
+
+
+class SpaShell:
+    def __init__(self, path, logger=None):
+        self.path = path
+        self.logger = logger
+        self._variants = None
+        self.load()
+
+    @property
+    def available(self):
+        return self._variants is not None
+
+    def load(self):
+        """(Re)read the shell; leaves it unavailable if the build is missing."""
+        try:
+            with open(self.path, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            self._variants = None
+            return False
+        variants = {
+            'etag': hashlib.blake2b(body, digest_size=12).hexdigest(),
+            'identity': body,
+            **compressed_variants(body),
+        }
+        # One assignment, so a concurrent request sees either the old shell or the new one
+        self._variants = variants
+        return True
+
+    def reload_on(self, signum=getattr(signal, 'SIGHUP', None)):
+        """Reload whenever the process receives ``signum``; opt-in, since it replaces any existing handler."""
+        if signum is None:
+            return
+
+        def reload(signum, frame):
+            loaded = self.load()
+            if self.logger:
+                self.logger.info("React shell %s", "reloaded" if loaded else "not found; serving templates")
+
+        try:
+            signal.signal(signum, reload)
+        except ValueError:
+            # Not the main thread (e.g. imported by a test harness); reload by hand instead
+            pass
+
+    def response(self, request):
+        variants = self._variants
+        encoding = negotiate(request, variants)
+        etag = variant_etag(variants['etag'], encoding)
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(variants[encoding], content_type='text/html; charset=utf-8')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        # Always revalidate: the shell names the current build's asset files
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,175 @@
+"""Materialized report summaries kept in step with the fact tables.
+
+The write routes apply deltas inside their own transaction; writes whose
+effect is not a simple delta (cascading deletes, bulk loads) rebuild the
+affected summaries from scratch instead. The home page counters in
+DashboardStats follow the same rule.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+SUMMARY_TABLES = ('BranchRevenueSummary', 'EmployeeHoursSummary', 'MaterialSpendSummary')
+
+# Home page counters kept in DashboardStats (StatName, Value), and the type each is read back as
+DASHBOARD_STATS = {
+    'branch_count': int,
+    'client_count': int,
+    'employee_count': int,
+    'project_count': int,
+    'supplier_count': int,
+    'total_revenue': Decimal,
+}
+
+
+def money(value):
+    """Round a form value the way a DECIMAL(p,2) column stores it."""
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def add_branch_revenue(cursor, branch_id, projects, revenue):
+    cursor.execute("""
+        INSERT INTO BranchRevenueSummary (BranchID, ProjectCount, TotalRevenue)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE ProjectCount = ProjectCount + VALUES(ProjectCount),
+                                TotalRevenue = TotalRevenue + VALUES(TotalRevenue)
+    """, (branch_id, projects, revenue))
+
+
+def add_employee_hours(cursor, employee_id, assignments, hours):
+    cursor.execute("""
+        INSERT INTO EmployeeHoursSummary (EmployeeID, AssignmentCount, TotalHours)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE AssignmentCount = AssignmentCount + VALUES(AssignmentCount),
+                                TotalHours = TotalHours + VALUES(TotalHours)
+    """, (employee_id, assignments, hours))
+
+
+def add_material_spend(cursor, material_id, lines, spend):
+    cursor.execute("""
+        INSERT INTO MaterialSpendSummary (MaterialID, LineCount, TotalSpend)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE LineCount = LineCount + VALUES(LineCount),
+                                TotalSpend = TotalSpend + VALUES(TotalSpend)
+    """, (material_id, lines, spend))
+
+
+def subtract_project_children(cursor, project_id):
+    """Take a project's assignments and materials out of the summaries before it is deleted (they cascade)."""
+    cursor.execute("""
+        SELECT EmployeeID, COUNT(*), SUM(HoursWorked)
+        FROM WorkAssignment WHERE ProjectID = %s GROUP BY EmployeeID
+    """, (project_id,))
+    for employee_id, count, hours in cursor.fetchall():
+        add_employee_hours(cursor, employee_id, -count, -hours)
+    cursor.execute("""
+        SELECT MaterialID, COUNT(*), SUM(Quantity * UnitPrice)
+        FROM ProjectMaterial WHERE ProjectID = %s GROUP BY MaterialID
+    """, (project_id,))
+    for material_id, count, spend in cursor.fetchall():
+        add_material_spend(cursor, material_id, -count, -spend)
+
+
+def rebuild_summaries(cursor):
+    cursor.execute("DELETE FROM BranchRevenueSummary")
+    cursor.execute("""
+        INSERT INTO BranchRevenueSummary (BranchID, ProjectCount, TotalRevenue)
+        SELECT BranchID, COUNT(*), SUM(Revenue) FROM Project GROUP BY BranchID
+    """)
+    cursor.execute("DELETE FROM EmployeeHoursSummary")
+    cursor.execute("""
+        INSERT INTO EmployeeHoursSummary (EmployeeID, AssignmentCount, TotalHours)
+        SELECT EmployeeID, COUNT(*), SUM(HoursWorked) FROM WorkAssignment GROUP BY EmployeeID
+    """)
+    cursor.execute("DELETE FROM MaterialSpendSummary")
+    cursor.execute("""
+        INSERT INTO MaterialSpendSummary (MaterialID, LineCount, TotalSpend)
+        SELECT MaterialID, COUNT(*), SUM(Quantity * UnitPrice) FROM ProjectMaterial GROUP BY MaterialID
+    """)
+
+
+def refresh_best_price(cursor, material_id):
+    """Recompute one material's row in MaterialBestPrice from its two cheapest offers."""
+    cursor.execute("""
+        SELECT SupplierID, Price FROM SupplierMaterial
+        WHERE MaterialID = %s
+        ORDER BY Price, SupplierID
+        LIMIT 2
+    """, (material_id,))
+    offers = cursor.fetchall()
+    if not offers:
+        cursor.execute("DELETE FROM MaterialBestPrice WHERE MaterialID = %s", (material_id,))
+        return
+    best_supplier, best_price = offers[0]
+    second_price = offers[1][1] if len(offers) > 1 else None
+    cursor.execute("""
+        INSERT INTO MaterialBestPrice (MaterialID, BestPrice, BestSupplierID, SecondBestPrice)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE BestPrice = VALUES(BestPrice),
+                                BestSupplierID = VALUES(BestSupplierID),
+                                SecondBestPrice = VALUES(SecondBestPrice)
+    """, (material_id, best_price, best_supplier, second_price))
+
+
+def rebuild_best_prices(cursor):
+    cursor.execute("DELETE FROM MaterialBestPrice")
+    cursor.execute("""
+        INSERT INTO MaterialBestPrice (MaterialID, BestPrice, BestSupplierID, SecondBestPrice)
+        SELECT MaterialID,
+               MAX(CASE WHEN PriceRank = 1 THEN Price END),
+               MAX(CASE WHEN PriceRank = 1 THEN SupplierID END),
+               MAX(CASE WHEN PriceRank = 2 THEN Price END)
+        FROM (
+            SELECT MaterialID, SupplierID, Price,
+                   ROW_NUMBER() OVER (PARTITION BY MaterialID ORDER BY Price, SupplierID) as PriceRank
+            FROM SupplierMaterial
+        ) ranked
+        WHERE PriceRank <= 2
+        GROUP BY MaterialID
+    """)
+
+
+def count_dashboard_stats(cursor):
+    """The home page counters counted from the source tables."""
+    cursor.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM Branch) as branch_count,
+            (SELECT COUNT(*) FROM Client) as client_count,
+            (SELECT COUNT(*) FROM Employee) as employee_count,
+            (SELECT COUNT(*) FROM Project) as project_count,
+            (SELECT COUNT(*) FROM Supplier) as supplier_count,
+            (SELECT SUM(Revenue) FROM Project) as total_revenue
+    """)
+    columns = [col[0] for col in cursor.description]
+    return {name: DASHBOARD_STATS[name](value or 0) for name, value in zip(columns, cursor.fetchone())}
+
+
+def load_dashboard_stats(cursor):
+    """The home page counters as stored in DashboardStats."""
+    cursor.execute("SELECT StatName, Value FROM DashboardStats")
+    stats = {name: kind(0) for name, kind in DASHBOARD_STATS.items()}
+    stats.update((name, DASHBOARD_STATS[name](value)) for name, value in cursor.fetchall() if name in DASHBOARD_STATS)
+    return stats
+
+
+def add_dashboard_stats(cursor, **deltas):
+    """Apply a write's counter deltas inside its transaction, locking the rows in name order."""
+    for name in sorted(deltas):
+        if deltas[name]:
+            cursor.execute("UPDATE DashboardStats SET Value = Value + %s WHERE StatName = %s", (deltas[name], name))
+
+
+def recount_dashboard_stats(cursor):
+    """Reset DashboardStats from full counts; return the drift found as ``{name: (stored, counted)}``.
+
+    The stored rows are locked before counting, so a write that changes a
+    counter has either committed already or waits for this transaction.
+    """
+    cursor.execute("SELECT StatName, Value FROM DashboardStats ORDER BY StatName FOR UPDATE")
+    stored = {name: DASHBOARD_STATS[name](value) for name, value in cursor.fetchall() if name in DASHBOARD_STATS}
+    counted = count_dashboard_stats(cursor)
+    drift = {name: (stored.get(name), value) for name, value in counted.items() if stored.get(name) != value}
+    if drift:
+        cursor.executemany("""
+            INSERT INTO DashboardStats (StatName, Value) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE Value = VALUES(Value)
+        """, [(name, counted[name]) for name in sorted(drift)])
+    return drift
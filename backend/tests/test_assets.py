@@ -0,0 +1,27 @@
+from flask import Flask, request
+
+from assets import AssetStore
+
+app = Flask(__name__)
+
+
+def serve(store, filename, **headers):
+    with app.test_request_context(headers=headers):
+        return store.response(request, filename)
+
+
+def test_each_encoding_has_its_own_etag(tmp_path):
+    (tmp_path / 'app.js').write_text('console.log("hello");\n' * 200)
+    store = AssetStore(str(tmp_path))
+
+    plain = serve(store, 'app.js')
+    gzipped = serve(store, 'app.js', **{'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert plain.get_etag() != gzipped.get_etag()
+    assert 'Accept-Encoding' in gzipped.vary
+
+    assert serve(store, 'app.js', **{'If-None-Match': plain.get_etag()[0]}).status_code == 304
+    # The identity ETag does not validate a cached gzip body, or the other way round
+    assert serve(store, 'app.js', **{'Accept-Encoding': 'gzip',
+                                     'If-None-Match': plain.get_etag()[0]}).status_code == 200
+    assert serve(store, 'app.js', **{'If-None-Match': gzipped.get_etag()[0]}).status_code == 200
@@ -0,0 +1,81 @@
+import pytest
+
+import cache
+from cache import TableVersions, TTLCache, VersionedCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_ttl_cache_hits_until_the_entry_expires(clock):
+    users = TTLCache(ttl=60)
+    users.set(1, 'admin')
+    clock[0] += 59
+    assert users.get(1) == 'admin'
+    clock[0] += 2
+    assert users.get(1) is None
+    assert (users.hits, users.misses) == (1, 1)
+
+
+def test_ttl_cache_evicts_the_least_recently_used(clock):
+    users = TTLCache(max_size=2, ttl=60)
+    users.set(1, 'a')
+    users.set(2, 'b')
+    users.get(1)
+    users.set(3, 'c')
+    assert users.get(2) is None
+    assert (users.get(1), users.get(3)) == ('a', 'c')
+
+
+def test_ttl_cache_pop_and_clear(clock):
+    users = TTLCache(ttl=60)
+    users.set(1, 'a')
+    users.set(2, 'b')
+    users.pop(1)
+    assert users.get(1) is None
+    users.clear()
+    assert users.get(2) is None
+
+
+def test_versioned_cache_reloads_when_a_source_table_moves():
+    versions = {'Branch': 1, 'Project': 5}
+    lookups = VersionedCache(TableVersions(lambda: dict(versions)))
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    assert lookups.get_or_load('branches', ('Branch',), load) == 1
+    assert lookups.get_or_load('branches', ('Branch',), load) == 1
+    versions['Project'] += 1
+    assert lookups.get('branches', ('Branch',)) == 1
+    versions['Branch'] += 1
+    assert lookups.get('branches', ('Branch',)) is None
+    assert lookups.get_or_load('branches', ('Branch',), load) == 2
+    assert (lookups.hits, lookups.misses) == (2, 2)
+
+
+def test_versioned_cache_keys_are_independent():
+    lookups = VersionedCache(TableVersions(lambda: {'Branch': 1}))
+    lookups.get_or_load('branches', ('Branch',), lambda: ['Haifa'])
+    lookups.get_or_load('cities', ('Branch',), lambda: ['Nazareth'])
+    assert lookups.get('branches', ('Branch',)) == ['Haifa']
+    lookups.clear()
+    assert lookups.get('cities', ('Branch',)) is None
+
+
+def test_write_during_a_load_is_not_hidden_by_it():
+    versions = {'Sales': 1}
+    reports = VersionedCache(TableVersions(lambda: dict(versions)))
+
+    def load_while_a_write_commits():
+        versions['Sales'] += 1
+        return 'stale'
+
+    assert reports.get_or_load('profitability', ('Sales',), load_while_a_write_commits) == 'stale'
+    assert reports.get('profitability', ('Sales',)) is None
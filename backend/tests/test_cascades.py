@@ -0,0 +1,32 @@
+from entities import DELETE_CASCADES, ENTITIES_BY_TABLE, cascaded_tables
+
+
+def test_table_without_children_is_only_itself():
+    assert cascaded_tables('Payment') == {'Payment'}
+
+
+def test_cascades_are_followed_transitively():
+    # Branch -> Employee -> WorkAssignment/Department, Branch -> Project -> ...
+    assert cascaded_tables('Branch') == {
+        'Branch', 'Employee', 'Department', 'WorkAssignment', 'Project', 'ProjectMaterial',
+        'Contract', 'Phase', 'Schedule', 'Sales', 'Project_Suppliers',
+    }
+    assert cascaded_tables('Department') == {'Department', 'Employee', 'WorkAssignment'}
+
+
+def test_self_and_mutual_references_terminate():
+    # Employee cascades into itself (ManagerID) and into Department, which cascades back
+    assert cascaded_tables('Employee') == {'Employee', 'Department', 'WorkAssignment'}
+
+
+def test_several_tables_are_unioned():
+    assert cascaded_tables('Phase', 'Material') == {
+        'Phase', 'Schedule', 'Material', 'ProjectMaterial', 'SupplierMaterial', 'Purchase',
+    }
+
+
+def test_every_cascade_names_a_known_table():
+    tables = set(ENTITIES_BY_TABLE)
+    for parent, children in DELETE_CASCADES.items():
+        assert parent in tables
+        assert set(children) <= tables
@@ -0,0 +1,191 @@
+from decimal import Decimal
+
+import pytest
+
+import hello
+from db import SchemaRegistry
+from summaries import add_dashboard_stats, load_dashboard_stats, recount_dashboard_stats
+
+COUNTS = "SELECT (SELECT COUNT(*) FROM Branch)"
+TABLES = {
+    'Branch': ('BranchID', 'BranchName', 'City', 'Address', 'PhoneNumber'),
+    'Department': ('DepartmentID', 'DepartmentName'),
+    'Employee': ('EmployeeID', 'DepartmentID'),
+    'DashboardStats': ('StatName', 'Value'),
+}
+
+
+class FakeDatabase:
+    """The DashboardStats rows, the source table sizes and a log of the statements run against them."""
+
+    def __init__(self, stats=None, **counts):
+        self.stats = dict(stats or {})
+        self.counts = {'branch_count': 0, 'client_count': 0, 'employee_count': 0,
+                       'project_count': 0, 'supplier_count': 0, 'total_revenue': None}
+        self.counts.update(counts)
+        self.log = []
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self):
+        return FakeCursor(self.database)
+
+    def commit(self):
+        self.database.log.append('COMMIT')
+
+    def rollback(self):
+        self.database.log.append('ROLLBACK')
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.description = None
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, query, args=()):
+        query = ' '.join(query.split())
+        database = self.database
+        if 'information_schema.COLUMNS' in query:
+            self._rows = [(table, column) for table, columns in TABLES.items() for column in columns]
+            return
+        database.log.append(query)
+        if query.startswith("SELECT StatName, Value FROM DashboardStats"):
+            self._rows = sorted(database.stats.items())
+        elif query.startswith(COUNTS):
+            self.description = [(name,) for name in database.counts]
+            self._rows = [tuple(database.counts.values())]
+        elif query == "UPDATE DashboardStats SET Value = Value + %s WHERE StatName = %s":
+            delta, name = args
+            database.stats[name] += Decimal(delta)
+        elif query.startswith("SELECT COUNT(*) FROM Employee WHERE DepartmentID = %s"):
+            self._rows = [(database.counts['employee_count'],)]
+        elif query.startswith(("INSERT INTO Branch ", "DELETE FROM Department ")):
+            self.rowcount = 1
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+
+    def executemany(self, query, rows):
+        query = ' '.join(query.split())
+        assert query.startswith("INSERT INTO DashboardStats (StatName, Value) VALUES (%s, %s) ON DUPLICATE KEY")
+        self.database.log.append(('upsert', [name for name, _ in rows]))
+        self.database.stats.update((name, Decimal(value)) for name, value in rows)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakePool:
+    def __init__(self, database):
+        self.database = database
+
+    def acquire(self, block=True):
+        return FakeConnection(self.database)
+
+    def release(self, conn, discard=False):
+        pass
+
+
+def stored(**values):
+    stats = {name: Decimal('0.00') for name in hello.DASHBOARD_COUNTS.values()}
+    stats['total_revenue'] = Decimal('0.00')
+    stats.update((name, Decimal(value)) for name, value in values.items())
+    return stats
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(hello, 'schema', SchemaRegistry())
+    # Keep the reconciliation thread out of the tests
+    monkeypatch.setattr(hello, '_stats_reconciler', object())
+    hello.app.config['TESTING'] = True
+    return hello.app.test_client()
+
+
+def use(monkeypatch, database):
+    monkeypatch.setattr(hello, 'db_pool', FakePool(database))
+    return database
+
+
+def test_add_applies_nonzero_deltas_in_name_order():
+    database = FakeDatabase(stored(employee_count=4, branch_count=2))
+    add_dashboard_stats(FakeCursor(database), employee_count=-1, project_count=0, branch_count=1)
+    assert database.log == [
+        "UPDATE DashboardStats SET Value = Value + %s WHERE StatName = %s",
+        "UPDATE DashboardStats SET Value = Value + %s WHERE StatName = %s",
+    ]
+    assert database.stats['branch_count'] == 3
+    assert database.stats['employee_count'] == 3
+    assert database.stats['project_count'] == 0
+
+
+def test_load_reads_counts_as_int_and_revenue_as_decimal():
+    database = FakeDatabase({'branch_count': Decimal('3.00'), 'total_revenue': Decimal('1500.50'),
+                             'retired_stat': Decimal('9.00')})
+    stats = load_dashboard_stats(FakeCursor(database))
+    assert stats == {'branch_count': 3, 'client_count': 0, 'employee_count': 0, 'project_count': 0,
+                     'supplier_count': 0, 'total_revenue': Decimal('1500.50')}
+    assert type(stats['branch_count']) is int
+
+
+def test_recount_locks_then_rewrites_only_the_drifted_counters():
+    database = FakeDatabase(stored(branch_count=3, employee_count=9), branch_count=3, employee_count=7,
+                            total_revenue=Decimal('250.00'))
+    drift = recount_dashboard_stats(FakeCursor(database))
+    assert drift == {'employee_count': (9, 7), 'total_revenue': (Decimal('0.00'), Decimal('250.00'))}
+    assert database.log[0] == "SELECT StatName, Value FROM DashboardStats ORDER BY StatName FOR UPDATE"
+    assert database.log[-1] == ('upsert', ['employee_count', 'total_revenue'])
+    assert database.stats == stored(branch_count=3, employee_count=7, total_revenue='250.00')
+
+
+def test_recount_seeds_missing_rows_and_is_quiet_when_in_step():
+    database = FakeDatabase(branch_count=2)
+    assert recount_dashboard_stats(FakeCursor(database))['branch_count'] == (None, 2)
+    assert database.stats == stored(branch_count=2)
+    database.log.clear()
+    assert recount_dashboard_stats(FakeCursor(database)) == {}
+    assert not any(isinstance(entry, tuple) for entry in database.log)
+
+
+def test_add_branch_updates_the_counter_before_its_commit(monkeypatch, client):
+    database = use(monkeypatch, FakeDatabase(stored(branch_count=3)))
+    client.post('/branches/add', data={'branch_name': 'Hebron', 'city': 'Hebron'})
+    assert database.log[-2:] == ["UPDATE DashboardStats SET Value = Value + %s WHERE StatName = %s", 'COMMIT']
+    assert database.stats['branch_count'] == 4
+
+
+def test_delete_department_subtracts_its_cascaded_employees(monkeypatch, client):
+    database = use(monkeypatch, FakeDatabase(stored(employee_count=10), employee_count=4))
+    client.post('/departments/delete/2')
+    assert database.log[-1] == 'COMMIT'
+    assert database.stats['employee_count'] == 6
+
+
+def test_stats_endpoint_reads_the_stored_counters(monkeypatch, client):
+    database = use(monkeypatch, FakeDatabase(stored(branch_count=3, total_revenue='99.50'), branch_count=8))
+    assert client.get('/api/stats').get_json()['branch_count'] == 3
+    assert not any(entry.startswith(COUNTS) for entry in database.log)
+
+
+def test_reconcile_commits_the_recount(monkeypatch):
+    database = use(monkeypatch, FakeDatabase(stored(supplier_count=1), supplier_count=5))
+    assert hello.reconcile_dashboard_stats() == {'supplier_count': (1, 5)}
+    assert database.log[-1] == 'COMMIT'
+    assert database.stats['supplier_count'] == 5
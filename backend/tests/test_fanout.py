@@ -0,0 +1,89 @@
+import threading
+
+from fanout import FanOut
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+
+    def cursor(self):
+        return FakeCursor(self.name)
+
+
+class FakeCursor:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakePool:
+    def __init__(self, size):
+        self.idle = [FakeConnection(f'pooled-{n}') for n in range(size)]
+        self.acquired_by = []
+        self.lock = threading.Lock()
+
+    def acquire(self, block=True):
+        with self.lock:
+            self.acquired_by.append(threading.current_thread().name)
+            return self.idle.pop() if self.idle else None
+
+    def release(self, conn, discard=False):
+        with self.lock:
+            self.idle.append(conn)
+
+
+def cursor_name(cursor):
+    return cursor.name
+
+
+def test_workers_check_out_their_own_connections():
+    pool = FakePool(size=2)
+    fan_out = FanOut(pool, max_workers=2)
+    try:
+        main, others = fan_out.run(FakeCursor('request'), cursor_name, {'a': cursor_name, 'b': cursor_name})
+    finally:
+        fan_out.shutdown()
+    assert main == 'request'
+    assert all(name.startswith('db-fanout') for name in pool.acquired_by)
+    assert set(others.values()) <= {'pooled-0', 'pooled-1', 'request'}
+    assert len(pool.idle) == 2
+
+
+def test_statements_run_on_the_callers_cursor_when_the_pool_is_busy():
+    pool = FakePool(size=0)
+    fan_out = FanOut(pool, max_workers=2)
+    try:
+        main, others = fan_out.run(FakeCursor('request'), cursor_name, {'a': cursor_name, 'b': cursor_name})
+    finally:
+        fan_out.shutdown()
+    assert others == {'a': 'request', 'b': 'request'}
+
+
+def test_queued_statements_run_on_the_callers_cursor():
+    pool = FakePool(size=2)
+    fan_out = FanOut(pool, max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocker(cursor):
+        started.set()
+        release.wait(5)
+        return cursor.name
+
+    busy = threading.Thread(target=fan_out.run, args=(FakeCursor('other'), cursor_name, {'x': blocker}))
+    busy.start()
+    started.wait(5)
+    try:
+        main, others = fan_out.run(FakeCursor('request'), cursor_name, {'a': cursor_name})
+        assert others == {'a': 'request'}
+    finally:
+        release.set()
+        busy.join()
+        fan_out.shutdown()
+    # The queued statement never took a connection
+    assert len(pool.acquired_by) == 1
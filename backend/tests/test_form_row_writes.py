@@ -0,0 +1,222 @@
+import re
+from decimal import Decimal
+
+import pytest
+
+import hello
+from db import SchemaRegistry
+
+TABLES = {
+    'WorkAssignment': ('ProjectID', 'EmployeeID', 'Role', 'HoursWorked', 'StartDate', 'EndDate'),
+    'ProjectMaterial': ('ProjectID', 'MaterialID', 'Quantity', 'UnitPrice'),
+    'SupplierMaterial': ('SupplierID', 'MaterialID', 'Price', 'LeadTime'),
+    'MaterialBestPrice': ('MaterialID', 'BestPrice', 'BestSupplierID', 'SecondBestPrice'),
+    'BranchRevenueSummary': ('BranchID', 'ProjectCount', 'TotalRevenue'),
+    'EmployeeHoursSummary': ('EmployeeID', 'AssignmentCount', 'TotalHours'),
+    'MaterialSpendSummary': ('MaterialID', 'LineCount', 'TotalSpend'),
+}
+KEYS = {
+    'WorkAssignment': ('ProjectID', 'EmployeeID'),
+    'ProjectMaterial': ('ProjectID', 'MaterialID'),
+    'SupplierMaterial': ('SupplierID', 'MaterialID'),
+}
+DECIMALS = {'HoursWorked', 'Quantity', 'UnitPrice', 'Price'}
+
+SELECT = re.compile(r"SELECT (.+) FROM (\w+) WHERE (.+?)( FOR UPDATE)?$")
+UPDATE = re.compile(r"UPDATE (\w+) SET (.+) WHERE (.+)$")
+DELETE = re.compile(r"DELETE FROM (\w+) WHERE (.+)$")
+SUMMARY_UPSERT = re.compile(r"INSERT INTO (EmployeeHoursSummary|MaterialSpendSummary) ")
+OFFERS = re.compile(r"SELECT SupplierID, Price FROM SupplierMaterial WHERE MaterialID = %s ORDER BY Price, SupplierID LIMIT 2$")
+BEST_PRICE_UPSERT = re.compile(r"INSERT INTO MaterialBestPrice ")
+
+
+def stored(column, value):
+    """Coerce a bound form value the way its MySQL column would."""
+    if value is None:
+        return None
+    if column.endswith('ID'):
+        return int(value)
+    if column in DECIMALS:
+        return Decimal(str(value))
+    return value
+
+
+def condition_columns(where):
+    return [part.split(' = ')[0] for part in where.split(' AND ')]
+
+
+class FakeDatabase:
+    """Just enough of MySQL for the form routes: keyed rows, the summary upserts and MaterialBestPrice."""
+
+    def __init__(self):
+        self.rows = {table: {} for table in KEYS}
+        self.summaries = {'EmployeeHoursSummary': {}, 'MaterialSpendSummary': {}}
+        self.best_prices = {}
+        self.log = []
+        self.commits = 0
+
+    def insert(self, table, **row):
+        self.rows[table][tuple(row[column] for column in KEYS[table])] = row
+
+    def summary(self, table, key):
+        return tuple(self.summaries[table].get(key, (0, Decimal('0'))))
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self):
+        return FakeCursor(self.database)
+
+    def commit(self):
+        self.database.commits += 1
+        self.database.log.append('COMMIT')
+
+    def rollback(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.description = None
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, query, args=()):
+        query = ' '.join(query.split())
+        args = tuple(args or ())
+        if 'information_schema.COLUMNS' in query:
+            self._rows = [(table, column) for table, columns in TABLES.items() for column in columns]
+        elif OFFERS.match(query):
+            offers = [row for row in self.database.rows['SupplierMaterial'].values() if row['MaterialID'] == int(args[0])]
+            self._rows = sorted(((row['SupplierID'], row['Price']) for row in offers),
+                                key=lambda offer: (offer[1], offer[0]))[:2]
+        elif query.startswith("DELETE FROM MaterialBestPrice "):
+            self.database.best_prices.pop(int(args[0]), None)
+            self.database.log.append(('MaterialBestPrice', int(args[0])))
+        elif BEST_PRICE_UPSERT.match(query):
+            material_id, best_price, best_supplier, second_price = args
+            self.database.best_prices[int(material_id)] = (best_price, best_supplier, second_price)
+            self.database.log.append(('MaterialBestPrice', int(material_id)))
+        elif match := SELECT.match(query):
+            columns = match.group(1).split(', ')
+            row = self.database.rows[match.group(2)].get(tuple(int(value) for value in args))
+            self.description = [(column,) for column in columns]
+            self._rows = [tuple(row[column] for column in columns)] if row else []
+        elif match := UPDATE.match(query):
+            table = self.database.rows[match.group(1)]
+            assigned = condition_columns(match.group(2).replace(', ', ' AND '))
+            key_args = args[len(assigned):]
+            row = dict(table.pop(tuple(int(value) for value in key_args)))
+            row.update((column, stored(column, value)) for column, value in zip(assigned, args))
+            table[tuple(row[column] for column in KEYS[match.group(1)])] = row
+            self.rowcount = 1
+        elif match := DELETE.match(query):
+            self.rowcount = int(self.database.rows[match.group(1)].pop(tuple(int(v) for v in args), None) is not None)
+        elif match := SUMMARY_UPSERT.match(query):
+            summary = self.database.summaries[match.group(1)]
+            key, count, total = args
+            old_count, old_total = summary.get(int(key), (0, Decimal('0')))
+            summary[int(key)] = (old_count + count, old_total + Decimal(str(total)))
+        else:
+            raise AssertionError(f"Unexpected query: {query}")
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakePool:
+    def __init__(self, database):
+        self.database = database
+
+    def acquire(self, block=True):
+        return FakeConnection(self.database)
+
+    def release(self, conn, discard=False):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(hello, 'db_pool', FakePool(database))
+    monkeypatch.setattr(hello, 'schema', SchemaRegistry())
+    return database
+
+
+@pytest.fixture
+def client():
+    hello.app.config['TESTING'] = True
+    return hello.app.test_client()
+
+
+def test_update_and_delete_work_assignment_keep_employee_hours(database, client):
+    database.insert('WorkAssignment', ProjectID=1, EmployeeID=7, Role='Foreman',
+                    HoursWorked=Decimal('10.00'), StartDate='2024-01-01', EndDate=None)
+    database.summaries['EmployeeHoursSummary'] = {7: (1, Decimal('10.00'))}
+
+    client.post('/work_assignments/update/1/7', data={
+        'project_id': '1', 'employee_id': '8', 'role': 'Foreman',
+        'hours_worked': '12.5', 'start_date': '2024-01-01',
+    })
+    assert set(database.rows['WorkAssignment']) == {(1, 8)}
+    assert database.summary('EmployeeHoursSummary', 7) == (0, Decimal('0.00'))
+    assert database.summary('EmployeeHoursSummary', 8) == (1, Decimal('12.50'))
+
+    client.post('/work_assignments/delete/1/8')
+    assert database.rows['WorkAssignment'] == {}
+    assert database.summary('EmployeeHoursSummary', 8) == (0, Decimal('0.00'))
+    assert database.commits == 2
+
+
+def test_update_and_delete_project_material_keep_material_spend(database, client):
+    database.insert('ProjectMaterial', ProjectID=1, MaterialID=3,
+                    Quantity=Decimal('4.00'), UnitPrice=Decimal('2.50'))
+    database.summaries['MaterialSpendSummary'] = {3: (1, Decimal('10.00'))}
+
+    client.post('/project_materials/update/1/3', data={
+        'project_id': '1', 'material_id': '3', 'quantity': '6', 'unit_price': '2.50',
+    })
+    assert database.summary('MaterialSpendSummary', 3) == (1, Decimal('15.00'))
+
+    client.post('/project_materials/delete/1/3')
+    assert database.rows['ProjectMaterial'] == {}
+    assert database.summary('MaterialSpendSummary', 3) == (0, Decimal('0.00'))
+    assert database.commits == 2
+
+
+def test_missing_row_writes_nothing(database, client):
+    client.post('/work_assignments/delete/1/7')
+    assert database.summaries['EmployeeHoursSummary'] == {}
+    assert database.commits == 0
+
+
+def test_update_and_delete_supplier_material_refresh_best_price_before_commit(database, client):
+    database.insert('SupplierMaterial', SupplierID=1, MaterialID=3, Price=Decimal('5.00'), LeadTime=None)
+    database.insert('SupplierMaterial', SupplierID=2, MaterialID=3, Price=Decimal('6.00'), LeadTime=None)
+    database.best_prices = {3: (Decimal('5.00'), 1, Decimal('6.00'))}
+
+    client.post('/supplier_materials/update/1/3', data={
+        'supplier_id': '1', 'material_id': '4', 'price': '7.00', 'lead_time': '',
+    })
+    assert database.best_prices == {3: (Decimal('6.00'), 2, None), 4: (Decimal('7.00'), 1, None)}
+    assert database.log == [('MaterialBestPrice', 3), ('MaterialBestPrice', 4), 'COMMIT']
+
+    client.post('/supplier_materials/delete/2/3')
+    assert database.best_prices == {4: (Decimal('7.00'), 1, None)}
+    assert database.log[3:] == [('MaterialBestPrice', 3), 'COMMIT']
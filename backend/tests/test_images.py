@@ -0,0 +1,61 @@
+import io
+import os
+
+import pytest
+
+from assets import Asset
+from images import DerivativeCache, UndecodableImage
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def asset_for(path):
+    return Asset(str(path), path.name, path.read_bytes())
+
+
+def test_renders_and_caches_a_derivative(tmp_path):
+    source = tmp_path / 'photo.png'
+    Image.new('RGB', (800, 400), 'red').save(source)
+    cache = DerivativeCache(str(tmp_path / 'cache'), max_bytes=1024 * 1024)
+
+    data = cache.get(asset_for(source), 320, 'webp')
+    with Image.open(io.BytesIO(data)) as image:
+        assert (image.format, image.size) == ('WEBP', (320, 160))
+    assert cache.get(asset_for(source), 320, 'webp') == data
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache._rendering == {}
+
+
+def test_undecodable_source_is_not_left_rendering(tmp_path):
+    source = tmp_path / 'logo.png'
+    source.write_bytes(b'<svg xmlns="http://www.w3.org/2000/svg"/>')
+    cache = DerivativeCache(str(tmp_path / 'cache'), max_bytes=1024 * 1024)
+
+    for _ in range(2):
+        with pytest.raises(UndecodableImage):
+            cache.get(asset_for(source), 320, 'webp')
+    assert cache._rendering == {}
+    assert cache.stats()['files'] == 0
+
+
+def test_workers_sharing_the_directory_share_its_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr('images.render', lambda path, width, fmt: b'x' * 400)
+    directory = str(tmp_path / 'cache')
+    # Two worker processes' caches over one directory
+    first = DerivativeCache(directory, max_bytes=1000)
+    second = DerivativeCache(directory, max_bytes=1000)
+    sources = []
+    for n in range(4):
+        source = tmp_path / f'photo{n}.png'
+        source.write_bytes(bytes([n]))
+        sources.append(asset_for(source))
+
+    for n, (cache, asset) in enumerate(zip([first, second, first, second], sources)):
+        cache.get(asset, 320, 'webp')
+        # Distinct mtimes, oldest first, however coarse the filesystem's clock
+        os.utime(os.path.join(directory, f"{asset.digest}-320.webp"), (1000 + n, 1000 + n))
+
+    on_disk = sorted(os.listdir(directory))
+    assert sum(os.path.getsize(os.path.join(directory, name)) for name in on_disk) <= 1000
+    assert on_disk == sorted(f"{asset.digest}-320.webp" for asset in sources[2:])
+    assert second.stats() == {'files': 2, 'bytes': 800, 'max_bytes': 1000}
@@ -0,0 +1,137 @@
+import io
+import json
+from decimal import Decimal
+
+import pymysql
+import pytest
+
+from entities import ENTITIES
+from importer import NameResolver, import_records, iter_records
+
+PROJECT = {'ProjectName': 'Tower', 'Location': 'Nablus', 'Revenue': '1500', 'BranchID': '1', 'ClientID': '2'}
+
+
+class ImportCursor:
+    """Names for the name lookups, a log of statements, and a database that rejects some rows.
+
+    ``rejects(values)`` says whether MySQL would refuse a row (duplicate
+    key, dangling ID); a batch containing one fails as a whole.
+    """
+
+    def __init__(self, names=None, rejects=lambda values: False):
+        self.names = names or {}
+        self.rejects = rejects
+        self.log = []
+        self.inserted = []
+        self._rows = []
+
+    def execute(self, query, args=()):
+        if query.startswith("SELECT"):
+            table = query.split(" FROM ")[1].split()[0]
+            self.log.append(('lookup', table, sorted(args)))
+            self._rows = [(key, name) for name, key in self.names.get(table, []) if name in args]
+        elif query.startswith("INSERT"):
+            self.log.append('insert')
+            if self.rejects(args):
+                raise pymysql.IntegrityError(1062, f"Duplicate entry '{args[0]}'")
+            self.inserted.append(args)
+        else:
+            self.log.append(query)
+
+    def executemany(self, query, rows):
+        self.log.append(('executemany', len(rows)))
+        if any(self.rejects(values) for values in rows):
+            raise pymysql.IntegrityError(1062, "Duplicate entry")
+        self.inserted.extend(rows)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+def records(fmt, text):
+    return list(iter_records(io.BytesIO(text.encode('utf-8')), fmt))
+
+
+def test_csv_rows_are_numbered_from_one_and_the_bom_is_dropped():
+    assert records('csv', '\ufeffClientName,ContactInfo\nAcme,a@x\nBeta,b@x\n') == [
+        (1, {'ClientName': 'Acme', 'ContactInfo': 'a@x'}),
+        (2, {'ClientName': 'Beta', 'ContactInfo': 'b@x'}),
+    ]
+
+
+def test_jsonl_skips_blank_lines_and_yields_bad_lines_as_errors():
+    parsed = records('jsonl', '{"ClientName": "Acme"}\n\n{oops\n{"ClientName": "Beta"}\n')
+    assert [number for number, _ in parsed] == [1, 2, 3]
+    assert parsed[0][1] == {'ClientName': 'Acme'}
+    assert isinstance(parsed[1][1], ValueError)
+    assert parsed[2][1] == {'ClientName': 'Beta'}
+
+
+def test_json_accepts_an_array_or_an_object_with_rows():
+    rows = [{'ClientName': 'Acme'}]
+    assert records('json', json.dumps(rows)) == [(1, rows[0])]
+    assert records('json', json.dumps({'rows': rows})) == [(1, rows[0])]
+
+
+@pytest.mark.parametrize('fmt, text', [('json', '{"ClientName": "Acme"}'), ('xml', '<rows/>')])
+def test_unusable_uploads_raise_value_error(fmt, text):
+    with pytest.raises(ValueError):
+        records(fmt, text)
+
+
+def test_resolver_looks_each_name_up_once_and_marks_ambiguous_names():
+    cursor = ImportCursor(names={'Branch': [('Nablus', 1), ('Hebron', 2), ('Hebron', 3)]})
+    resolver = NameResolver(cursor)
+    ids = resolver.resolve('Branch', ['Nablus', 'Hebron', 'Jenin', 'Nablus'])
+    assert ids['Nablus'] == 1
+    assert ids['Jenin'] is None
+    assert ids['Hebron'] is not None and not isinstance(ids['Hebron'], int)
+    resolver.resolve('Branch', ['Nablus', 'Jenin'])
+    assert cursor.log == [('lookup', 'Branch', ['Hebron', 'Jenin', 'Nablus'])]
+
+
+def test_names_resolve_to_ids_and_misses_are_reported_per_row():
+    cursor = ImportCursor(names={'Branch': [('Nablus', 1), ('Hebron', 2), ('Hebron', 3)], 'Client': [('Acme', 9)]})
+    rows = [
+        (1, dict(PROJECT, BranchID='', BranchName='Nablus', ClientID='', ClientName='Acme')),
+        (2, dict(PROJECT, BranchID='', BranchName='Jenin')),
+        (3, dict(PROJECT, BranchID='', BranchName='Hebron')),
+        (4, dict(PROJECT, BranchID='')),
+    ]
+    result = import_records(cursor, ENTITIES['projects'], rows, skip_invalid=True)
+    assert result.inserted == 1
+    assert cursor.inserted == [('Tower', 'Nablus', Decimal('0'), Decimal('1500'), 'building', 1, 9)]
+    errors = {error['row']: error['error'] for error in result.errors}
+    assert errors[2] == "No Branch named 'Jenin'"
+    assert errors[3].startswith("More than one Branch is named 'Hebron'")
+    assert errors[4] == "BranchID or BranchName is required"
+
+
+def test_a_rejected_chunk_is_replayed_row_by_row():
+    rows = [(n, dict(PROJECT, ProjectName=f"P{n}")) for n in range(1, 6)]
+    cursor = ImportCursor(rejects=lambda values: values[0] in ('P2', 'P4'))
+    result = import_records(cursor, ENTITIES['projects'], rows, skip_invalid=True, chunk_size=3)
+
+    assert [values[0] for values in cursor.inserted] == ['P1', 'P3', 'P5']
+    assert result.inserted == 3
+    assert [(error['row'], error['error']) for error in result.errors] == [
+        (2, "Duplicate entry 'P2'"), (4, "Duplicate entry 'P4'")]
+    assert cursor.log == [
+        "SAVEPOINT import_chunk", ('executemany', 3), "ROLLBACK TO SAVEPOINT import_chunk",
+        "SAVEPOINT import_row", 'insert',
+        "SAVEPOINT import_row", 'insert', "ROLLBACK TO SAVEPOINT import_row",
+        "SAVEPOINT import_row", 'insert',
+        "SAVEPOINT import_chunk", ('executemany', 2), "ROLLBACK TO SAVEPOINT import_chunk",
+        "SAVEPOINT import_row", 'insert', "ROLLBACK TO SAVEPOINT import_row",
+        "SAVEPOINT import_row", 'insert',
+    ]
+
+
+def test_without_skip_invalid_nothing_is_inserted_after_the_first_bad_row():
+    rows = [(1, dict(PROJECT, Revenue='lots')), (2, PROJECT), (3, dict(PROJECT, ProjectName=''))]
+    cursor = ImportCursor()
+    result = import_records(cursor, ENTITIES['projects'], rows, chunk_size=1)
+    assert cursor.inserted == []
+    assert [error['row'] for error in result.errors] == [1, 3]
+    assert result.rows == 3
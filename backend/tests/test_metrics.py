@@ -0,0 +1,37 @@
+import pytest
+from flask import Flask
+
+import metrics
+
+
+def client_for(monkeypatch, token=None):
+    if token:
+        monkeypatch.setenv('METRICS_TOKEN', token)
+    else:
+        monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    app = Flask(__name__)
+    metrics.init_app(app)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('remote_addr, headers, status', [
+    ('127.0.0.1', {}, 200),
+    ('::1', {}, 200),
+    ('10.0.0.5', {}, 403),
+    # A reverse proxy on the same host relays public requests from loopback
+    ('127.0.0.1', {'X-Forwarded-For': '203.0.113.9'}, 403),
+])
+def test_without_a_token_only_local_scrapes_are_allowed(monkeypatch, remote_addr, headers, status):
+    client = client_for(monkeypatch)
+    response = client.get('/metrics', headers=headers, environ_base={'REMOTE_ADDR': remote_addr})
+    assert response.status_code == status
+
+
+def test_token_is_required_from_anywhere_when_configured(monkeypatch):
+    client = client_for(monkeypatch, token='s3cret')
+    local = {'REMOTE_ADDR': '127.0.0.1'}
+    assert client.get('/metrics', environ_base=local).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'},
+                          environ_base={'REMOTE_ADDR': '10.0.0.5'})
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
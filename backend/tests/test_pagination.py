@@ -0,0 +1,49 @@
+import datetime
+from decimal import Decimal
+from operator import itemgetter
+
+from pagination import decode_page_cursor, encode_page_cursor, keyset_clause, next_page_cursor
+
+ORDER_KEYS = [("e.Salary", itemgetter('Salary')), ("e.EmployeeID", itemgetter('EmployeeID'))]
+
+
+def test_first_page_has_no_condition():
+    assert keyset_clause(ORDER_KEYS, 'asc', None) == (None, [], "e.Salary ASC, e.EmployeeID ASC")
+
+
+def test_later_pages_seek_past_the_last_row_with_a_row_comparison():
+    condition, params, order_by = keyset_clause(ORDER_KEYS, 'asc', [Decimal('5000.00'), 17])
+    assert condition == "(e.Salary, e.EmployeeID) > (%s, %s)"
+    assert params == [Decimal('5000.00'), 17]
+    assert order_by == "e.Salary ASC, e.EmployeeID ASC"
+
+
+def test_descending_pages_seek_downwards():
+    condition, _, order_by = keyset_clause(ORDER_KEYS, 'desc', [Decimal('5000.00'), 17])
+    assert condition == "(e.Salary, e.EmployeeID) < (%s, %s)"
+    assert order_by == "e.Salary DESC, e.EmployeeID DESC"
+
+
+def test_single_key_uses_a_plain_comparison():
+    assert keyset_clause([("p.ProjectID", itemgetter('ProjectID'))], 'asc', [9]) == (
+        "p.ProjectID > %s", [9], "p.ProjectID ASC")
+
+
+def test_cursor_that_does_not_fit_the_ordering_restarts_at_the_first_page():
+    # From another sort (wrong arity) or over a NULL sort value, which a row comparison cannot seek past
+    assert keyset_clause(ORDER_KEYS, 'asc', [17])[0] is None
+    assert keyset_clause(ORDER_KEYS, 'asc', [None, 17])[0] is None
+
+
+def test_cursor_round_trips_the_sort_values():
+    values = [Decimal('12.50'), datetime.date(2024, 3, 1), datetime.datetime(2024, 3, 1, 8, 30), 'B-7', 4, None]
+    assert decode_page_cursor(encode_page_cursor(values)) == values
+    assert decode_page_cursor('not a cursor') is None
+
+
+def test_next_page_cursor_trims_the_look_ahead_row():
+    rows = [{'Salary': Decimal(n), 'EmployeeID': n} for n in range(1, 5)]
+    page, cursor = next_page_cursor(rows, ORDER_KEYS, page_size=3)
+    assert page == rows[:3]
+    assert decode_page_cursor(cursor) == [Decimal(3), 3]
+    assert next_page_cursor(rows, ORDER_KEYS, page_size=4) == (rows, None)
@@ -0,0 +1,133 @@
+from decimal import Decimal
+
+import pytest
+
+import hello
+import resources
+from entities import ENTITIES
+from pagination import PAGE_SIZE, decode_page_cursor, encode_page_cursor
+
+PROJECT_COLUMNS = ['ProjectID', 'ProjectName', 'Location', 'Cost', 'Revenue', 'ProjectType', 'BranchID', 'ClientID']
+
+
+class RecordingCursor:
+    """Answers every SELECT with ``rows`` (dicts) and records what was asked."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.queries = []
+        self.description = None
+
+    def execute(self, query, args=()):
+        self.queries.append((query, tuple(args)))
+        selected = query[len("SELECT "):query.index(" FROM ")].split(', ')
+        names = [column.split(' AS ')[-1] for column in selected]
+        self.description = [(name,) for name in names]
+        self._rows = [tuple(row.get(name) for name in names) for row in self.rows]
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.mark.parametrize('raw, expected', [('7', (7,)), (' 7', (7,))])
+def test_parse_key_single(raw, expected):
+    assert resources.parse_key(ENTITIES['projects'], raw) == expected
+
+
+def test_parse_key_composite():
+    assert resources.parse_key(ENTITIES['work_assignments'], '3,7') == (3, 7)
+
+
+@pytest.mark.parametrize('entity, raw', [
+    ('work_assignments', '3'),
+    ('work_assignments', '3,7,9'),
+    ('projects', '3,7'),
+    ('work_assignments', '3,x'),
+    ('projects', ''),
+])
+def test_parse_key_rejects_wrong_arity_and_non_integers(entity, raw):
+    with pytest.raises(ValueError):
+        resources.parse_key(ENTITIES[entity], raw)
+
+
+def test_readable_columns_drop_secret_columns():
+    assert resources.readable_columns(ENTITIES['users'], ['UserID', 'Username', 'Email', 'Password']) == [
+        'UserID', 'Username', 'Email']
+
+
+def test_select_columns_narrows_and_dedupes_in_request_order():
+    readable = PROJECT_COLUMNS
+    assert resources.select_columns(ENTITIES['projects'], readable, '') == readable
+    assert resources.select_columns(ENTITIES['projects'], readable, 'Revenue, ProjectID,Revenue') == [
+        'Revenue', 'ProjectID']
+
+
+def test_select_columns_rejects_unknown_and_secret_fields():
+    readable = resources.readable_columns(ENTITIES['users'], ['UserID', 'Username', 'Password'])
+    with pytest.raises(ValueError, match='Password'):
+        resources.select_columns(ENTITIES['users'], readable, 'Username,Password')
+    with pytest.raises(ValueError, match='Nope'):
+        resources.select_columns(ENTITIES['projects'], PROJECT_COLUMNS, 'ProjectName,Nope')
+
+
+def test_list_page_sorts_through_the_alias_and_keeps_it_out_of_the_rows():
+    rows = [{'ProjectName': f"P{n}", 'ProjectID': n, resources._SORT_KEY: Decimal(n)} for n in (1, 2, 3)]
+    cursor = RecordingCursor(rows)
+    page, next_cursor = resources.list_page(cursor, ENTITIES['projects'], PROJECT_COLUMNS, ['ProjectName'],
+                                            {'sort_by': 'Cost', 'limit': '2'})
+    query, params = cursor.queries[0]
+    assert query == ("SELECT ProjectName, ProjectID, COALESCE(Cost, 0) AS _sort_key FROM Project "
+                     "ORDER BY COALESCE(Cost, 0) ASC, ProjectID ASC LIMIT %s")
+    assert params == (3,)
+    assert page == [{'ProjectName': 'P1'}, {'ProjectName': 'P2'}]
+    assert decode_page_cursor(next_cursor) == [Decimal(2), 2]
+
+
+def test_list_page_seeks_past_the_cursor():
+    cursor = RecordingCursor()
+    resources.list_page(cursor, ENTITIES['projects'], PROJECT_COLUMNS, ['ProjectID'],
+                        {'sort_by': 'Revenue', 'sort_order': 'desc', 'filter_branch': '4',
+                         'cursor': encode_page_cursor([Decimal('10.00'), 8])})
+    query, params = cursor.queries[0]
+    assert query.endswith("WHERE BranchID = %s AND (Revenue, ProjectID) < (%s, %s) "
+                          "ORDER BY Revenue DESC, ProjectID DESC LIMIT %s")
+    assert params == ('4', Decimal('10.00'), 8, PAGE_SIZE + 1)
+
+
+@pytest.mark.parametrize('limit, fetched', [('100000', resources.MAX_PAGE_SIZE + 1), ('0', 2), ('abc', PAGE_SIZE + 1)])
+def test_list_page_clamps_the_page_size(limit, fetched):
+    cursor = RecordingCursor()
+    resources.list_page(cursor, ENTITIES['projects'], PROJECT_COLUMNS, ['ProjectID'], {'limit': limit})
+    assert cursor.queries[0][1][-1] == fetched
+
+
+def test_list_page_of_a_composite_key_orders_by_every_key_column():
+    cursor = RecordingCursor()
+    resources.list_page(cursor, ENTITIES['work_assignments'], ['ProjectID', 'EmployeeID', 'Role'], ['Role'],
+                        {'sort_by': 'Unknown'})
+    assert cursor.queries[0][0].endswith("ORDER BY StartDate DESC, ProjectID DESC, EmployeeID DESC LIMIT %s")
+
+
+def test_api_answers_401_and_403_instead_of_redirecting(monkeypatch):
+    hello.app.config['TESTING'] = True
+    client = hello.app.test_client()
+    assert client.get('/api/projects').status_code == 401
+
+    class Member:
+        is_authenticated = True
+        is_admin = False
+
+    monkeypatch.setattr(hello, 'current_user', Member())
+    assert client.delete('/api/projects/1').status_code == 403
+
+
+def test_apply_row_change_returns_counter_deltas_or_none_after_a_cascade(monkeypatch):
+    monkeypatch.setattr(hello, 'summaries_enabled', lambda: False)
+    monkeypatch.setattr(hello, 'best_prices_enabled', lambda: False)
+    old = {'ProjectID': 1, 'BranchID': 2, 'Revenue': Decimal('100.00')}
+    new = dict(old, Revenue='150.5')
+    assert hello.apply_row_change(None, 'Project', old, new) == {'project_count': 0, 'total_revenue': Decimal('50.50')}
+    assert hello.apply_row_change(None, 'Supplier', None, {'SupplierID': 4}) == {'supplier_count': 1}
+    assert hello.apply_row_change(None, 'Material', {'MaterialID': 3}, None) == {}
+    # Deleting a branch takes its employees and projects with it
+    assert hello.apply_row_change(None, 'Branch', {'BranchID': 2}, None) is None
@@ -0,0 +1,124 @@
+from db import _Instrumented
+from slowlog import SlowQueryLog, explainable, fingerprint
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.pending = []
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    """Buffers one result set at a time, like pymysql; anything else run on the connection drains the rest."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, query, args=None):
+        conn = self.connection
+        conn.statements.append(query)
+        if query.startswith('EXPLAIN'):
+            conn.pending = []
+            self._load([(('id',), ('select_type',)), [(1, 'SIMPLE')]])
+            return 1
+        result_sets = [[(1,)], [(2,), (3,)], [(4,)]] if ';' in query else [[(1,)]]
+        conn.pending = [[(('n',),), rows] for rows in result_sets]
+        self._load(conn.pending.pop(0))
+        return self.rowcount
+
+    def _load(self, result):
+        self.description, self._rows = result
+        self.rowcount = len(self._rows)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def nextset(self):
+        if not self.connection.pending:
+            return None
+        self._load(self.connection.pending.pop(0))
+        return True
+
+    def mogrify(self, query, args=None):
+        return query if args is None else query % tuple(repr(a) for a in args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class LoggedCursor(_Instrumented, FakeCursor):
+    pass
+
+
+class FakePool:
+    def __init__(self):
+        self.connections = []
+        self.released = 0
+
+    def acquire(self, block=True):
+        conn = FakeConnection()
+        self.connections.append(conn)
+        return conn
+
+    def release(self, conn, discard=False):
+        self.released += 1
+
+
+def test_fingerprint_replaces_literals_and_placeholders():
+    assert fingerprint("SELECT * FROM t WHERE a = 5 AND b = 'x' AND c IN (%s, %s)") == \
+        "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (?+)"
+
+
+def test_only_single_selects_are_explained():
+    assert explainable("SELECT 1")
+    assert explainable("(SELECT 1) UNION (SELECT 2);")
+    assert not explainable("UPDATE t SET a = ?")
+    assert not explainable("SELECT 1; SELECT 2")
+
+
+def test_slow_multi_result_batch_keeps_its_pending_results(monkeypatch):
+    pool = FakePool()
+    log = SlowQueryLog(threshold=0, pool=pool)
+    monkeypatch.setattr(LoggedCursor, 'slow_query_log', log)
+    conn = FakeConnection()
+    cursor = LoggedCursor(conn)
+
+    cursor.execute("SELECT a FROM t WHERE id = %s; SELECT b FROM u; SELECT c FROM v", (7,))
+    results = [cursor.fetchall()]
+    while cursor.nextset():
+        results.append(cursor.fetchall())
+    log.wait_for_explains()
+
+    assert results == [[(1,)], [(2,), (3,)], [(4,)]]
+    assert conn.statements == ["SELECT a FROM t WHERE id = %s; SELECT b FROM u; SELECT c FROM v"]
+    [entry] = log.entries()
+    assert entry['count'] == 1 and entry['explain'] is None
+    assert pool.connections == []
+
+
+def test_slow_select_is_explained_on_a_pooled_connection(monkeypatch):
+    pool = FakePool()
+    log = SlowQueryLog(threshold=0, pool=pool)
+    monkeypatch.setattr(LoggedCursor, 'slow_query_log', log)
+    conn = FakeConnection()
+    cursor = LoggedCursor(conn)
+
+    cursor.execute("SELECT a FROM t WHERE id = %s", (7,))
+    log.wait_for_explains()
+
+    assert conn.statements == ["SELECT a FROM t WHERE id = %s"]
+    [explain_conn] = pool.connections
+    assert explain_conn.statements == ["EXPLAIN SELECT a FROM t WHERE id = 7"]
+    assert pool.released == 1
+    [entry] = log.entries()
+    assert entry['explain'] == {'columns': ['id', 'select_type'], 'rows': [[1, 'SIMPLE']]}
@@ -0,0 +1,33 @@
+import signal
+
+from flask import Flask, request
+
+from spa import SpaShell
+
+app = Flask(__name__)
+
+
+def serve(shell, **headers):
+    with app.test_request_context(headers=headers):
+        return shell.response(request)
+
+
+def test_each_encoding_has_its_own_etag(tmp_path):
+    index = tmp_path / 'index.html'
+    index.write_text('<div id="root"></div>\n' * 100)
+    shell = SpaShell(str(index))
+
+    plain = serve(shell)
+    gzipped = serve(shell, **{'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert plain.get_etag() != gzipped.get_etag()
+    assert 'Accept-Encoding' in plain.vary
+
+    assert serve(shell, **{'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.get_etag()[0]}).status_code == 304
+    assert serve(shell, **{'If-None-Match': gzipped.get_etag()[0]}).status_code == 200
+
+
+def test_importing_the_app_leaves_sighup_alone(monkeypatch):
+    monkeypatch.delenv('SPA_RELOAD_ON_SIGHUP', raising=False)
+    import hello  # noqa: F401
+    assert signal.getsignal(signal.SIGHUP) == signal.SIG_DFL
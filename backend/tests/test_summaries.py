@@ -0,0 +1,116 @@
+import re
+from decimal import Decimal
+
+import pytest
+
+from summaries import (add_branch_revenue, add_employee_hours, add_material_spend, money, rebuild_summaries,
+                       subtract_project_children)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('12.5', Decimal('12.50')),
+    ('0.005', Decimal('0.01')),
+    ('2.675', Decimal('2.68')),
+    ('-2.675', Decimal('-2.68')),
+    (3, Decimal('3.00')),
+    (Decimal('7.125'), Decimal('7.13')),
+    (None, Decimal('0.00')),
+    ('', Decimal('0.00')),
+])
+def test_money_rounds_half_up_to_cents(value, expected):
+    assert money(value) == expected
+    assert money(value).as_tuple().exponent == -2
+
+
+def test_money_of_a_float_uses_its_shortest_repr():
+    # Decimal(2.675) is 2.67499999...; going through str() keeps what was typed
+    assert money(2.675) == Decimal('2.68')
+
+
+
+class SummaryCursor:
+    """Plays the ``INSERT ... ON DUPLICATE KEY UPDATE x = x + VALUES(x)`` upserts against dicts.
+
+    ``groups`` answers the per-project GROUP BY queries of subtract_project_children.
+    """
+
+    UPSERT = re.compile(r"INSERT INTO (\w+Summary) \((\w+), (\w+), (\w+)\) VALUES \(%s, %s, %s\) "
+                        r"ON DUPLICATE KEY UPDATE \3 = \3 \+ VALUES\(\3\), \4 = \4 \+ VALUES\(\4\)$")
+
+    def __init__(self, groups=None):
+        self.tables = {}
+        self.groups = groups or {}
+        self.queries = []
+        self._rows = []
+
+    def execute(self, query, args=()):
+        query = ' '.join(query.split())
+        self.queries.append((query, tuple(args or ())))
+        if match := self.UPSERT.match(query):
+            key, count, total = args
+            table = self.tables.setdefault(match.group(1), {})
+            old_count, old_total = table.get(key, (0, Decimal('0.00')))
+            table[key] = (old_count + count, old_total + total)
+        elif query.startswith("SELECT"):
+            self._rows = self.groups[query.split(' FROM ')[1].split()[0]]
+        else:
+            self._rows = []
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+def test_deltas_add_up_and_cancel_out():
+    cursor = SummaryCursor()
+    add_branch_revenue(cursor, 1, 1, money('1000.50'))
+    add_branch_revenue(cursor, 1, 1, money('99.50'))
+    add_employee_hours(cursor, 7, 1, money('8'))
+    add_material_spend(cursor, 3, 1, money('4') * money('2.5'))
+    assert cursor.tables == {
+        'BranchRevenueSummary': {1: (2, Decimal('1100.00'))},
+        'EmployeeHoursSummary': {7: (1, Decimal('8.00'))},
+        'MaterialSpendSummary': {3: (1, Decimal('10.0000'))},
+    }
+
+    # An update is the old row taken out and the new one put in
+    add_branch_revenue(cursor, 1, -1, -money('99.50'))
+    add_branch_revenue(cursor, 2, 1, money('99.50'))
+    assert cursor.tables['BranchRevenueSummary'] == {1: (1, Decimal('1000.50')), 2: (1, Decimal('99.50'))}
+
+
+def test_subtract_project_children_takes_out_each_group():
+    cursor = SummaryCursor(groups={
+        'WorkAssignment': [(7, 2, Decimal('12.50')), (8, 1, Decimal('4.00'))],
+        'ProjectMaterial': [(3, 1, Decimal('10.00'))],
+    })
+    subtract_project_children(cursor, 5)
+    assert cursor.tables == {
+        'EmployeeHoursSummary': {7: (-2, Decimal('-12.50')), 8: (-1, Decimal('-4.00'))},
+        'MaterialSpendSummary': {3: (-1, Decimal('-10.00'))},
+    }
+    selects = [(query, args) for query, args in cursor.queries if query.startswith("SELECT")]
+    assert [args for _, args in selects] == [(5,), (5,)]
+    assert all("WHERE ProjectID = %s GROUP BY" in query for query, _ in selects)
+
+
+def test_subtract_project_children_without_children_writes_nothing():
+    cursor = SummaryCursor(groups={'WorkAssignment': [], 'ProjectMaterial': []})
+    subtract_project_children(cursor, 5)
+    assert cursor.tables == {}
+    assert len(cursor.queries) == 2
+
+
+def test_rebuild_summaries_empties_each_table_before_refilling_it():
+    cursor = SummaryCursor()
+    rebuild_summaries(cursor)
+    queries = [query for query, _ in cursor.queries]
+    assert [query.split(' (')[0] for query in queries] == [
+        "DELETE FROM BranchRevenueSummary", "INSERT INTO BranchRevenueSummary",
+        "DELETE FROM EmployeeHoursSummary", "INSERT INTO EmployeeHoursSummary",
+        "DELETE FROM MaterialSpendSummary", "INSERT INTO MaterialSpendSummary",
+    ]
+    assert queries[1].endswith("SELECT BranchID, COUNT(*), SUM(Revenue) FROM Project GROUP BY BranchID")
+    assert queries[3].endswith("SELECT EmployeeID, COUNT(*), SUM(HoursWorked) FROM WorkAssignment GROUP BY EmployeeID")
+    assert queries[5].endswith("SELECT MaterialID, COUNT(*), SUM(Quantity * UnitPrice) FROM ProjectMaterial "
+                               "GROUP BY MaterialID")
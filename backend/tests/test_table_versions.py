@@ -0,0 +1,118 @@
+import multiprocessing
+import re
+
+from cache import TableVersions, VersionedCache, bump_table_versions, load_table_versions
+
+UPSERT = re.compile(r"INSERT INTO TableVersion \(TableName, Version\) VALUES .* ON DUPLICATE KEY UPDATE Version = Version \+ 1$")
+
+
+class FakeConnection:
+    """Stands in for a MySQL connection; ``store`` plays the TableVersion table shared by every process."""
+
+    def __init__(self, store):
+        self.store = store
+        self.pending = {}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        for table, bump in self.pending.items():
+            self.store[table] = self.store.get(table, 1000) + bump
+        self.pending = {}
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def execute(self, query, args=None):
+        if query == "SELECT TableName, Version FROM TableVersion":
+            self._rows = list(self.conn.store.items())
+        elif UPSERT.match(query):
+            for table in args:
+                self.conn.pending[table] = self.conn.pending.get(table, 0) + 1
+        else:
+            raise AssertionError(query)
+
+    def fetchall(self):
+        return self._rows
+
+
+def versions_for(conn):
+    return TableVersions(lambda: load_table_versions(conn.cursor()))
+
+
+def write_payment(store):
+    conn = FakeConnection(store)
+    bump_table_versions(conn.cursor(), ['Payment', 'Client'])
+    conn.commit()
+
+
+def test_write_from_another_process_changes_the_etag():
+    with multiprocessing.get_context('fork').Manager() as manager:
+        store = manager.dict({'Payment': 5, 'Client': 9, 'Supplier': 3})
+        versions = versions_for(FakeConnection(store))
+        tables = ('Payment', 'Client', 'Supplier')
+        before = versions.etag(tables, '/payments', '1')
+        assert versions.etag(tables, '/payments', '1') == before
+
+        writer = multiprocessing.get_context('fork').Process(target=write_payment, args=(store,))
+        writer.start()
+        writer.join()
+        assert writer.exitcode == 0
+
+        assert versions.etag(tables, '/payments', '1') != before
+        assert versions.etag(('Supplier',), '/suppliers', '1') == versions.etag(('Supplier',), '/suppliers', '1')
+
+
+def test_versions_move_only_when_the_write_commits():
+    store = {'Payment': 5}
+    reader = versions_for(FakeConnection(store))
+    writer = FakeConnection(store)
+    before = reader.snapshot(('Payment',))
+
+    bump_table_versions(writer.cursor(), ['Payment'])
+    assert reader.snapshot(('Payment',)) == before
+    writer.commit()
+    assert reader.snapshot(('Payment',)) == (6,)
+
+
+def test_bump_locks_rows_in_name_order():
+    class Recorder:
+        def execute(self, query, args):
+            self.args = args
+
+    cursor = Recorder()
+    bump_table_versions(cursor, {'Supplier', 'Client', 'Payment', 'Client'})
+    assert cursor.args == ['Client', 'Payment', 'Supplier']
+
+
+def test_nothing_is_cached_or_validated_without_a_version_table():
+    versions = TableVersions(lambda: None)
+    cache = VersionedCache(versions)
+    loads = []
+    for _ in range(2):
+        cache.get_or_load('clients', ('Client',), lambda: loads.append(1) or ['a'])
+    assert len(loads) == 2
+    assert versions.etag(('Client',), '/clients') is None
+
+
+def test_versioned_entries_expire_after_their_ttl(monkeypatch):
+    import cache
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    report_cache = VersionedCache(TableVersions(lambda: {'Sales': 4}), ttl=300)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    assert report_cache.get_or_load('profitability', ('Sales',), load) == 1
+    now[0] += 299
+    assert report_cache.get_or_load('profitability', ('Sales',), load) == 1
+    now[0] += 2
+    assert report_cache.get('profitability', ('Sales',)) is None
+    assert report_cache.get_or_load('profitability', ('Sales',), load) == 2
@@ -29,4 +29,13 @@ api.interceptors.response.use(
   }
 )
 
+// CRUD for the /api/<entity> endpoints (keys of composite-key entities are "3,7")
+export const entities = {
+  list: (entity, params) => api.get(`/api/${entity}`, { params }),
+  get: (entity, key, params) => api.get(`/api/${entity}/${key}`, { params }),
+  create: (entity, data) => api.post(`/api/${entity}`, data),
+  update: (entity, key, data) => api.patch(`/api/${entity}/${key}`, data),
+  remove: (entity, key) => api.delete(`/api/${entity}/${key}`),
+}
+
 export default api